@@ -1,12 +1,18 @@
-from fastapi import FastAPI, File, UploadFile, Form, HTTPException
+from fastapi import FastAPI, File, UploadFile, Form, HTTPException, Header
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 import uvicorn
 import os
 from dotenv import load_dotenv
 import logging
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, AsyncIterator, Callable, Iterator, Tuple
 import io
+import asyncio
+import numpy as np
+
+from core.executor import QueueFullError
+from core.encoding import dumps_json, encode_prediction
+from core.music import CONDITIONING_CACHE, SAMPLE_RATE as MUSICGEN_SAMPLE_RATE
 
 # Load environment variables
 load_dotenv()
@@ -15,11 +21,18 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+class FastJSONResponse(JSONResponse):
+    """JSON response rendered by core.encoding (numpy-aware, orjson when installed)"""
+    
+    def render(self, content: Any) -> bytes:
+        return dumps_json(content)
+
 # Initialize FastAPI app
 app = FastAPI(
     title="SonicMuse API",
     description="AI Background Music Generator",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=FastJSONResponse
 )
 
 # CORS middleware
@@ -32,21 +45,63 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Global model storage
-models = {}
+# Model registry (lazy loading, memory budget)
+models = None
+
+# Stage executor (CPU pool + single-consumer GPU pool)
+executor = None
+
+# Background job queue
+jobs = None
+
+# MusicGen micro-batcher
+batcher = None
+
+# Content-addressed analysis cache
+analysis_cache = None
+
+# Generated-audio cache and in-flight request deduplication
+generation_cache = None
+generation_flight = None
+
+# Pre-rendered stems for instant compose
+preset_bank = None
+
+COMPOSE_MODES = ("generate", "instant")
 
 @app.on_event("startup")
 async def startup_event():
-    """Load models on startup"""
+    """Create worker pools and the model registry; preload MODEL_PRELOAD models"""
     try:
         from core.models import load_models
-        global models
-        models = load_models()
+        from core.executor import create_executor_from_env
+        from core.jobs import create_job_manager_from_env
+        from core.batching import create_batcher_from_env
+        from core.cache import create_analysis_cache_from_env, create_generation_cache_from_env, SingleFlight
+        from core.bank import create_preset_bank_from_env
+        global models, executor, jobs, batcher, analysis_cache, generation_cache, generation_flight, preset_bank
+        executor = create_executor_from_env()
+        models = await executor.run_gpu(load_models)
+        batcher = create_batcher_from_env(executor, lambda: models["musicgen"])
+        analysis_cache = create_analysis_cache_from_env()
+        generation_cache = create_generation_cache_from_env()
+        generation_flight = SingleFlight()
+        preset_bank = create_preset_bank_from_env()
+        jobs = create_job_manager_from_env()
+        jobs.start()
         logger.info("Models loaded successfully")
     except Exception as e:
         logger.error(f"Failed to load models: {e}")
         raise
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Release worker pools"""
+    if jobs is not None:
+        await jobs.stop()
+    if executor is not None:
+        executor.shutdown()
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
@@ -57,19 +112,265 @@ async def health_check():
         return {
             "ok": True,
             "gpu": gpu_available,
-            "models": {
-                "whisper": "small" if models.get("whisper") else None,
-                "musicgen": "small" if models.get("musicgen") else None,
-                "crepe": "loaded" if models.get("crepe") else None
-            }
+            "models": models.stats() if models else None,
+            "executor": executor.stats() if executor else None,
+            "jobs": jobs.stats() if jobs else None,
+            "batching": batcher.stats() if batcher else None,
+            "cache": {
+                "analysis": analysis_cache.info() if analysis_cache else None,
+                "generation": generation_cache.info() if generation_cache else None,
+                "generation_shared": generation_flight.shared if generation_flight else 0,
+                "conditioning": CONDITIONING_CACHE.info() if CONDITIONING_CACHE else None
+            },
+            "preset_bank": len(preset_bank) if preset_bank else 0
         }
     except Exception as e:
         logger.error(f"Health check failed: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+def analysis_options(
+    f0_backend: Optional[str] = None,
+    f0_voiced_only: Optional[bool] = None,
+    asr_profile: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Resolve per-request analysis settings against the configured defaults
+    
+    Raises a 422 for unknown values, so call it outside the endpoint's
+    generic error handler.
+    """
+    from core.asr import resolve_asr_profile
+    from core.features import resolve_f0_config
+    try:
+        backend, voiced_only = resolve_f0_config(f0_backend, f0_voiced_only)
+        profile = resolve_asr_profile(asr_profile)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return {"f0_backend": backend, "f0_voiced_only": voiced_only, "asr_profile": profile}
+
+async def run_analysis(audio_data: bytes, options: Optional[Dict[str, Any]] = None) -> Tuple[Any, Dict[str, Any]]:
+    """
+    Transcribe, extract features and decide controls, with caching
+    
+    Results are keyed by a hash of the audio bytes plus the model and
+    feature versions and analysis options, so re-uploads of the same file
+    skip Whisper and pitch tracking.
+    
+    Args:
+        audio_data: Uploaded audio bytes
+        options: Settings from analysis_options (defaults when omitted)
+        
+    Returns:
+        Tuple of (DecodedAudio, or the raw bytes on a cache hit; analysis dict)
+    """
+    from core.audio import DecodedAudio
+    from core.asr import transcribe, ASR_PROFILES
+    from core.models import get_whisper
+    from core.features import extract_features, FEATURES_VERSION
+    from core.prompt import decide_controls
+    from core.cache import hash_key
+    
+    options = options or analysis_options()
+    # Hashing large uploads and cache I/O (pickling, disk tier) stay off the event loop
+    loop = asyncio.get_running_loop()
+    key = await loop.run_in_executor(None, hash_key, audio_data, {
+        "whisper": os.getenv("MODEL_SIZE", "small"),
+        "features": FEATURES_VERSION,
+        **options
+    })
+    cached = await loop.run_in_executor(None, analysis_cache.get, key)
+    if cached is not None:
+        logger.info(f"Analysis cache hit {key[:12]}")
+        return audio_data, cached
+    
+    # Decode once; ASR, features and mixing share the waveform
+    audio = await executor.run_cpu(DecodedAudio.from_bytes, audio_data)
+    profile = options["asr_profile"]
+    whisper = await executor.run_gpu(get_whisper, models, ASR_PROFILES[profile]["compute_type"])
+    transcript, segments = await executor.run_gpu(transcribe, audio, whisper, profile=profile)
+    features = await executor.run_cpu(
+        extract_features, audio, segments, options["f0_backend"], options["f0_voiced_only"]
+    )
+    controls = decide_controls(features)
+    
+    analysis = {
+        "transcript": transcript,
+        "segments": segments,
+        "features": features,
+        "controls": controls
+    }
+    await loop.run_in_executor(None, analysis_cache.put, key, analysis)
+    return audio, analysis
+
+async def generate_background(prompt: str, duration: int, seed: int) -> bytes:
+    """
+    Generate music, reusing earlier results for identical inputs
+    
+    Generation is seeded, so (model and CPU precision, prompt, duration,
+    seed, sampling params) identifies the output. Identical concurrent requests share a
+    single generation. Durations past EXTEND_MIN_SECONDS generate a seed
+    clip and extend it with bar-aligned loops (see core.extend), so
+    generation cost stays capped.
+    
+    Args:
+        prompt: Text prompt for generation
+        duration: Duration in seconds
+        seed: Random seed
+        
+    Returns:
+        WAV audio bytes
+    """
+    from core.cache import hash_key
+    from core.extend import extend_wav, extension_plan
+    from core.music import GENERATION_PARAMS
+    
+    seed_duration = extension_plan(duration)
+    if seed_duration is not None:
+        seed_wav = await generate_background(prompt, seed_duration, seed)
+        return await executor.run_cpu(extend_wav, seed_wav, duration)
+    
+    key = hash_key({
+        "model": models.label("musicgen"),
+        "prompt": prompt,
+        "duration": int(duration),
+        "seed": int(seed),
+        "params": GENERATION_PARAMS
+    })
+    
+    async def generate() -> bytes:
+        loop = asyncio.get_running_loop()
+        if generation_cache is not None:
+            cached = await loop.run_in_executor(None, generation_cache.get, key)
+            if cached is not None:
+                logger.info(f"Generation cache hit {key[:12]}")
+                return cached
+        
+        wav_bytes = await batcher.generate(prompt, duration=duration, seed=seed)
+        if generation_cache is not None:
+            await loop.run_in_executor(None, generation_cache.put, key, wav_bytes)
+        return wav_bytes
+    
+    return await generation_flight.do(key, generate)
+
+async def iterate_on_gpu(chunks: Iterator) -> AsyncIterator:
+    """Advance a blocking generator one step at a time on the GPU pool"""
+    while True:
+        chunk = await executor.run_gpu(next, chunks, None)
+        if chunk is None:
+            return
+        yield chunk
+
+def music_stream(prompt: str, duration: int, seed: int) -> Iterator:
+    """
+    Windowed MusicGen generator using the configured window sizes
+    
+    The model is fetched on the first step, so lazy loading happens on the
+    thread advancing the generator rather than the event loop.
+    """
+    from core.music import generate_music_stream
+    yield from generate_music_stream(
+        models["musicgen"],
+        prompt,
+        duration=duration,
+        seed=seed,
+        window=float(os.getenv("MUSICGEN_STREAM_WINDOW", 10)),
+        overlap=float(os.getenv("MUSICGEN_STREAM_OVERLAP", 2))
+    )
+
+def stream_music_response(prompt: str, duration: int, seed: int) -> StreamingResponse:
+    """
+    Stream generated music as chunked WAV, one window at a time
+    
+    Streamed output is generated window by window, so it bypasses the
+    generation cache and micro-batching.
+    """
+    from core.audio import wav_stream_header, to_pcm16
+    
+    async def body():
+        try:
+            yield wav_stream_header(MUSICGEN_SAMPLE_RATE, 2)
+            async for chunk in iterate_on_gpu(music_stream(prompt, duration, seed)):
+                yield to_pcm16(chunk)
+        except Exception as e:
+            # Headers are already sent; all we can do is end the stream
+            logger.error(f"Streaming generation failed: {e}")
+    
+    return StreamingResponse(
+        body(),
+        media_type="audio/wav",
+        headers={"Content-Disposition": "attachment; filename=background_music.wav"}
+    )
+
+async def stream_compose_response(
+    audio_data: bytes,
+    duration: int,
+    seed: int,
+    options: Optional[Dict[str, Any]] = None
+) -> StreamingResponse:
+    """
+    Analyze, then stream the mix while the background is still generating
+    
+    Each background window is mixed against the matching stretch of
+    dialogue and flushed as soon as it is ready.
+    """
+    from core.audio import DecodedAudio, wav_stream_header, to_pcm16
+    from core.mix import BlockMixer
+    from core.prompt import build_prompt
+    
+    audio, analysis = await run_analysis(audio_data, options)
+    if not isinstance(audio, DecodedAudio):
+        audio = await executor.run_cpu(DecodedAudio.from_bytes, audio_data)
+    controls = analysis["controls"]
+    prompt = build_prompt(controls)
+    
+    mixer = BlockMixer(
+        audio, MUSICGEN_SAMPLE_RATE, bg_db=-18, ducking=0.3, speech=analysis["segments"]
+    )
+    # No point generating past the end of the dialogue
+    bg_duration = min(duration, int(np.ceil(audio.duration)))
+    
+    # The mixer carries its position and limiter state between blocks, so
+    # it runs on CPU-pool threads even when CPU stages use processes
+    async def body():
+        try:
+            yield wav_stream_header(mixer.sr, mixer.channels)
+            async for chunk in iterate_on_gpu(music_stream(prompt, bg_duration, seed)):
+                yield to_pcm16(await executor.run_cpu_thread(mixer.mix_block, chunk))
+                if mixer.remaining == 0:
+                    break
+            else:
+                # Dialogue that outlasts the background
+                yield to_pcm16(await executor.run_cpu_thread(mixer.mix_block, None))
+            # Limiter look-ahead
+            yield to_pcm16(await executor.run_cpu_thread(mixer.finish))
+        except Exception as e:
+            logger.error(f"Streaming composition failed: {e}")
+    
+    return StreamingResponse(
+        body(),
+        media_type="audio/wav",
+        headers={
+            "Content-Disposition": "attachment; filename=composed_audio.wav",
+            "X-Prompt": prompt
+        }
+    )
+
 @app.post("/analyze")
-async def analyze_audio(file: UploadFile = File(...)):
+async def analyze_audio(
+    file: UploadFile = File(...),
+    f0_backend: Optional[str] = Form(None),
+    f0_voiced_only: Optional[bool] = Form(None),
+    asr_profile: Optional[str] = Form(None),
+    max_points: Optional[int] = Form(None),
+    hop: Optional[float] = Form(None),
+    encoding: str = Form("json")
+):
     """Analyze uploaded audio file"""
+    options = analysis_options(f0_backend, f0_voiced_only, asr_profile)
+    if encoding not in ("json", "f16"):
+        raise HTTPException(status_code=422, detail="encoding must be json or f16")
+    if max_points is None:
+        max_points = int(os.getenv("ANALYZE_MAX_POINTS", 2000))
     try:
         # Validate file type
         if not file.content_type.startswith('audio/'):
@@ -78,31 +379,29 @@ async def analyze_audio(file: UploadFile = File(...)):
         # Read audio data
         audio_data = await file.read()
         
-        # Import analysis functions
-        from core.asr import transcribe
-        from core.features import extract_features
-        from core.prompt import decide_controls, build_prompt
-        
-        # Transcribe audio
-        transcript, segments = transcribe(audio_data, models["whisper"])
+        from core.prompt import build_prompt
         
-        # Extract features
-        features = extract_features(audio_data, segments)
+        # Transcribe, extract features and decide controls (cached by content)
+        from core.features import compact_features
         
-        # Decide controls
-        controls = decide_controls(features)
+        _, analysis = await run_analysis(audio_data, options)
         
         # Build prompt
-        prompt = build_prompt(controls)
+        prompt = build_prompt(analysis["controls"])
         
-        return {
-            "transcript": transcript,
-            "segments": segments,
+        # Curves at the requested resolution and encoding
+        features = compact_features(analysis["features"], max_points=max_points, hop=hop, encoding=encoding)
+        
+        # Returned directly so numpy curves skip FastAPI's jsonable_encoder
+        return FastJSONResponse({
+            **analysis,
             "features": features,
-            "controls": controls,
             "prompt": prompt
-        }
+        })
         
+    except QueueFullError as e:
+        logger.warning(f"Analysis failed: {e}")
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         logger.error(f"Analysis failed: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -114,28 +413,19 @@ async def generate_music(
     seed: int = Form(42),
     melody_ref: Optional[str] = Form(None),
     tempo_bpm: int = Form(120),
-    key: str = Form("Cmaj")
+    key: str = Form("Cmaj"),
+    stream: bool = Form(False)
 ):
     """Generate background music"""
     try:
-        from core.music import generate_music
+        # tempo_bpm and key are already part of the prompt; melody_ref
+        # conditioning is not implemented yet
         
-        # Convert melody_ref if provided
-        melody_array = None
-        if melody_ref:
-            import json
-            melody_array = json.loads(melody_ref)
+        if stream:
+            return stream_music_response(prompt, duration, seed)
         
-        # Generate music
-        wav_bytes = generate_music(
-            models["musicgen"],
-            prompt=prompt,
-            duration=duration,
-            seed=seed,
-            melody_ref=melody_array,
-            tempo_bpm=tempo_bpm,
-            key=key
-        )
+        # Generate music (cached, batched with concurrent requests)
+        wav_bytes = await generate_background(prompt, duration, seed)
         
         return StreamingResponse(
             io.BytesIO(wav_bytes),
@@ -143,6 +433,9 @@ async def generate_music(
             headers={"Content-Disposition": "attachment; filename=background_music.wav"}
         )
         
+    except QueueFullError as e:
+        logger.warning(f"Music generation failed: {e}")
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         logger.error(f"Music generation failed: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -152,18 +445,28 @@ async def mix_audio(
     file_dialogue: UploadFile = File(...),
     file_bg: UploadFile = File(...),
     bg_db: int = Form(-18),
-    ducking: float = Form(0.3)
+    ducking: float = Form(0.3),
+    streaming: bool = Form(False)
 ):
     """Mix dialogue with background music"""
     try:
         from core.mix import mix_with_dialogue
         
+        # Large uploads are mixed block by block straight from the spool files
+        threshold = float(os.getenv("MIX_STREAMING_MIN_MB", 50)) * 1024 * 1024
+        sizes = [f.size or 0 for f in (file_dialogue, file_bg)]
+        if streaming or max(sizes) > threshold:
+            response = await stream_mix_response(file_dialogue, file_bg, bg_db, ducking)
+            if response is not None:
+                return response
+        
         # Read audio files
         dialogue_data = await file_dialogue.read()
         bg_data = await file_bg.read()
         
         # Mix audio
-        mixed_wav = mix_with_dialogue(
+        mixed_wav = await executor.run_cpu(
+            mix_with_dialogue,
             dialogue_data,
             bg_data,
             bg_db=bg_db,
@@ -176,82 +479,287 @@ async def mix_audio(
             headers={"Content-Disposition": "attachment; filename=mixed_audio.wav"}
         )
         
+    except QueueFullError as e:
+        logger.warning(f"Mixing failed: {e}")
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         logger.error(f"Mixing failed: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+async def stream_mix_response(
+    file_dialogue: UploadFile,
+    file_bg: UploadFile,
+    bg_db: int,
+    ducking: float
+) -> Optional[StreamingResponse]:
+    """
+    Mix uploads block by block with bounded memory
+    
+    The uploads are copied to temp files owned by the response, since
+    FastAPI closes its upload spools once the handler returns.
+    
+    Returns:
+        A streaming WAV response, or None if the inputs can't be read
+        block-wise (e.g. compressed formats) and the in-memory path
+        should be used instead
+    """
+    import shutil
+    import tempfile
+    from core.audio import wav_stream_header, to_pcm16
+    from core.mix import StreamingMixer
+    
+    def spool(upload: UploadFile) -> str:
+        upload.file.seek(0)
+        with tempfile.NamedTemporaryFile(delete=False, suffix=".audio") as tmp:
+            shutil.copyfileobj(upload.file, tmp, 1024 * 1024)
+        upload.file.seek(0)
+        return tmp.name
+    
+    # The mixer holds open files and its position, so it stays in this process
+    paths = [await executor.run_cpu_thread(spool, f) for f in (file_dialogue, file_bg)]
+    
+    def cleanup():
+        for path in paths:
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+    
+    try:
+        mixer = await executor.run_cpu_thread(StreamingMixer, paths[0], paths[1], bg_db=bg_db, ducking=ducking)
+    except QueueFullError:
+        cleanup()
+        raise
+    except Exception as e:
+        logger.info(f"Streaming mix unavailable, falling back to in-memory mix: {e}")
+        cleanup()
+        return None
+    
+    async def body():
+        try:
+            yield wav_stream_header(mixer.sr, mixer.channels)
+            blocks = mixer.blocks()
+            while True:
+                block = await executor.run_cpu_thread(next, blocks, None)
+                if block is None:
+                    return
+                yield to_pcm16(block)
+        except Exception as e:
+            logger.error(f"Streaming mix failed: {e}")
+        finally:
+            mixer.close()
+            cleanup()
+    
+    return StreamingResponse(
+        body(),
+        media_type="audio/wav",
+        headers={"Content-Disposition": "attachment; filename=mixed_audio.wav"}
+    )
+
+def _no_progress(progress: Optional[float] = None, stage: Optional[str] = None) -> None:
+    pass
+
+def compose_mode(mode: str) -> str:
+    """Validate a /compose mode, raising 422 for unknown values"""
+    if mode not in COMPOSE_MODES:
+        raise HTTPException(status_code=422, detail=f"Unknown mode '{mode}' (choose from {', '.join(COMPOSE_MODES)})")
+    return mode
+
+async def run_compose_pipeline(
+    audio_data: bytes,
+    duration: int,
+    seed: int,
+    intensity: float,
+    progress: Callable[..., None] = _no_progress,
+    options: Optional[Dict[str, Any]] = None,
+    mode: str = "generate"
+) -> Tuple[bytes, Dict[str, Any]]:
+    """
+    Run analyze -> generate -> mix
+
+    In "instant" mode the background comes from the preset bank (nearest
+    stem, stretched to the tempo and tiled to the duration); MusicGen is
+    only used when the bank has no suitable stem.
+
+    Args:
+        audio_data: Uploaded dialogue bytes
+        duration: Background duration in seconds
+        seed: Random seed for generation
+        intensity: Intensity level (0.0 to 1.0)
+        progress: Callback receiving (progress, stage) updates
+        options: Analysis settings from analysis_options
+        mode: "generate" or "instant"
+
+    Returns:
+        Tuple of (mixed WAV bytes, metadata)
+    """
+    import time
+    start_time = time.time()
+    
+    # Step 1: Analyze
+    progress(0.0, "analyzing")
+    analyze_start = time.time()
+    
+    from core.prompt import build_prompt
+    
+    audio, analysis = await run_analysis(audio_data, options)
+    controls = analysis["controls"]
+    prompt = build_prompt(controls)
+    
+    analyze_time = time.time() - analyze_start
+    logger.info(f"Analysis took {analyze_time:.2f}s")
+    
+    # Step 2: Generate
+    progress(0.3, "generating")
+    generate_start = time.time()
+    wav_bytes = None
+    if mode == "instant" and preset_bank is not None:
+        wav_bytes = await executor.run_cpu(preset_bank.render, controls, duration)
+        if wav_bytes is None:
+            logger.info(f"No preset stem for {controls}, generating instead")
+    source = "bank" if wav_bytes is not None else "musicgen"
+    if wav_bytes is None:
+        wav_bytes = await generate_background(prompt, duration, seed)
+    
+    generate_time = time.time() - generate_start
+    logger.info(f"Generation took {generate_time:.2f}s")
+    
+    # Step 3: Mix
+    progress(0.9, "mixing")
+    mix_start = time.time()
+    from core.mix import mix_with_dialogue
+    
+    mixed_wav = await executor.run_cpu(
+        mix_with_dialogue,
+        audio,
+        wav_bytes,
+        bg_db=-18,
+        ducking=0.3,
+        speech=analysis["segments"]
+    )
+    
+    mix_time = time.time() - mix_start
+    logger.info(f"Mixing took {mix_time:.2f}s")
+    
+    total_time = time.time() - start_time
+    logger.info(f"Total composition took {total_time:.2f}s")
+    
+    return mixed_wav, {
+        "prompt": prompt,
+        "controls": controls,
+        "source": source,
+        "processing_time": total_time,
+        "filename": "composed_audio.wav"
+    }
+
+async def run_script_pipeline(
+    script: str,
+    duration: int,
+    style: str,
+    intensity: float,
+    progress: Callable[..., None] = _no_progress
+) -> Tuple[bytes, Dict[str, Any]]:
+    """
+    Generate background music for a script, one clip per section
+
+    Args:
+        script: Text script
+        duration: Total duration in seconds
+        style: Musical style preference
+        intensity: Intensity level (0.0 to 1.0)
+        progress: Callback receiving (progress, stage) updates
+
+    Returns:
+        Tuple of (WAV bytes, metadata)
+    """
+    from core.gemini import analyze_script_with_gemini
+    from core.mix import crossfade_sections, trim_audio
+    from core.prompt import build_prompt
+    
+    # Analyze script with Gemini (network call, keep it off the event loop)
+    progress(0.0, "analyzing")
+    sections = await executor.run_cpu(analyze_script_with_gemini, script, style, intensity)
+    
+    # Generate every section in one batch at the longest section duration,
+    # then trim each clip to its own length
+    progress(0.1, f"generating {len(sections)} sections")
+    prompts = []
+    section_durations = []
+    for section in sections:
+        prompts.append(build_prompt({
+            "mood": section["mood"],
+            "tempo_bpm": section["tempo_bpm"],
+            "key": section["key"],
+            "style_id": f"{style}_{section['mood']}"
+        }))
+        section_durations.append(max(1, int(duration * (section["end_ratio"] - section["start_ratio"]))))
+    
+    batch_duration = max(section_durations)
+    batch_wavs = await asyncio.gather(*[
+        generate_background(prompt, batch_duration, 42) for prompt in prompts
+    ])
+    section_audios = await asyncio.gather(*[
+        executor.run_cpu(trim_audio, wav_bytes, section_duration)
+        for wav_bytes, section_duration in zip(batch_wavs, section_durations)
+    ])
+    
+    # Crossfade sections
+    progress(0.9, "crossfading")
+    final_wav = await executor.run_cpu(crossfade_sections, section_audios)
+    
+    return final_wav, {
+        "sections": sections,
+        "filename": "script_background.wav"
+    }
+
 @app.post("/compose")
 async def compose_music(
     file: UploadFile = File(...),
     duration: int = Form(30),
     seed: int = Form(42),
-    intensity: float = Form(0.5)
+    intensity: float = Form(0.5),
+    stream: bool = Form(False),
+    f0_backend: Optional[str] = Form(None),
+    f0_voiced_only: Optional[bool] = Form(None),
+    asr_profile: Optional[str] = Form(None),
+    mode: str = Form("generate"),
+    accept: Optional[str] = Header(None)
 ):
-    """One-shot endpoint: analyze -> generate -> mix"""
+    """
+    One-shot endpoint: analyze -> generate -> mix
+    
+    Returns the WAV, or with ``Accept: multipart/mixed`` a JSON metadata
+    part (prompt, controls, timings) followed by the WAV. ``mode=instant``
+    builds the background from the preset bank; it is fast enough that
+    ``stream`` is ignored.
+    """
+    options = analysis_options(f0_backend, f0_voiced_only, asr_profile)
+    mode = compose_mode(mode)
     try:
-        import time
-        start_time = time.time()
-        
-        # Step 1: Analyze
-        analyze_start = time.time()
         audio_data = await file.read()
+        if stream and mode != "instant":
+            return await stream_compose_response(audio_data, duration, seed, options)
         
-        from core.asr import transcribe
-        from core.features import extract_features
-        from core.prompt import decide_controls, build_prompt
-        
-        transcript, segments = transcribe(audio_data, models["whisper"])
-        features = extract_features(audio_data, segments)
-        controls = decide_controls(features)
-        prompt = build_prompt(controls)
+        mixed_wav, meta = await run_compose_pipeline(audio_data, duration, seed, intensity, options=options, mode=mode)
         
-        analyze_time = time.time() - analyze_start
-        logger.info(f"Analysis took {analyze_time:.2f}s")
-        
-        # Step 2: Generate
-        generate_start = time.time()
-        from core.music import generate_music
-        
-        wav_bytes = generate_music(
-            models["musicgen"],
-            prompt=prompt,
-            duration=duration,
-            seed=seed,
-            melody_ref=None,
-            tempo_bpm=controls.get("tempo_bpm", 120),
-            key=controls.get("key", "Cmaj")
-        )
-        
-        generate_time = time.time() - generate_start
-        logger.info(f"Generation took {generate_time:.2f}s")
-        
-        # Step 3: Mix
-        mix_start = time.time()
-        from core.mix import mix_with_dialogue
-        
-        mixed_wav = mix_with_dialogue(
-            audio_data,
-            wav_bytes,
-            bg_db=-18,
-            ducking=0.3
-        )
-        
-        mix_time = time.time() - mix_start
-        logger.info(f"Mixing took {mix_time:.2f}s")
-        
-        total_time = time.time() - start_time
-        logger.info(f"Total composition took {total_time:.2f}s")
+        if accept and accept.startswith("multipart/"):
+            body, content_type = encode_prediction({**meta, "audio": mixed_wav}, accept)
+            return Response(body, media_type=content_type)
         
         return StreamingResponse(
             io.BytesIO(mixed_wav),
             media_type="audio/wav",
             headers={
                 "Content-Disposition": "attachment; filename=composed_audio.wav",
-                "X-Prompt": prompt,
-                "X-Processing-Time": str(total_time)
+                "X-Prompt": meta["prompt"],
+                "X-Music-Source": meta["source"],
+                "X-Processing-Time": str(meta["processing_time"])
             }
         )
         
+    except QueueFullError as e:
+        logger.warning(f"Composition failed: {e}")
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         logger.error(f"Composition failed: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -265,39 +773,7 @@ async def script_to_background(
 ):
     """Generate background music from script using Gemini"""
     try:
-        from core.gemini import analyze_script_with_gemini
-        from core.music import generate_music
-        from core.mix import crossfade_sections
-        from core.prompt import build_prompt
-        
-        # Analyze script with Gemini
-        sections = analyze_script_with_gemini(script, style, intensity)
-        
-        # Generate music for each section
-        section_audios = []
-        for section in sections:
-            prompt = build_prompt({
-                "mood": section["mood"],
-                "tempo_bpm": section["tempo_bpm"],
-                "key": section["key"],
-                "style_id": f"{style}_{section['mood']}"
-            })
-            
-            section_duration = int(duration * (section["end_ratio"] - section["start_ratio"]))
-            wav_bytes = generate_music(
-                models["musicgen"],
-                prompt=prompt,
-                duration=section_duration,
-                seed=42,
-                melody_ref=None,
-                tempo_bpm=section["tempo_bpm"],
-                key=section["key"]
-            )
-            
-            section_audios.append(wav_bytes)
-        
-        # Crossfade sections
-        final_wav = crossfade_sections(section_audios)
+        final_wav, _ = await run_script_pipeline(script, duration, style, intensity)
         
         return StreamingResponse(
             io.BytesIO(final_wav),
@@ -305,10 +781,117 @@ async def script_to_background(
             headers={"Content-Disposition": "attachment; filename=script_background.wav"}
         )
         
+    except QueueFullError as e:
+        logger.warning(f"Script-to-BG failed: {e}")
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         logger.error(f"Script-to-BG failed: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/jobs/compose", status_code=202)
+async def submit_compose_job(
+    file: UploadFile = File(...),
+    duration: int = Form(30),
+    seed: int = Form(42),
+    intensity: float = Form(0.5),
+    f0_backend: Optional[str] = Form(None),
+    f0_voiced_only: Optional[bool] = Form(None),
+    asr_profile: Optional[str] = Form(None),
+    mode: str = Form("generate")
+):
+    """Queue a compose run and return its job id immediately"""
+    options = analysis_options(f0_backend, f0_voiced_only, asr_profile)
+    mode = compose_mode(mode)
+    try:
+        audio_data = await file.read()
+        params = {"duration": duration, "seed": seed, "intensity": intensity, "mode": mode, **options}
+        job = jobs.submit(
+            "compose",
+            params,
+            lambda job: run_compose_pipeline(
+                audio_data, duration, seed, intensity, progress=job.update, options=options, mode=mode
+            )
+        )
+        return job.to_dict()
+        
+    except QueueFullError as e:
+        logger.warning(f"Compose job rejected: {e}")
+        raise HTTPException(status_code=503, detail=str(e))
+
+@app.post("/jobs/script-to-bg", status_code=202)
+async def submit_script_job(
+    script: str = Form(...),
+    duration: int = Form(60),
+    style: str = Form("ambient"),
+    intensity: float = Form(0.5)
+):
+    """Queue a script-to-bg run and return its job id immediately"""
+    try:
+        params = {"duration": duration, "style": style, "intensity": intensity}
+        job = jobs.submit(
+            "script-to-bg",
+            params,
+            lambda job: run_script_pipeline(script, duration, style, intensity, progress=job.update)
+        )
+        return job.to_dict()
+        
+    except QueueFullError as e:
+        logger.warning(f"Script job rejected: {e}")
+        raise HTTPException(status_code=503, detail=str(e))
+
+def _get_job_or_404(job_id: str):
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Poll job status and progress"""
+    return _get_job_or_404(job_id).to_dict()
+
+@app.get("/jobs/{job_id}/events")
+async def job_events(job_id: str):
+    """Subscribe to job status updates as server-sent events"""
+    import json
+    _get_job_or_404(job_id)
+    
+    async def event_stream():
+        async for snapshot in jobs.subscribe(job_id):
+            yield f"data: {json.dumps(snapshot)}\n\n"
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"}
+    )
+
+@app.get("/jobs/{job_id}/result")
+async def get_job_result(job_id: str):
+    """Fetch the audio produced by a finished job"""
+    from core.jobs import SUCCEEDED
+    job = _get_job_or_404(job_id)
+    if job.status != SUCCEEDED:
+        raise HTTPException(status_code=409, detail=f"Job is {job.status}")
+    
+    # The disk store reads the whole result file
+    data = await asyncio.get_running_loop().run_in_executor(None, jobs.result, job_id)
+    if data is None:
+        raise HTTPException(status_code=410, detail="Job result expired")
+    
+    headers = {"Content-Disposition": f"attachment; filename={job.result_meta.get('filename', 'result.wav')}"}
+    if "prompt" in job.result_meta:
+        headers["X-Prompt"] = job.result_meta["prompt"]
+        headers["X-Processing-Time"] = str(job.result_meta["processing_time"])
+    
+    return StreamingResponse(io.BytesIO(data), media_type="audio/wav", headers=headers)
+
+@app.delete("/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    """Cancel a queued or running job"""
+    _get_job_or_404(job_id)
+    return jobs.cancel(job_id).to_dict()
+
 if __name__ == "__main__":
     uvicorn.run(
         "app:app",
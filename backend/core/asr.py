@@ -1,55 +1,196 @@
 """
 Automatic Speech Recognition using Faster-Whisper
 """
-import io
+import os
 import logging
-from typing import Tuple, List, Dict
-import librosa
-import soundfile as sf
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Tuple, List, Dict, Optional
+import numpy as np
 from faster_whisper import WhisperModel
 
+from core.audio import AudioInput, as_decoded
+
 logger = logging.getLogger(__name__)
 
-def transcribe(audio_data: bytes, whisper_model: WhisperModel) -> Tuple[str, List[Dict]]:
+SAMPLE_RATE = 16000
+
+# Named speed/accuracy trade-offs. compute_type None uses the default model
+# (see core.models.get_whisper); word_timestamps adds per-word "words" to
+# each segment.
+ASR_PROFILES: Dict[str, Dict[str, Any]] = {
+    "fast": {"beam_size": 1, "word_timestamps": False, "vad_filter": True, "compute_type": "int8"},
+    "balanced": {"beam_size": 5, "word_timestamps": False, "vad_filter": True, "compute_type": None},
+    "accurate": {"beam_size": 5, "word_timestamps": True, "vad_filter": False, "compute_type": None}
+}
+
+def resolve_asr_profile(name: Optional[str] = None) -> str:
+    """Validate a profile name, defaulting to ASR_PROFILE (balanced)"""
+    name = name or os.getenv("ASR_PROFILE", "balanced")
+    if name not in ASR_PROFILES:
+        raise ValueError(f"Unknown ASR profile '{name}' (choose from {', '.join(ASR_PROFILES)})")
+    return name
+
+def transcribe(
+    audio_data: AudioInput,
+    whisper_model: WhisperModel,
+    long_form: Optional[bool] = None,
+    profile: Optional[str] = None
+) -> Tuple[str, List[Dict]]:
     """
     Transcribe audio data and return transcript with segments
     
+    Audio longer than ASR_LONGFORM_MIN_SECONDS (or any audio with
+    ``long_form=True``) is split at silences and transcribed in parallel
+    windows; see transcribe_long_form.
+    
     Args:
-        audio_data: Raw audio bytes
+        audio_data: Raw audio bytes or DecodedAudio
         whisper_model: Loaded Whisper model
-        
+        long_form: Force long-form mode on or off (default: by duration)
+        profile: Name of an ASR_PROFILES entry (default ASR_PROFILE); its
+            compute_type is applied by the caller when picking the model
+    
     Returns:
         Tuple of (transcript, segments)
     """
     try:
-        # Convert bytes to audio array
-        audio_array, sr = librosa.load(io.BytesIO(audio_data), sr=16000, mono=True)
-        
-        # Transcribe with timestamps
-        segments, info = whisper_model.transcribe(
-            audio_array,
-            beam_size=5,
-            language="en",  # Can be made configurable
-            word_timestamps=True
-        )
+        settings = ASR_PROFILES[resolve_asr_profile(profile)]
         
-        # Extract transcript and segments
-        transcript_parts = []
-        segments_list = []
+        # 16 kHz mono view (decoded and resampled once per request)
+        audio_array = as_decoded(audio_data).mono(SAMPLE_RATE)
         
-        for segment in segments:
-            transcript_parts.append(segment.text.strip())
-            segments_list.append({
-                "t0": segment.start,
-                "t1": segment.end,
-                "text": segment.text.strip()
-            })
+        if long_form is None:
+            long_form = len(audio_array) / SAMPLE_RATE >= float(os.getenv("ASR_LONGFORM_MIN_SECONDS", 600))
+        if long_form:
+            segments_list = transcribe_long_form(audio_array, whisper_model, settings=settings)
+        else:
+            segments_list = _transcribe_window(audio_array, whisper_model, settings)
         
-        transcript = " ".join(transcript_parts)
+        transcript = " ".join(seg["text"] for seg in segments_list)
         
         logger.info(f"Transcribed {len(segments_list)} segments")
         return transcript, segments_list
-        
+    
     except Exception as e:
         logger.error(f"Transcription failed: {e}")
         raise
+
+def _transcribe_window(
+    audio_array: np.ndarray,
+    whisper_model: WhisperModel,
+    settings: Dict[str, Any],
+    offset: float = 0.0
+) -> List[Dict]:
+    """Transcribe one stretch of 16 kHz audio, shifting timestamps by ``offset``"""
+    # Transcribe with timestamps
+    segments, info = whisper_model.transcribe(
+        audio_array,
+        beam_size=settings["beam_size"],
+        language="en",  # Can be made configurable
+        word_timestamps=settings["word_timestamps"],
+        vad_filter=settings["vad_filter"]
+    )
+    
+    # Segments are decoded lazily while iterating
+    segments_list = []
+    for segment in segments:
+        entry = {
+            "t0": segment.start + offset,
+            "t1": segment.end + offset,
+            "text": segment.text.strip()
+        }
+        if settings["word_timestamps"]:
+            entry["words"] = [
+                {"t0": word.start + offset, "t1": word.end + offset, "word": word.word.strip()}
+                for word in segment.words or []
+            ]
+        segments_list.append(entry)
+    return segments_list
+
+def split_at_silences(
+    audio_array: np.ndarray,
+    max_window: float = 120.0,
+    pad: float = 0.2
+) -> List[Tuple[int, int]]:
+    """
+    Group VAD speech regions into windows of at most ``max_window`` seconds
+    
+    Windows start and end inside silences, so no word is cut in half. A
+    single speech region longer than ``max_window`` becomes its own window.
+    
+    Args:
+        audio_array: 16 kHz mono samples
+        max_window: Target window length in seconds
+        pad: Seconds of silence kept around each window
+    
+    Returns:
+        (start, end) sample ranges in time order
+    """
+    from faster_whisper.vad import VadOptions, get_speech_timestamps
+    
+    speech = get_speech_timestamps(audio_array, VadOptions(min_silence_duration_ms=500))
+    max_len = int(max_window * SAMPLE_RATE)
+    pad_len = int(pad * SAMPLE_RATE)
+    
+    windows: List[Tuple[int, int]] = []
+    for region in speech:
+        if windows and region["end"] - windows[-1][0] <= max_len:
+            windows[-1] = (windows[-1][0], region["end"])
+        else:
+            windows.append((region["start"], region["end"]))
+    return [(max(0, start - pad_len), min(len(audio_array), end + pad_len)) for start, end in windows]
+
+def transcribe_long_form(
+    audio_array: np.ndarray,
+    whisper_model: WhisperModel,
+    workers: Optional[int] = None,
+    max_window: Optional[float] = None,
+    settings: Optional[Dict[str, Any]] = None
+) -> List[Dict]:
+    """
+    Transcribe long audio as independent windows split at silences
+    
+    Windows run concurrently on a thread pool; CTranslate2 only runs them
+    in parallel when the model was loaded with ``num_workers`` > 1 (see
+    ASR_WORKERS in core.models). Segment times are shifted back by each
+    window's offset and returned in order. Padded windows can overlap, so
+    each window keeps only segments whose midpoint falls inside the stretch
+    it owns (up to halfway into its neighbours' padding) and a word in the
+    overlap is never reported twice.
+    
+    Args:
+        audio_array: 16 kHz mono samples
+        whisper_model: Loaded Whisper model
+        workers: Concurrent windows (default ASR_WORKERS)
+        max_window: Window length in seconds (default ASR_LONGFORM_WINDOW)
+        settings: ASR_PROFILES entry (default: the ASR_PROFILE profile)
+    
+    Returns:
+        Segments with t0/t1 relative to the start of ``audio_array``
+    """
+    workers = workers or int(os.getenv("ASR_WORKERS", 2))
+    max_window = max_window or float(os.getenv("ASR_LONGFORM_WINDOW", 120))
+    settings = settings or ASR_PROFILES[resolve_asr_profile()]
+    
+    windows = split_at_silences(audio_array, max_window=max_window)
+    logger.info(f"Long-form transcription: {len(windows)} windows on {workers} workers")
+    if not windows:
+        return []
+    
+    # Each window owns the time up to the midpoint between it and its neighbours
+    bounds = [(end + next_start) / 2 / SAMPLE_RATE for (_, end), (next_start, _) in zip(windows, windows[1:])]
+    owned = list(zip([-np.inf] + bounds, bounds + [np.inf]))
+    
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="asr-window") as pool:
+        results = pool.map(
+            lambda window: _transcribe_window(
+                audio_array[window[0]:window[1]], whisper_model, settings, window[0] / SAMPLE_RATE
+            ),
+            windows
+        )
+        return [
+            segment
+            for window_segments, (lo, hi) in zip(results, owned)
+            for segment in window_segments
+            if lo <= (segment["t0"] + segment["t1"]) / 2 < hi
+        ]
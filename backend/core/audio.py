@@ -0,0 +1,131 @@
+"""
+Decoded audio shared across pipeline stages
+"""
+import io
+import struct
+import logging
+from typing import Dict, Optional, Tuple, Union
+import numpy as np
+import librosa
+import soundfile as sf
+
+logger = logging.getLogger(__name__)
+
+
+class DecodedAudio:
+    """
+    Audio decoded once per request
+
+    Holds float32 samples shaped (frames, channels) at the native sample
+    rate. Mono and resampled views are computed on first use and cached, so
+    ASR, feature extraction and mixing can share one decode.
+    """
+
+    def __init__(self, samples: np.ndarray, sr: int):
+        if samples.ndim == 1:
+            samples = samples[:, np.newaxis]
+        self.samples = np.ascontiguousarray(samples, dtype=np.float32)
+        self.sr = int(sr)
+        self._views: Dict[Tuple[bool, int], np.ndarray] = {}
+
+    @classmethod
+    def from_bytes(cls, audio_data: bytes) -> "DecodedAudio":
+        """
+        Decode raw audio bytes
+
+        Args:
+            audio_data: Raw audio bytes in any format soundfile or audioread can read
+
+        Returns:
+            DecodedAudio instance
+        """
+        try:
+            samples, sr = sf.read(io.BytesIO(audio_data), dtype="float32", always_2d=True)
+        except Exception:
+            # Compressed formats soundfile can't read (mp3, m4a) go through audioread
+            samples, sr = librosa.load(io.BytesIO(audio_data), sr=None, mono=False)
+            samples = samples.T if samples.ndim == 2 else samples
+        audio = cls(samples, sr)
+        logger.info(f"Decoded {audio.duration:.2f}s of audio ({audio.channels} ch @ {audio.sr} Hz)")
+        return audio
+
+    @property
+    def channels(self) -> int:
+        return self.samples.shape[1]
+
+    @property
+    def n_frames(self) -> int:
+        return self.samples.shape[0]
+
+    @property
+    def duration(self) -> float:
+        return self.n_frames / self.sr
+
+    def mono(self, sr: Optional[int] = None) -> np.ndarray:
+        """
+        1-D mono downmix, optionally resampled
+
+        Args:
+            sr: Target sample rate (defaults to the native rate)
+
+        Returns:
+            float32 array of samples
+        """
+        sr = sr or self.sr
+        key = (True, sr)
+        if key not in self._views:
+            if sr == self.sr:
+                mono = self.samples.mean(axis=1) if self.channels > 1 else self.samples[:, 0]
+                self._views[key] = np.ascontiguousarray(mono)
+            else:
+                native = self.mono()
+                self._views[key] = librosa.resample(native, orig_sr=self.sr, target_sr=sr).astype(np.float32)
+        return self._views[key]
+
+    def resampled(self, sr: int) -> np.ndarray:
+        """
+        All channels resampled to ``sr``, shaped (frames, channels)
+
+        Args:
+            sr: Target sample rate
+
+        Returns:
+            float32 array of samples
+        """
+        if sr == self.sr:
+            return self.samples
+        key = (False, sr)
+        if key not in self._views:
+            resampled = librosa.resample(self.samples.T, orig_sr=self.sr, target_sr=sr)
+            self._views[key] = np.ascontiguousarray(resampled.T, dtype=np.float32)
+        return self._views[key]
+
+
+AudioInput = Union[bytes, DecodedAudio]
+
+
+def as_decoded(audio: AudioInput) -> DecodedAudio:
+    """Decode raw bytes, or pass through audio that is already decoded"""
+    if isinstance(audio, DecodedAudio):
+        return audio
+    return DecodedAudio.from_bytes(audio)
+
+
+def wav_stream_header(sr: int, channels: int) -> bytes:
+    """
+    16-bit PCM WAV header for a stream of unknown length
+
+    The RIFF and data sizes are set to 0xFFFFFFFF, which browsers and most
+    decoders treat as "read until the connection closes".
+    """
+    block_align = channels * 2
+    return b"".join([
+        b"RIFF", struct.pack("<I", 0xFFFFFFFF), b"WAVE",
+        b"fmt ", struct.pack("<IHHIIHH", 16, 1, channels, sr, sr * block_align, block_align, 16),
+        b"data", struct.pack("<I", 0xFFFFFFFF)
+    ])
+
+
+def to_pcm16(samples: np.ndarray) -> bytes:
+    """Encode float samples shaped (frames, channels) as interleaved 16-bit PCM"""
+    return (np.clip(samples, -1.0, 1.0) * 32767).astype("<i2").tobytes()
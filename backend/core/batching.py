@@ -0,0 +1,112 @@
+"""
+Micro-batching scheduler for MusicGen generation
+"""
+import os
+import asyncio
+import logging
+from typing import Any, Callable, Dict, List, Tuple
+
+from core.executor import StageExecutor
+from core.music import generate_music_batch
+
+logger = logging.getLogger(__name__)
+
+# Requests can only share a batch when these match
+BatchKey = Tuple[int, int]  # (duration, seed)
+
+
+class MusicGenBatcher:
+    """
+    Collects concurrent generation requests and runs them as one batch
+
+    Requests arriving within ``window_ms`` of each other that share a
+    duration and seed are grouped into a single ``generate`` call on the GPU
+    pool. A group is flushed early once it reaches ``max_batch`` prompts.
+
+    ``get_model`` is called on the GPU pool for every batch, so the model
+    can be loaded lazily (or reloaded after eviction) by the registry.
+    """
+
+    def __init__(self, executor: StageExecutor, get_model: Callable[[], Any], window_ms: int = 50, max_batch: int = 4):
+        self.executor = executor
+        self.get_model = get_model
+        self.window = window_ms / 1000.0
+        self.max_batch = max(1, max_batch)
+        self._pending: Dict[BatchKey, List[Tuple[str, asyncio.Future]]] = {}
+        self._timers: Dict[BatchKey, asyncio.TimerHandle] = {}
+        self.batches = 0
+        self.requests = 0
+
+    async def generate(self, prompt: str, duration: int = 30, seed: int = 42) -> bytes:
+        """
+        Queue a prompt for the next batch and wait for its WAV bytes
+
+        Args:
+            prompt: Text prompt for generation
+            duration: Duration in seconds
+            seed: Random seed (each prompt in a batch is seeded on its own)
+
+        Returns:
+            WAV audio bytes
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        key = (int(duration), int(seed))
+
+        group = self._pending.setdefault(key, [])
+        group.append((prompt, future))
+        self.requests += 1
+
+        if len(group) >= self.max_batch:
+            self._flush(key)
+        elif key not in self._timers:
+            self._timers[key] = loop.call_later(self.window, self._flush, key)
+
+        return await future
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "batches": self.batches,
+            "avg_batch_size": self.requests / self.batches if self.batches else 0.0,
+            "waiting": sum(len(group) for group in self._pending.values())
+        }
+
+    def _flush(self, key: BatchKey) -> None:
+        timer = self._timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+        group = self._pending.pop(key, [])
+        # Drop requests whose callers have gone away
+        group = [(prompt, future) for prompt, future in group if not future.done()]
+        if group:
+            self.batches += 1
+            asyncio.create_task(self._run_batch(key, group))
+
+    async def _run_batch(self, key: BatchKey, group: List[Tuple[str, asyncio.Future]]) -> None:
+        duration, seed = key
+        prompts = [prompt for prompt, _ in group]
+        logger.info(f"Running MusicGen batch of {len(prompts)} ({duration}s, seed {seed})")
+        try:
+            wavs = await self.executor.run_gpu(
+                lambda: generate_music_batch(self.get_model(), prompts, duration=duration, seed=seed)
+            )
+        except Exception as e:
+            for _, future in group:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), wav in zip(group, wavs):
+            if not future.done():
+                future.set_result(wav)
+
+
+def create_batcher_from_env(executor: StageExecutor, get_model: Callable[[], Any]) -> MusicGenBatcher:
+    """Build a MusicGenBatcher from environment variables"""
+    return MusicGenBatcher(
+        executor,
+        get_model,
+        window_ms=int(os.getenv("MUSICGEN_BATCH_WINDOW_MS", 50)),
+        max_batch=int(os.getenv("MUSICGEN_MAX_BATCH", 4))
+    )
@@ -0,0 +1,301 @@
+"""
+Caching primitives: in-memory LRU, on-disk LRU/TTL store and singleflight
+"""
+import os
+import json
+import time
+import pickle
+import struct
+import asyncio
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def hash_key(*parts: Any) -> str:
+    """
+    Stable hex digest for a cache key
+
+    Bytes are hashed as-is; everything else is hashed via its JSON form.
+    """
+    digest = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, (bytes, bytearray, memoryview)):
+            digest.update(part)
+        else:
+            digest.update(json.dumps(part, sort_keys=True, default=str).encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+class CacheStats:
+    """Hit/miss counters for a cache tier"""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / total if total else 0.0
+        }
+
+
+class LRUCache:
+    """
+    Thread-safe in-memory LRU bounded by total entry size in bytes
+
+    ``sizeof`` estimates an entry's size; the default pickles the value.
+    """
+
+    def __init__(self, max_bytes: int, sizeof: Optional[Callable[[Any], int]] = None):
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof or (lambda value: len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)))
+        self.stats = CacheStats()
+        self._entries: "OrderedDict[str, Any]" = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            if key not in self._entries:
+                self.stats.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats.hits += 1
+            return self._entries[key]
+
+    def put(self, key: str, value: Any) -> None:
+        size = self.sizeof(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._sizes.pop(key)
+                del self._entries[key]
+            self._entries[key] = value
+            self._sizes[key] = size
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                old_key, _ = self._entries.popitem(last=False)
+                self._bytes -= self._sizes.pop(old_key)
+                self.stats.evictions += 1
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            **self.stats.to_dict()
+        }
+
+
+class DiskCache:
+    """
+    Directory-backed cache of raw bytes with LRU size bound and optional TTL
+
+    Each entry is one file named after its key, prefixed with its creation
+    time for the TTL check. File mtimes double as last-access times, so the
+    LRU order survives restarts.
+    """
+
+    _HEADER = struct.Struct("<d")
+
+    def __init__(self, root: str, max_bytes: int, ttl: Optional[float] = None, suffix: str = ".bin"):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.suffix = suffix
+        self.stats = CacheStats()
+        self._lock = threading.Lock()
+
+    def _path(self, key: str) -> Path:
+        return self.root / f"{key}{self.suffix}"
+
+    def get(self, key: str) -> Optional[bytes]:
+        path = self._path(key)
+        try:
+            raw = path.read_bytes()
+        except FileNotFoundError:
+            self.stats.misses += 1
+            return None
+
+        (created,) = self._HEADER.unpack_from(raw)
+        if self._expired(created, time.time()):
+            path.unlink(missing_ok=True)
+            self.stats.misses += 1
+            self.stats.evictions += 1
+            return None
+
+        try:
+            os.utime(path)  # mark as recently used
+        except FileNotFoundError:
+            pass
+        self.stats.hits += 1
+        return raw[self._HEADER.size:]
+
+    def put(self, key: str, data: bytes) -> None:
+        if len(data) > self.max_bytes:
+            return
+        path = self._path(key)
+        tmp = path.with_name(f"{path.name}.{threading.get_ident()}.tmp")
+        tmp.write_bytes(self._HEADER.pack(time.time()) + data)
+        tmp.replace(path)
+        self._evict()
+
+    def _expired(self, created: float, now: float) -> bool:
+        return self.ttl is not None and now - created > self.ttl
+
+    def _evict(self) -> None:
+        with self._lock:
+            entries = []
+            total = 0
+            now = time.time()
+            for path in self.root.glob(f"*{self.suffix}"):
+                try:
+                    st = path.stat()
+                    if self.ttl is not None:
+                        with open(path, "rb") as f:
+                            (created,) = self._HEADER.unpack(f.read(self._HEADER.size))
+                        if self._expired(created, now):
+                            path.unlink(missing_ok=True)
+                            self.stats.evictions += 1
+                            continue
+                except (FileNotFoundError, struct.error):
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+                total += st.st_size
+
+            # Oldest access first
+            entries.sort()
+            for _, size, path in entries:
+                if total <= self.max_bytes:
+                    break
+                path.unlink(missing_ok=True)
+                total -= size
+                self.stats.evictions += 1
+
+    def info(self) -> Dict[str, Any]:
+        files = list(self.root.glob(f"*{self.suffix}"))
+        return {
+            "entries": len(files),
+            "bytes": sum(f.stat().st_size for f in files if f.exists()),
+            "max_bytes": self.max_bytes,
+            "ttl": self.ttl,
+            **self.stats.to_dict()
+        }
+
+
+class TieredCache:
+    """
+    Memory LRU in front of an optional disk tier
+
+    Values are pickled for the disk tier; disk hits are promoted to memory.
+    """
+
+    def __init__(self, memory: LRUCache, disk: Optional[DiskCache] = None):
+        self.memory = memory
+        self.disk = disk
+
+    def get(self, key: str) -> Optional[Any]:
+        value = self.memory.get(key)
+        if value is not None or self.disk is None:
+            return value
+        data = self.disk.get(key)
+        if data is None:
+            return None
+        value = pickle.loads(data)
+        self.memory.put(key, value)
+        return value
+
+    def put(self, key: str, value: Any) -> None:
+        self.memory.put(key, value)
+        if self.disk is not None:
+            try:
+                self.disk.put(key, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+            except Exception as e:
+                logger.warning(f"Disk cache write failed: {e}")
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            "memory": self.memory.info(),
+            "disk": self.disk.info() if self.disk else None
+        }
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls for the same key into one execution
+
+    While a call for ``key`` is in flight, later callers await the same
+    result instead of starting their own. The call runs as a task owned by
+    the flight rather than by the first caller, so cancelling any caller
+    (e.g. a client disconnect) leaves the others waiting on the result.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.shared = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._inflight.get(key)
+        if task is not None:
+            self.shared += 1
+        else:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._finished(key, done))
+        return await asyncio.shield(task)
+
+    def _finished(self, key: str, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Mark retrieved so a failure nobody awaited anymore isn't logged
+        if not task.cancelled():
+            task.exception()
+
+
+def create_analysis_cache_from_env() -> TieredCache:
+    """
+    Cache for transcribe/extract_features/decide_controls output
+
+    ANALYSIS_CACHE_MB sizes the memory tier. Setting ANALYSIS_CACHE_DIR
+    enables a disk tier (ANALYSIS_CACHE_DISK_MB) that survives restarts.
+    """
+    memory = LRUCache(int(float(os.getenv("ANALYSIS_CACHE_MB", 64)) * 1024 * 1024))
+    disk = None
+    cache_dir = os.getenv("ANALYSIS_CACHE_DIR")
+    if cache_dir:
+        disk = DiskCache(cache_dir, int(float(os.getenv("ANALYSIS_CACHE_DISK_MB", 512)) * 1024 * 1024), suffix=".pkl")
+    return TieredCache(memory, disk)
+
+
+def create_generation_cache_from_env() -> Optional[DiskCache]:
+    """
+    On-disk cache of generated WAVs
+
+    Stored under GENERATION_CACHE_DIR (empty disables it), bounded by
+    GENERATION_CACHE_MB, with entries expiring after GENERATION_CACHE_TTL_HOURS
+    (0 keeps them until evicted by size).
+    """
+    cache_dir = os.getenv("GENERATION_CACHE_DIR", "generation_cache")
+    if not cache_dir:
+        return None
+    ttl_hours = float(os.getenv("GENERATION_CACHE_TTL_HOURS", 24))
+    return DiskCache(
+        cache_dir,
+        int(float(os.getenv("GENERATION_CACHE_MB", 1024)) * 1024 * 1024),
+        ttl=ttl_hours * 3600 if ttl_hours > 0 else None
+    )
@@ -0,0 +1,103 @@
+"""
+Response encoding: JSON with native numpy support, multipart and raw audio
+"""
+import json
+import uuid
+import base64
+import logging
+from typing import Any, Dict, List, Tuple
+import numpy as np
+
+try:
+    import orjson
+except ImportError:  # stdlib json fallback, slower but equivalent output
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+# Accept types answered with the audio bytes alone
+AUDIO_ACCEPT_TYPES = ("audio/wav", "audio/x-wav", "audio/*", "application/octet-stream")
+
+def _default(obj: Any) -> Any:
+    """Encode values neither serializer handles natively"""
+    if isinstance(obj, np.ndarray):
+        # orjson takes contiguous arrays directly; this covers the rest
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, (bytes, bytearray, memoryview)):
+        return base64.b64encode(obj).decode("ascii")
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+def dumps_json(obj: Any) -> bytes:
+    """
+    Serialize to compact UTF-8 JSON
+
+    Numpy arrays and scalars are accepted anywhere in ``obj``; with orjson
+    installed, arrays are written straight from their buffers without
+    building Python lists. Bytes become base64 strings.
+
+    Args:
+        obj: Value to serialize
+
+    Returns:
+        JSON bytes
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, default=_default, separators=(",", ":")).encode("utf-8")
+
+def encode_multipart(parts: List[Tuple[str, str, bytes]]) -> Tuple[bytes, str]:
+    """
+    Build a multipart/mixed body
+
+    Args:
+        parts: (name, content type, payload) for each part
+
+    Returns:
+        Tuple of (body, content type header including the boundary)
+    """
+    boundary = uuid.uuid4().hex
+    chunks = []
+    for name, content_type, payload in parts:
+        chunks.append(
+            f"--{boundary}\r\n"
+            f"Content-Disposition: attachment; name=\"{name}\"\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(payload)}\r\n\r\n".encode("ascii")
+        )
+        chunks.append(payload)
+        chunks.append(b"\r\n")
+    chunks.append(f"--{boundary}--\r\n".encode("ascii"))
+    return b"".join(chunks), f"multipart/mixed; boundary={boundary}"
+
+def encode_prediction(prediction: Dict[str, Any], accept: str = "application/json") -> Tuple[bytes, str]:
+    """
+    Serialize a handler result according to the requested accept type
+
+    Audio operations put raw WAV bytes under "audio". They are returned
+    as-is for audio accept types, as a JSON metadata part plus an audio
+    part for multipart/*, and base64-encoded under "audio_data" for JSON.
+
+    Args:
+        prediction: Handler output
+        accept: Accept type of the request
+
+    Returns:
+        Tuple of (body, content type)
+    """
+    accept = (accept or "application/json").split(";")[0].strip().lower()
+    audio = prediction.get("audio")
+    if not isinstance(audio, (bytes, bytearray)):
+        return dumps_json(prediction), "application/json"
+
+    audio_type = prediction.get("content_type", "audio/wav")
+    meta = {k: v for k, v in prediction.items() if k != "audio"}
+    if accept in AUDIO_ACCEPT_TYPES:
+        return bytes(audio), audio_type
+    if accept.startswith("multipart/"):
+        return encode_multipart([
+            ("metadata", "application/json", dumps_json(meta)),
+            ("audio", audio_type, bytes(audio))
+        ])
+    return dumps_json({**meta, "audio_data": audio}), "application/json"
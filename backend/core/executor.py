@@ -0,0 +1,158 @@
+"""
+Execution layer that keeps blocking pipeline stages off the asyncio event loop
+"""
+import os
+import asyncio
+import logging
+import functools
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFullError(RuntimeError):
+    """Raised when a stage pool already has its maximum number of pending jobs"""
+
+
+class StagePool:
+    """
+    A worker pool with a bounded admission queue
+
+    Jobs beyond ``max_workers + queue_depth`` are rejected immediately with
+    ``QueueFullError`` instead of piling up behind a long-running model call.
+    """
+
+    def __init__(self, name: str, executor: Executor, max_workers: int, queue_depth: int):
+        self.name = name
+        self.executor = executor
+        self.max_workers = max_workers
+        self.queue_depth = queue_depth
+        self.capacity = max_workers + queue_depth
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+
+    async def run(self, fn: Callable, *args, **kwargs) -> Any:
+        """
+        Run ``fn(*args, **kwargs)`` in this pool and await its result
+
+        Args:
+            fn: Blocking callable to execute
+            *args: Positional arguments for ``fn``
+            **kwargs: Keyword arguments for ``fn``
+
+        Returns:
+            Return value of ``fn``
+        """
+        return await self.run_in(self.executor, fn, *args, **kwargs)
+
+    async def run_in(self, executor: Executor, fn: Callable, *args, **kwargs) -> Any:
+        """Like ``run``, but on another executor while counting against this pool's capacity"""
+        if self.pending >= self.capacity:
+            self.rejected += 1
+            raise QueueFullError(f"{self.name} pool is at capacity ({self.capacity} jobs)")
+
+        # pending is only touched from the event loop thread, so no lock is needed
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            call = functools.partial(fn, *args, **kwargs)
+            return await loop.run_in_executor(executor, call)
+        finally:
+            self.pending -= 1
+            self.completed += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Return current pool utilisation"""
+        return {
+            "workers": self.max_workers,
+            "queue_depth": self.queue_depth,
+            "pending": self.pending,
+            "completed": self.completed,
+            "rejected": self.rejected
+        }
+
+    def shutdown(self) -> None:
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+class StageExecutor:
+    """
+    Routes pipeline stages to CPU and GPU pools
+
+    CPU-bound stages (feature extraction, mixing) run in a thread or process
+    pool. Model inference (Whisper, MusicGen) runs in a dedicated
+    single-consumer pool so the accelerator only ever sees one job at a time.
+    """
+
+    def __init__(
+        self,
+        cpu_workers: Optional[int] = None,
+        cpu_queue_depth: int = 16,
+        cpu_pool_kind: str = "thread",
+        gpu_workers: int = 1,
+        gpu_queue_depth: int = 8
+    ):
+        cpu_workers = cpu_workers or max(1, (os.cpu_count() or 2) - 1)
+
+        if cpu_pool_kind == "process":
+            cpu_executor = ProcessPoolExecutor(max_workers=cpu_workers)
+        elif cpu_pool_kind == "thread":
+            cpu_executor = ThreadPoolExecutor(max_workers=cpu_workers, thread_name_prefix="cpu-stage")
+        else:
+            raise ValueError(f"Unknown CPU pool kind: {cpu_pool_kind}")
+
+        self.cpu = StagePool("cpu", cpu_executor, cpu_workers, cpu_queue_depth)
+        # Stages that mutate caller-owned objects need threads even with a process pool
+        self._cpu_threads = cpu_executor if cpu_pool_kind == "thread" else ThreadPoolExecutor(
+            max_workers=cpu_workers, thread_name_prefix="cpu-thread-stage"
+        )
+        self.gpu = StagePool(
+            "gpu",
+            ThreadPoolExecutor(max_workers=gpu_workers, thread_name_prefix="gpu-stage"),
+            gpu_workers,
+            gpu_queue_depth
+        )
+        logger.info(
+            f"Stage executor ready: cpu={cpu_pool_kind}x{cpu_workers} (queue {cpu_queue_depth}), "
+            f"gpu=thread x{gpu_workers} (queue {gpu_queue_depth})"
+        )
+
+    async def run_cpu(self, fn: Callable, *args, **kwargs) -> Any:
+        """Run a CPU-bound stage. With a process pool, arguments must be picklable."""
+        return await self.cpu.run(fn, *args, **kwargs)
+
+    async def run_cpu_thread(self, fn: Callable, *args, **kwargs) -> Any:
+        """
+        Run a CPU-bound stage in a thread, under the CPU pool's admission limits
+
+        For work on objects the caller keeps using (streaming mixers, open
+        files), which a process pool would only ever see pickled copies of.
+        """
+        return await self.cpu.run_in(self._cpu_threads, fn, *args, **kwargs)
+
+    async def run_gpu(self, fn: Callable, *args, **kwargs) -> Any:
+        """Run a model-inference stage on the single-consumer GPU pool"""
+        return await self.gpu.run(fn, *args, **kwargs)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"cpu": self.cpu.stats(), "gpu": self.gpu.stats()}
+
+    def shutdown(self) -> None:
+        self.cpu.shutdown()
+        self.gpu.shutdown()
+        if self._cpu_threads is not self.cpu.executor:
+            self._cpu_threads.shutdown(wait=False, cancel_futures=True)
+
+
+def create_executor_from_env() -> StageExecutor:
+    """Build a StageExecutor from environment variables"""
+    cpu_workers = os.getenv("CPU_WORKERS")
+    return StageExecutor(
+        cpu_workers=int(cpu_workers) if cpu_workers else None,
+        cpu_queue_depth=int(os.getenv("CPU_QUEUE_DEPTH", 16)),
+        cpu_pool_kind=os.getenv("CPU_POOL_KIND", "thread"),
+        gpu_workers=int(os.getenv("GPU_WORKERS", 1)),
+        gpu_queue_depth=int(os.getenv("GPU_QUEUE_DEPTH", 8))
+    )
@@ -1,31 +1,167 @@
 """
 Audio feature extraction for mood analysis
 """
-import io
+import os
+import base64
 import logging
-from typing import Dict, List, Any
+from typing import Callable, Dict, List, Any, Optional, Tuple, Union
 import numpy as np
 import librosa
-import crepe
 from scipy import signal
 from scipy.stats import stats
 
+from core.audio import AudioInput, as_decoded
+
 logger = logging.getLogger(__name__)
 
-def extract_features(audio_data: bytes, segments: List[Dict]) -> Dict[str, Any]:
+# Bump when the feature output changes so cached analyses are invalidated
+FEATURES_VERSION = "features-v2"
+
+# Pitch is tracked on 10 ms frames at 16 kHz by every backend
+F0_SR = 16000
+F0_HOP = 160
+F0_FMIN = 65.0    # C2
+F0_FMAX = 1047.0  # C6
+
+# An F0 backend takes 16 kHz mono audio and returns (f0 in Hz, confidence)
+# per F0_HOP frame, centered, with f0 = 0 where it finds no pitch
+F0Backend = Callable[[np.ndarray, int], Tuple[np.ndarray, np.ndarray]]
+
+def _crepe_backend(capacity: str) -> F0Backend:
+    def track(audio: np.ndarray, sr: int) -> Tuple[np.ndarray, np.ndarray]:
+        import crepe  # TensorFlow is only loaded when a CREPE backend is used
+        _, f0, confidence, _ = crepe.predict(
+            audio,
+            sr,
+            model_capacity=capacity,
+            viterbi=True,
+            step_size=1000 * F0_HOP // F0_SR,
+            verbose=0
+        )
+        return f0, confidence
+    return track
+
+def _yin_f0(audio: np.ndarray, sr: int) -> Tuple[np.ndarray, np.ndarray]:
+    """YIN pitch, with frames quieter than 30% of the mean RMS marked unvoiced"""
+    frame_length = 1024
+    f0 = librosa.yin(audio, fmin=F0_FMIN, fmax=F0_FMAX, sr=sr, frame_length=frame_length, hop_length=F0_HOP)
+    rms = librosa.feature.rms(y=audio, frame_length=frame_length, hop_length=F0_HOP)[0][:len(f0)]
+    voiced = rms > np.mean(rms) * 0.3
+    return np.where(voiced, f0, 0.0), voiced.astype(np.float32)
+
+def _pyin_f0(audio: np.ndarray, sr: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Probabilistic YIN; voicing probability doubles as confidence"""
+    f0, _, voiced_prob = librosa.pyin(audio, fmin=F0_FMIN, fmax=F0_FMAX, sr=sr, frame_length=1024, hop_length=F0_HOP)
+    return np.nan_to_num(f0, nan=0.0), voiced_prob
+
+F0_BACKENDS: Dict[str, F0Backend] = {
+    "crepe-full": _crepe_backend("full"),
+    "crepe-small": _crepe_backend("small"),
+    "crepe-tiny": _crepe_backend("tiny"),
+    "yin": _yin_f0,
+    "pyin": _pyin_f0
+}
+
+def resolve_f0_config(backend: Optional[str] = None, voiced_only: Optional[bool] = None) -> Tuple[str, bool]:
+    """
+    Fill in the pitch tracking settings a request left unset
+    
+    Defaults come from F0_BACKEND (crepe-full) and F0_VOICED_ONLY (false).
+    
+    Args:
+        backend: Name of an F0 backend
+        voiced_only: Track pitch only inside ASR segments
+        
+    Returns:
+        Tuple of (backend name, voiced_only)
+    """
+    backend = backend or os.getenv("F0_BACKEND", "crepe-full")
+    if backend not in F0_BACKENDS:
+        raise ValueError(f"Unknown F0 backend '{backend}' (choose from {', '.join(F0_BACKENDS)})")
+    if voiced_only is None:
+        voiced_only = os.getenv("F0_VOICED_ONLY", "false").lower() in ("1", "true", "yes")
+    return backend, voiced_only
+
+def _speech_regions(segments: List[Dict], n_samples: int, pad: float = 0.1) -> List[Tuple[int, int]]:
+    """Merged, hop-aligned sample ranges covering the ASR segments"""
+    regions: List[Tuple[int, int]] = []
+    for seg in sorted(segments, key=lambda seg: seg["t0"]):
+        start = max(0, int((seg["t0"] - pad) * F0_SR) // F0_HOP * F0_HOP)
+        end = min(n_samples, -(-int((seg["t1"] + pad) * F0_SR) // F0_HOP) * F0_HOP)
+        if end <= start:
+            continue
+        if regions and start <= regions[-1][1]:
+            regions[-1] = (regions[-1][0], max(regions[-1][1], end))
+        else:
+            regions.append((start, end))
+    return regions
+
+def track_f0(
+    audio_array: np.ndarray,
+    backend: str = "crepe-full",
+    segments: Optional[List[Dict]] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Run an F0 backend over 16 kHz mono audio
+    
+    With ``segments``, only the speech regions are analyzed: they are
+    spliced together, tracked in one call and the results scattered back
+    onto the full-length frame grid, leaving f0 = 0 in between.
+    
+    Args:
+        audio_array: 16 kHz mono samples
+        backend: Name of an F0 backend
+        segments: Optional ASR segments restricting the analysis
+        
+    Returns:
+        Tuple of (f0 in Hz, confidence), one value per 10 ms frame
+    """
+    track = F0_BACKENDS[backend]
+    n_frames = 1 + len(audio_array) // F0_HOP
+    regions = _speech_regions(segments, len(audio_array)) if segments else []
+    if not regions:
+        return track(audio_array, F0_SR)
+    
+    spliced = np.concatenate([audio_array[start:end] for start, end in regions])
+    f0_spliced, conf_spliced = track(spliced, F0_SR)
+    
+    f0 = np.zeros(n_frames, dtype=np.float32)
+    confidence = np.zeros(n_frames, dtype=np.float32)
+    offset = 0
+    for start, end in regions:
+        count = (end - start + F0_HOP - 1) // F0_HOP
+        src = slice(offset, offset + count)
+        dst = slice(start // F0_HOP, start // F0_HOP + len(f0_spliced[src]))
+        f0[dst] = f0_spliced[src]
+        confidence[dst] = conf_spliced[src]
+        offset += count
+    return f0, confidence
+
+def extract_features(
+    audio_data: AudioInput,
+    segments: List[Dict],
+    f0_backend: Optional[str] = None,
+    f0_voiced_only: Optional[bool] = None
+) -> Dict[str, Any]:
     """
     Extract audio features for mood analysis
     
     Args:
-        audio_data: Raw audio bytes
+        audio_data: Raw audio bytes or DecodedAudio
         segments: ASR segments with timestamps
+        f0_backend: Pitch tracker (see F0_BACKENDS); defaults to F0_BACKEND
+        f0_voiced_only: Track pitch only inside ASR segments; defaults to
+            F0_VOICED_ONLY
         
     Returns:
-        Dictionary of extracted features
+        Dictionary of extracted features; curves are numpy arrays
     """
     try:
-        # Load audio
-        audio_array, sr = librosa.load(io.BytesIO(audio_data), sr=16000, mono=True)
+        f0_backend, f0_voiced_only = resolve_f0_config(f0_backend, f0_voiced_only)
+        
+        # 16 kHz mono view (shared with ASR when already decoded)
+        sr = F0_SR
+        audio_array = as_decoded(audio_data).mono(sr)
         duration = len(audio_array) / sr
         
         # Extract energy curve (RMS)
@@ -37,13 +173,11 @@ def extract_features(audio_data: bytes, segments: List[Dict]) -> Dict[str, Any]:
             hop_length=hop_length
         )[0]
         
-        # Extract pitch curve using CREPE
-        f0_curve, confidence = crepe.predict(
+        # Extract pitch curve
+        f0_curve, confidence = track_f0(
             audio_array,
-            sr,
-            model_capacity="full",
-            viterbi=True,
-            step_size=10  # 10ms steps
+            backend=f0_backend,
+            segments=segments if f0_voiced_only else None
         )
         
         # Calculate speech rate (words per minute)
@@ -70,21 +204,22 @@ def extract_features(audio_data: bytes, segments: List[Dict]) -> Dict[str, Any]:
             hop_length=hop_length
         )
         
-        f0_time = np.arange(len(f0_curve)) * 0.01  # 10ms steps
+        f0_time = np.arange(len(f0_curve)) * (F0_HOP / sr)  # 10ms steps
         
         return {
             "energy_curve": {
-                "time": time_frames.tolist(),
-                "values": energy_curve.tolist(),
+                "time": time_frames,
+                "values": energy_curve,
                 "mean": float(energy_mean),
                 "std": float(energy_std)
             },
             "f0_curve": {
-                "time": f0_time.tolist(),
-                "values": f0_curve.tolist(),
-                "confidence": confidence.tolist(),
+                "time": f0_time,
+                "values": f0_curve,
+                "confidence": confidence,
                 "mean": float(f0_mean) if not np.isnan(f0_mean) else 0.0,
-                "std": float(f0_std) if not np.isnan(f0_std) else 0.0
+                "std": float(f0_std) if not np.isnan(f0_std) else 0.0,
+                "backend": f0_backend
             },
             "speech_rate_wpm": float(speech_rate_wpm),
             "pause_timestamps": pause_timestamps,
@@ -95,3 +230,112 @@ def extract_features(audio_data: bytes, segments: List[Dict]) -> Dict[str, Any]:
     except Exception as e:
         logger.error(f"Feature extraction failed: {e}")
         raise
+
+
+# Per-frame fields of each curve reduced by compact_features
+CURVES = {
+    "energy_curve": ["time", "values"],
+    "f0_curve": ["time", "values", "confidence"]
+}
+
+def minmax_indices(values: np.ndarray, max_points: int) -> np.ndarray:
+    """
+    Indices of the min and max sample in each of ``max_points // 2`` buckets
+    
+    Keeping both extremes per bucket preserves peaks and dips that plain
+    striding would skip.
+    
+    Args:
+        values: Curve values
+        max_points: Upper bound on returned indices
+        
+    Returns:
+        Sorted, unique indices into ``values``
+    """
+    n = len(values)
+    n_buckets = max(1, max_points // 2)
+    if n <= max_points:
+        return np.arange(n)
+    size = -(-n // n_buckets)
+    padded = np.pad(values, (0, n_buckets * size - n), mode="edge").reshape(n_buckets, size)
+    offsets = np.arange(n_buckets) * size
+    idx = np.concatenate([offsets + padded.argmin(axis=1), offsets + padded.argmax(axis=1)])
+    return np.unique(np.minimum(idx, n - 1))
+
+def hop_means(values: np.ndarray, size: int, skip_zeros: bool = False) -> np.ndarray:
+    """
+    Mean of each run of ``size`` consecutive values
+    
+    With ``skip_zeros``, zeros (unvoiced pitch frames) are left out of the
+    mean; a run with no nonzero values stays 0.
+    """
+    n_hops = -(-len(values) // size)
+    padded = np.pad(values.astype(np.float64), (0, n_hops * size - len(values))).reshape(n_hops, size)
+    if not skip_zeros:
+        counts = np.full(n_hops, size, dtype=np.float64)
+        counts[-1] = len(values) - (n_hops - 1) * size
+    else:
+        counts = np.count_nonzero(padded, axis=1).astype(np.float64)
+    return np.divide(padded.sum(axis=1), counts, out=np.zeros(n_hops), where=counts > 0)
+
+def encode_array(values: np.ndarray, dtype: str) -> Dict[str, Any]:
+    """Pack an array as base64 little-endian bytes, e.g. dtype "<f2" for float16"""
+    return {
+        "dtype": dtype,
+        "length": int(len(values)),
+        "data": base64.b64encode(np.asarray(values).astype(dtype).tobytes()).decode("ascii")
+    }
+
+def compact_features(
+    features: Dict[str, Any],
+    max_points: Optional[int] = None,
+    hop: Optional[float] = None,
+    encoding: str = "json"
+) -> Dict[str, Any]:
+    """
+    Reduce the energy and pitch curves for transport
+    
+    Resolution is set either by ``hop`` (seconds; each curve is averaged
+    onto a regular grid, unvoiced pitch frames excluded) or by
+    ``max_points`` (min/max decimation). Curves stay numpy arrays for
+    core.encoding.dumps_json; with encoding "f16" they are packed as base64
+    arrays (float32 times, float16 values) instead, so payload size is flat
+    in input length.
+    
+    Args:
+        features: Output of extract_features
+        max_points: Upper bound on points per curve (0 or None = all)
+        hop: Fixed output hop in seconds; takes precedence over max_points
+        encoding: "json" for plain lists or "f16" for base64 arrays
+        
+    Returns:
+        Copy of ``features`` with reduced curves
+    """
+    if encoding not in ("json", "f16"):
+        raise ValueError(f"Unknown curve encoding '{encoding}' (choose json or f16)")
+    
+    compacted = dict(features)
+    for name, fields in CURVES.items():
+        curve = dict(features[name])
+        arrays = {field: np.asarray(curve[field]) for field in fields}
+        n = len(arrays["time"])
+        
+        if hop and n > 1:
+            step = float(arrays["time"][1] - arrays["time"][0])
+            size = max(1, int(round(hop / step)))
+            arrays = {
+                field: arrays["time"][::size] if field == "time"
+                else hop_means(values, size, skip_zeros=(name == "f0_curve" and field == "values"))
+                for field, values in arrays.items()
+            }
+        elif max_points and n > max_points:
+            idx = minmax_indices(arrays["values"], max_points)
+            arrays = {field: values[idx] for field, values in arrays.items()}
+        
+        for field, values in arrays.items():
+            if encoding == "f16":
+                curve[field] = encode_array(values, "<f4" if field == "time" else "<f2")
+            else:
+                curve[field] = values
+        compacted[name] = curve
+    return compacted
@@ -0,0 +1,323 @@
+"""
+Background job queue for long-running compose and script-to-bg requests
+"""
+import os
+import json
+import time
+import uuid
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional
+
+from core.executor import QueueFullError
+
+logger = logging.getLogger(__name__)
+
+# Job states
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+FINISHED_STATES = (SUCCEEDED, FAILED, CANCELLED)
+
+
+class Job:
+    """State of a single submitted job"""
+
+    def __init__(self, kind: str, params: Dict[str, Any]):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.params = params
+        self.status = QUEUED
+        self.progress = 0.0
+        self.stage = "queued"
+        self.error: Optional[str] = None
+        self.result_meta: Dict[str, Any] = {}
+        self.created_at = time.time()
+        self.updated_at = self.created_at
+        self.task: Optional[asyncio.Task] = None
+        # Bumped on every update; each version gets its own event so a
+        # subscriber that wakes late never misses or re-waits on a change
+        self.version = 0
+        self._changed = asyncio.Event()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATES
+
+    def update(self, progress: Optional[float] = None, stage: Optional[str] = None, status: Optional[str] = None) -> None:
+        """Record progress and wake up any subscribers"""
+        if progress is not None:
+            self.progress = max(0.0, min(1.0, float(progress)))
+        if stage is not None:
+            self.stage = stage
+        if status is not None:
+            self.status = status
+        self.updated_at = time.time()
+        self.version += 1
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    async def wait_for_change(self, seen_version: int, timeout: float) -> None:
+        """Wait until the job moves past ``seen_version`` or ``timeout`` elapses"""
+        if self.version != seen_version:
+            return
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "progress": self.progress,
+            "stage": self.stage,
+            "error": self.error,
+            "result": self.result_meta if self.status == SUCCEEDED else None,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at
+        }
+
+
+class JobStore(ABC):
+    """Interface for persisting finished job results"""
+
+    @abstractmethod
+    def save(self, job_id: str, data: bytes, meta: Dict[str, Any]) -> None:
+        ...
+
+    @abstractmethod
+    def load(self, job_id: str) -> Optional[bytes]:
+        ...
+
+    @abstractmethod
+    def load_meta(self, job_id: str) -> Optional[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    def delete(self, job_id: str) -> None:
+        ...
+
+
+class DiskJobStore(JobStore):
+    """Stores each result as ``<job_id>.bin`` plus a ``<job_id>.json`` sidecar"""
+
+    def __init__(self, root: str):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def _paths(self, job_id: str):
+        return self.root / f"{job_id}.bin", self.root / f"{job_id}.json"
+
+    def save(self, job_id: str, data: bytes, meta: Dict[str, Any]) -> None:
+        data_path, meta_path = self._paths(job_id)
+        # Write to temp files first so readers never see a partial result
+        tmp_data = data_path.with_suffix(".bin.tmp")
+        tmp_data.write_bytes(data)
+        tmp_data.replace(data_path)
+        tmp_meta = meta_path.with_suffix(".json.tmp")
+        tmp_meta.write_text(json.dumps(meta))
+        tmp_meta.replace(meta_path)
+
+    def load(self, job_id: str) -> Optional[bytes]:
+        data_path, _ = self._paths(job_id)
+        return data_path.read_bytes() if data_path.exists() else None
+
+    def load_meta(self, job_id: str) -> Optional[Dict[str, Any]]:
+        _, meta_path = self._paths(job_id)
+        return json.loads(meta_path.read_text()) if meta_path.exists() else None
+
+    def delete(self, job_id: str) -> None:
+        for path in self._paths(job_id):
+            path.unlink(missing_ok=True)
+
+
+class MemoryJobStore(JobStore):
+    """Keeps results in process memory (useful for local development)"""
+
+    def __init__(self):
+        self._data: Dict[str, bytes] = {}
+        self._meta: Dict[str, Dict[str, Any]] = {}
+
+    def save(self, job_id: str, data: bytes, meta: Dict[str, Any]) -> None:
+        self._data[job_id] = data
+        self._meta[job_id] = meta
+
+    def load(self, job_id: str) -> Optional[bytes]:
+        return self._data.get(job_id)
+
+    def load_meta(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return self._meta.get(job_id)
+
+    def delete(self, job_id: str) -> None:
+        self._data.pop(job_id, None)
+        self._meta.pop(job_id, None)
+
+
+# A job runner receives the Job (for progress updates) and returns
+# (result bytes, result metadata)
+JobRunner = Callable[[Job], Awaitable[Any]]
+
+
+class JobManager:
+    """
+    Bounded in-process job queue
+
+    Submissions return immediately; a fixed number of worker tasks drain the
+    queue. When the queue is full, ``submit`` raises ``QueueFullError``.
+    """
+
+    def __init__(self, store: JobStore, workers: int = 1, max_queued: int = 32, max_finished: int = 256):
+        self.store = store
+        self.workers = workers
+        self.max_finished = max_finished
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queued)
+        self.jobs: Dict[str, Job] = {}
+        self._runners: Dict[str, JobRunner] = {}
+        self._worker_tasks = []
+        self._stopping = False
+
+    def start(self) -> None:
+        for i in range(self.workers):
+            self._worker_tasks.append(asyncio.create_task(self._worker(i)))
+        logger.info(f"Job manager started with {self.workers} workers, queue size {self.queue.maxsize}")
+
+    async def stop(self) -> None:
+        self._stopping = True
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
+
+    def submit(self, kind: str, params: Dict[str, Any], runner: JobRunner) -> Job:
+        """
+        Enqueue a job
+
+        Args:
+            kind: Job type (e.g. "compose")
+            params: Request parameters, echoed back in status responses
+            runner: Coroutine function doing the actual work
+
+        Returns:
+            The queued Job
+        """
+        job = Job(kind, params)
+        try:
+            self.queue.put_nowait(job)
+        except asyncio.QueueFull:
+            raise QueueFullError(f"Job queue is full ({self.queue.maxsize} jobs)")
+
+        self.jobs[job.id] = job
+        self._runners[job.id] = runner
+        self._prune_finished()
+        logger.info(f"Queued {kind} job {job.id}")
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self.jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """Cancel a queued or running job. Finished jobs are left untouched."""
+        job = self.jobs.get(job_id)
+        if job is None or job.finished:
+            return job
+
+        if job.task is not None:
+            # Running: the worker records the cancellation when the task unwinds
+            job.task.cancel()
+        else:
+            # Still queued: the worker skips it when dequeued
+            job.update(status=CANCELLED, stage="cancelled")
+        return job
+
+    def result(self, job_id: str) -> Optional[bytes]:
+        return self.store.load(job_id)
+
+    async def subscribe(self, job_id: str, heartbeat: float = 15.0) -> AsyncIterator[Dict[str, Any]]:
+        """Yield job snapshots whenever the job changes, until it finishes"""
+        job = self.jobs.get(job_id)
+        if job is None:
+            return
+        while True:
+            version = job.version
+            yield job.to_dict()
+            if job.finished:
+                return
+            await job.wait_for_change(version, heartbeat)
+
+    def stats(self) -> Dict[str, Any]:
+        counts: Dict[str, int] = {}
+        for job in self.jobs.values():
+            counts[job.status] = counts.get(job.status, 0) + 1
+        return {"queued": self.queue.qsize(), "max_queued": self.queue.maxsize, "jobs": counts}
+
+    async def _worker(self, index: int) -> None:
+        while True:
+            job = await self.queue.get()
+            try:
+                if job.status == CANCELLED:
+                    continue
+                await self._run(job)
+            finally:
+                self._runners.pop(job.id, None)
+                self.queue.task_done()
+                # Finished jobs also accumulate when nothing new is submitted
+                self._prune_finished()
+
+    async def _run(self, job: Job) -> None:
+        runner = self._runners[job.id]
+        job.update(status=RUNNING, stage="starting")
+        job.task = asyncio.create_task(runner(job))
+        try:
+            data, meta = await job.task
+            await asyncio.get_running_loop().run_in_executor(None, self.store.save, job.id, data, meta)
+            job.result_meta = meta
+            job.update(progress=1.0, stage="done", status=SUCCEEDED)
+            logger.info(f"Job {job.id} succeeded")
+        except asyncio.CancelledError:
+            if self._stopping:
+                # The worker itself is being shut down
+                raise
+            job.update(stage="cancelled", status=CANCELLED)
+            logger.info(f"Job {job.id} cancelled")
+        except Exception as e:
+            job.error = str(e)
+            job.update(stage="failed", status=FAILED)
+            logger.error(f"Job {job.id} failed: {e}")
+        finally:
+            job.task = None
+
+    def _prune_finished(self) -> None:
+        finished = [job for job in self.jobs.values() if job.finished]
+        if len(finished) <= self.max_finished:
+            return
+        finished.sort(key=lambda j: j.updated_at)
+        for job in finished[:len(finished) - self.max_finished]:
+            self.jobs.pop(job.id, None)
+            self.store.delete(job.id)
+
+
+def create_job_store_from_env() -> JobStore:
+    """Pick the result store named by JOB_STORE (disk or memory)"""
+    kind = os.getenv("JOB_STORE", "disk")
+    if kind == "disk":
+        return DiskJobStore(os.getenv("JOB_STORE_DIR", "job_results"))
+    if kind == "memory":
+        return MemoryJobStore()
+    raise ValueError(f"Unknown job store: {kind}")
+
+
+def create_job_manager_from_env() -> JobManager:
+    """Build a JobManager from environment variables"""
+    return JobManager(
+        store=create_job_store_from_env(),
+        workers=int(os.getenv("JOB_WORKERS", 2)),
+        max_queued=int(os.getenv("JOB_QUEUE_SIZE", 32)),
+        max_finished=int(os.getenv("JOB_RETENTION", 256))
+    )
@@ -2,64 +2,453 @@
 Model loading and initialization for SonicMuse
 """
 import os
-import torch
+import gc
+import time
 import logging
-from typing import Dict, Any
-from faster_whisper import WhisperModel
-from audiocraft.models import MusicGen
-import crepe
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Optional
+import numpy as np
 
 logger = logging.getLogger(__name__)
 
-def load_models() -> Dict[str, Any]:
-    """Load all required models"""
-    models = {}
-    
-    # Set device
-    device = "cuda" if torch.cuda.is_available() else "cpu"
-    logger.info(f"Using device: {device}")
-    
+def get_device() -> str:
+    """MODEL_DEVICE if set (cpu/cuda), otherwise CUDA when available"""
+    device = os.getenv("MODEL_DEVICE", "auto")
+    if device != "auto":
+        return device
+    import torch
+    return "cuda" if torch.cuda.is_available() else "cpu"
+
+def _process_rss() -> int:
+    """Resident set size of this process in bytes (0 where /proc is unavailable)"""
     try:
-        # Load Whisper model
-        logger.info("Loading Whisper model...")
-        model_size = os.getenv("MODEL_SIZE", "small")
-        whisper_model = WhisperModel(
-            f"faster-whisper-{model_size}",
-            device=device,
-            compute_type="float16" if device == "cuda" else "int8"
-        )
-        models["whisper"] = whisper_model
-        logger.info("Whisper model loaded successfully")
-        
-    except Exception as e:
-        logger.error(f"Failed to load Whisper: {e}")
-        raise
-    
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return 0
+
+def _free_vram() -> int:
+    """Free device memory in bytes, seen by any allocator (CTranslate2 included)"""
     try:
-        # Load MusicGen model
-        logger.info("Loading MusicGen model...")
-        musicgen_model = MusicGen.get_model("small")
-        musicgen_model.set_generation_params(
-            duration=30,  # Default duration
-            temperature=1.0,
-            top_k=250,
-            top_p=0.0,
-            cfg_coef=3.0
+        import torch
+    except ImportError:
+        return 0
+    if not torch.cuda.is_available():
+        return 0
+    free, _ = torch.cuda.mem_get_info()
+    return free
+
+class ModelEntry:
+    """A registered model: how to load it, and its state once loaded"""
+
+    def __init__(
+        self,
+        name: str,
+        loader: Callable[[], Any],
+        warmup: Optional[Callable[[Any], None]] = None,
+        label: Optional[str] = None,
+        pinned: bool = False
+    ):
+        self.name = name
+        self.loader = loader
+        self.warmup = warmup
+        self.label = label or name
+        self.pinned = pinned
+        self.model: Any = None
+        self.ram_bytes = 0
+        self.vram_bytes = 0
+        self.load_seconds = 0.0
+        self.loads = 0
+        self.last_used = 0.0
+
+    @property
+    def loaded(self) -> bool:
+        return self.model is not None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "label": self.label,
+            "loaded": self.loaded,
+            "ram_bytes": self.ram_bytes,
+            "vram_bytes": self.vram_bytes,
+            "load_seconds": self.load_seconds,
+            "loads": self.loads,
+            "pinned": self.pinned
+        }
+
+class ModelRegistry:
+    """
+    Loads models on first use and keeps them within a memory budget
+
+    Loads are serialized, so each model is initialized once even when
+    several threads ask for it together, and its RAM/VRAM footprint can be
+    measured as the change in process RSS and free device memory around
+    the load. When a load pushes the total over ``ram_budget`` or
+    ``vram_budget``, least recently used models are evicted. Callers still
+    holding an evicted model keep it alive until they drop it.
+
+    ``registry[name]`` is shorthand for ``registry.get(name)``.
+    """
+
+    def __init__(self, ram_budget: Optional[int] = None, vram_budget: Optional[int] = None, warmup: bool = True):
+        self.ram_budget = ram_budget
+        self.vram_budget = vram_budget
+        self.warmup = warmup
+        self.evictions = 0
+        self._entries: "OrderedDict[str, ModelEntry]" = OrderedDict()
+        self._lock = threading.Lock()       # guards _entries and LRU order
+        self._load_lock = threading.Lock()  # one load at a time
+
+    def register(
+        self,
+        name: str,
+        loader: Callable[[], Any],
+        warmup: Optional[Callable[[Any], None]] = None,
+        label: Optional[str] = None,
+        pinned: bool = False
+    ) -> None:
+        """
+        Register a model without loading it
+
+        Args:
+            name: Registry key
+            loader: Zero-argument callable returning the loaded model
+            warmup: Optional callable run once on the fresh model
+            label: Checkpoint description (e.g. for cache keys), defaults to name
+            pinned: Never evict this model
+        """
+        with self._lock:
+            if name not in self._entries:
+                self._entries[name] = ModelEntry(name, loader, warmup, label, pinned)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._entries
+
+    def __getitem__(self, name: str) -> Any:
+        return self.get(name)
+
+    def label(self, name: str) -> str:
+        return self._entry(name).label
+
+    def get(self, name: str) -> Any:
+        """
+        Return a model, loading it (and evicting others) if needed
+
+        Loading is blocking; call from a worker thread, not the event loop.
+        """
+        entry = self._entry(name)
+        with self._lock:
+            if entry.loaded:
+                return self._touch(entry)
+
+        with self._load_lock:
+            # Another thread may have finished loading while we waited
+            if not entry.loaded:
+                self._load(entry)
+            with self._lock:
+                model = self._touch(entry)
+            self._evict_over_budget(keep=name)
+        return model
+
+    def preload(self, names: Iterable[str]) -> None:
+        """Load (and warm up) models ahead of their first request"""
+        for name in names:
+            self.get(name)
+
+    def evict(self, name: str) -> None:
+        """Drop a loaded model and release its memory"""
+        with self._lock:
+            entry = self._entry(name)
+            if not entry.loaded:
+                return
+            entry.model = None
+            self.evictions += 1
+        logger.info(f"Evicted model {name} (~{entry.ram_bytes >> 20} MB RAM, {entry.vram_bytes >> 20} MB VRAM)")
+        gc.collect()
+        try:
+            import torch
+            if torch.cuda.is_available():
+                torch.cuda.empty_cache()
+        except ImportError:
+            pass
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            loaded = [entry for entry in self._entries.values() if entry.loaded]
+            return {
+                "models": {name: entry.to_dict() for name, entry in self._entries.items()},
+                "ram_bytes": sum(entry.ram_bytes for entry in loaded),
+                "vram_bytes": sum(entry.vram_bytes for entry in loaded),
+                "ram_budget": self.ram_budget,
+                "vram_budget": self.vram_budget,
+                "evictions": self.evictions
+            }
+
+    def _entry(self, name: str) -> ModelEntry:
+        try:
+            return self._entries[name]
+        except KeyError:
+            raise KeyError(f"Unknown model: {name}")
+
+    def _touch(self, entry: ModelEntry) -> Any:
+        entry.last_used = time.time()
+        self._entries.move_to_end(entry.name)
+        return entry.model
+
+    def _load(self, entry: ModelEntry) -> None:
+        logger.info(f"Loading model {entry.name} ({entry.label})...")
+        start = time.time()
+        rss_before, vram_before = _process_rss(), _free_vram()
+        try:
+            model = entry.loader()
+            if self.warmup and entry.warmup is not None:
+                entry.warmup(model)
+        except Exception as e:
+            logger.error(f"Failed to load {entry.name}: {e}")
+            raise
+
+        entry.ram_bytes = max(0, _process_rss() - rss_before)
+        entry.vram_bytes = max(0, vram_before - _free_vram())
+        entry.load_seconds = time.time() - start
+        entry.loads += 1
+        with self._lock:
+            entry.model = model
+        logger.info(
+            f"Model {entry.name} loaded in {entry.load_seconds:.1f}s "
+            f"(~{entry.ram_bytes >> 20} MB RAM, {entry.vram_bytes >> 20} MB VRAM)"
+        )
+
+    def _over_budget(self) -> bool:
+        loaded = [entry for entry in self._entries.values() if entry.loaded]
+        ram = sum(entry.ram_bytes for entry in loaded)
+        vram = sum(entry.vram_bytes for entry in loaded)
+        return bool(
+            (self.ram_budget and ram > self.ram_budget)
+            or (self.vram_budget and vram > self.vram_budget)
         )
-        models["musicgen"] = musicgen_model
-        logger.info("MusicGen model loaded successfully")
-        
-    except Exception as e:
-        logger.error(f"Failed to load MusicGen: {e}")
-        raise
-    
+
+    def _evict_over_budget(self, keep: str) -> None:
+        while True:
+            with self._lock:
+                if not self._over_budget():
+                    return
+                # Least recently used first (OrderedDict order)
+                victim = next(
+                    (entry.name for entry in self._entries.values()
+                     if entry.loaded and not entry.pinned and entry.name != keep),
+                    None
+                )
+            if victim is None:
+                logger.warning("Model memory budget exceeded, but nothing can be evicted")
+                return
+            self.evict(victim)
+
+# Loaders and warm-ups for the models SonicMuse uses
+
+def default_whisper_compute_type(device: str) -> str:
+    return "float16" if device == "cuda" else "int8"
+
+def load_whisper(device: str, compute_type: Optional[str] = None, model_size: Optional[str] = None) -> Any:
+    """
+    Load a Whisper model (MODEL_SIZE by default) with the given CTranslate2 compute type
+
+    A local ``faster-whisper-<size>`` directory is used when present;
+    otherwise faster-whisper downloads the checkpoint by size name.
+    """
+    from faster_whisper import WhisperModel
+
+    model_size = model_size or os.getenv("MODEL_SIZE", "small")
+    local_dir = f"faster-whisper-{model_size}"
+    return WhisperModel(
+        local_dir if os.path.isdir(local_dir) else model_size,
+        device=device,
+        compute_type=compute_type or default_whisper_compute_type(device),
+        # Concurrent transcribe() calls (long-form windows) run in parallel
+        num_workers=int(os.getenv("ASR_WORKERS", 2)),
+        # Threads per worker on CPU (0 = CTranslate2 default)
+        cpu_threads=int(os.getenv("WHISPER_CPU_THREADS", 0))
+    )
+
+def warm_up_whisper(whisper_model: Any) -> None:
+    segments, _ = whisper_model.transcribe(np.zeros(16000, dtype=np.float32), beam_size=1)
+    list(segments)
+
+def cpu_supports_bf16() -> bool:
+    """True if the CPU has native bf16 instructions (AVX512-BF16 or AMX)"""
     try:
-        # Initialize CREPE (no explicit loading needed)
-        logger.info("CREPE initialized")
-        models["crepe"] = True
-        
-    except Exception as e:
-        logger.error(f"Failed to initialize CREPE: {e}")
-        raise
-    
-    return models
+        with open("/proc/cpuinfo") as f:
+            flags = f.read()
+    except OSError:
+        return False
+    return "avx512_bf16" in flags or "amx_bf16" in flags
+
+def configure_torch_threads() -> None:
+    """
+    Apply TORCH_NUM_THREADS / TORCH_INTEROP_THREADS (0 keeps torch's defaults)
+
+    MusicGen decodes one token step at a time, so the work is intra-op;
+    scripts/report_cpu_quantization.py sweeps thread counts per instance.
+    """
+    import torch
+
+    num_threads = int(os.getenv("TORCH_NUM_THREADS", 0))
+    interop_threads = int(os.getenv("TORCH_INTEROP_THREADS", 0))
+    if num_threads:
+        torch.set_num_threads(num_threads)
+    if interop_threads:
+        try:
+            torch.set_num_interop_threads(interop_threads)
+        except RuntimeError as e:
+            # Only settable before the first inter-op parallel work
+            logger.warning(f"TORCH_INTEROP_THREADS not applied: {e}")
+    logger.info(f"Torch CPU threads: {torch.get_num_threads()} intra-op, {torch.get_num_interop_threads()} inter-op")
+
+CPU_PRECISIONS = ("fp32", "int8", "bf16", "auto")
+
+def resolve_cpu_precision(precision: Optional[str] = None) -> str:
+    """
+    MusicGen precision on CPU (default MUSICGEN_CPU_PRECISION, fp32)
+
+    "auto" picks bf16 on CPUs with native bf16 support and int8 otherwise.
+    """
+    precision = precision or os.getenv("MUSICGEN_CPU_PRECISION", "fp32")
+    if precision not in CPU_PRECISIONS:
+        raise ValueError(f"Unknown MusicGen CPU precision '{precision}' (choose from {', '.join(CPU_PRECISIONS)})")
+    if precision == "auto":
+        return "bf16" if cpu_supports_bf16() else "int8"
+    if precision == "bf16" and not cpu_supports_bf16():
+        logger.warning("CPU has no native bf16 support; bf16 MusicGen will be emulated and slow")
+    return precision
+
+def apply_cpu_precision(musicgen_model: Any, precision: str) -> Any:
+    """
+    Convert a CPU MusicGen model to int8 or bf16 in place
+
+    int8 applies dynamic quantization to the language model's nn.Linear
+    layers (feed-forward blocks, output heads and any plain attention
+    projections): weights are stored as int8 and activations are quantized
+    per call. The T5 conditioner and EnCodec decoder stay fp32. bf16 runs
+    token generation under CPU bf16 autocast instead.
+
+    Args:
+        musicgen_model: MusicGen model loaded on CPU
+        precision: fp32, int8 or bf16
+
+    Returns:
+        The same model, with ``precision`` recorded for core.music.model_identity
+    """
+    import torch
+
+    if precision == "int8":
+        # Not the whole LM: its text conditioner reads output_proj.weight directly
+        lm = musicgen_model.lm
+        for module in (lm.transformer, lm.linears):
+            torch.ao.quantization.quantize_dynamic(module, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+    elif precision == "bf16":
+        from audiocraft.utils.autocast import TorchAutocast
+        musicgen_model.autocast = TorchAutocast(enabled=True, device_type="cpu", dtype=torch.bfloat16)
+    musicgen_model.precision = precision
+    logger.info(f"MusicGen running in {precision} on CPU")
+    return musicgen_model
+
+def load_musicgen(model_size: Optional[str] = None, device: Optional[str] = None, precision: Optional[str] = None) -> Any:
+    """
+    Load a MusicGen checkpoint (MUSICGEN_SIZE, default small) on ``device`` (default get_device())
+
+    On CPU, torch threads are configured first and ``precision`` (default
+    MUSICGEN_CPU_PRECISION) selects fp32, int8, bf16 or auto.
+    """
+    from audiocraft.models import MusicGen
+    from core.music import GENERATION_PARAMS
+
+    device = device or get_device()
+    model_size = model_size or os.getenv("MUSICGEN_SIZE", "small")
+    if device == "cpu":
+        configure_torch_threads()
+    musicgen_model = MusicGen.get_pretrained(f"facebook/musicgen-{model_size}", device=device)
+    musicgen_model.set_generation_params(duration=30, **GENERATION_PARAMS)
+    if device == "cpu":
+        apply_cpu_precision(musicgen_model, resolve_cpu_precision(precision))
+    return musicgen_model
+
+def musicgen_label(model_size: Optional[str] = None, device: Optional[str] = None) -> str:
+    """
+    Name load_musicgen's model will report through core.music.model_identity
+
+    Known before loading, so cache keys built from the registry label never
+    share entries across checkpoints or CPU precisions.
+    """
+    model_size = model_size or os.getenv("MUSICGEN_SIZE", "small")
+    name = f"facebook/musicgen-{model_size}"
+    if (device or get_device()) != "cpu":
+        return name
+    precision = resolve_cpu_precision()
+    return name if precision == "fp32" else f"{name}-{precision}"
+
+def warm_up_musicgen(musicgen_model: Any) -> None:
+    from core.music import generate_music_batch
+    generate_music_batch(musicgen_model, ["warm-up"], duration=1, seed=0)
+
+def whisper_name(compute_type: Optional[str] = None) -> str:
+    """Registry key of the Whisper model for a compute type"""
+    if compute_type is None or compute_type == default_whisper_compute_type(get_device()):
+        return "whisper"
+    return f"whisper:{compute_type}"
+
+def get_whisper(models: ModelRegistry, compute_type: Optional[str] = None) -> Any:
+    """
+    Whisper model for a compute type, registering extra variants on first use
+
+    Args:
+        models: Model registry
+        compute_type: CTranslate2 compute type, or None for the default model
+
+    Returns:
+        Loaded Whisper model
+    """
+    name = whisper_name(compute_type)
+    if name not in models:
+        models.register(
+            name,
+            lambda: load_whisper(get_device(), compute_type),
+            warmup=warm_up_whisper,
+            label=f"faster-whisper-{os.getenv('MODEL_SIZE', 'small')}-{compute_type}"
+        )
+    return models.get(name)
+
+def create_model_registry_from_env() -> ModelRegistry:
+    """
+    Registry with Whisper and MusicGen registered (nothing loaded yet)
+
+    MODEL_RAM_BUDGET_MB / MODEL_VRAM_BUDGET_MB bound the loaded models
+    (0 = unlimited); MODEL_WARMUP toggles the warm-up inference.
+    """
+    ram_mb = float(os.getenv("MODEL_RAM_BUDGET_MB", 0))
+    vram_mb = float(os.getenv("MODEL_VRAM_BUDGET_MB", 0))
+    registry = ModelRegistry(
+        ram_budget=int(ram_mb * 1024 * 1024) or None,
+        vram_budget=int(vram_mb * 1024 * 1024) or None,
+        warmup=os.getenv("MODEL_WARMUP", "true").lower() in ("1", "true", "yes")
+    )
+    registry.register(
+        "whisper",
+        lambda: load_whisper(get_device()),
+        warmup=warm_up_whisper,
+        label=f"faster-whisper-{os.getenv('MODEL_SIZE', 'small')}"
+    )
+    registry.register(
+        "musicgen",
+        load_musicgen,
+        warmup=warm_up_musicgen,
+        label=musicgen_label()
+    )
+    return registry
+
+def load_models() -> ModelRegistry:
+    """Create the model registry and load the models listed in MODEL_PRELOAD"""
+    logger.info(f"Using device: {get_device()}")
+    registry = create_model_registry_from_env()
+    preload = [name.strip() for name in os.getenv("MODEL_PRELOAD", "whisper,musicgen").split(",") if name.strip()]
+    registry.preload(preload)
+    return registry
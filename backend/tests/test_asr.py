@@ -0,0 +1,46 @@
+import sys
+from types import SimpleNamespace
+
+import numpy as np
+
+if "faster_whisper" not in sys.modules:
+    try:
+        import faster_whisper  # noqa: F401
+    except ImportError:
+        sys.modules["faster_whisper"] = SimpleNamespace(WhisperModel=object)
+
+from core import asr
+from core.asr import ASR_PROFILES, SAMPLE_RATE, transcribe_long_form
+
+
+class FakeWhisper:
+    """Reports a fixed set of absolute-time segments that overlap each window it is given"""
+
+    def __init__(self, segments, offsets):
+        self.segments = segments
+        self.offsets = offsets
+
+    def transcribe(self, audio, **kwargs):
+        start = self.offsets[len(audio)]
+        end = start + len(audio) / SAMPLE_RATE
+        found = [
+            SimpleNamespace(start=t0 - start, end=t1 - start, text=text, words=None)
+            for t0, t1, text in self.segments
+            if t0 < end and t1 > start
+        ]
+        return iter(found), None
+
+
+def test_segments_in_window_overlap_are_not_duplicated(monkeypatch):
+    # Two padded windows, 0-10.2 s and 9.8-21 s, overlapping by 0.4 s
+    windows = [(0, int(10.2 * SAMPLE_RATE)), (int(9.8 * SAMPLE_RATE), 21 * SAMPLE_RATE)]
+    monkeypatch.setattr(asr, "split_at_silences", lambda audio, max_window: windows)
+    offsets = {end - start: start / SAMPLE_RATE for start, end in windows}
+    whisper = FakeWhisper([(2.0, 4.0, "one"), (9.85, 10.1, "two"), (15.0, 17.0, "three")], offsets)
+
+    segments = transcribe_long_form(
+        np.zeros(21 * SAMPLE_RATE, dtype=np.float32), whisper, workers=2, settings=ASR_PROFILES["balanced"]
+    )
+
+    assert [segment["text"] for segment in segments] == ["one", "two", "three"]
+    assert np.isclose(segments[1]["t0"], 9.85)
@@ -0,0 +1,68 @@
+import asyncio
+
+import pytest
+
+from core.cache import SingleFlight
+
+
+def test_concurrent_calls_share_one_execution():
+    async def scenario():
+        flight = SingleFlight()
+        calls = 0
+
+        async def work():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return "wav"
+
+        results = await asyncio.gather(*(flight.do("key", work) for _ in range(3)))
+        return flight, calls, results
+
+    flight, calls, results = asyncio.run(scenario())
+    assert calls == 1
+    assert results == ["wav"] * 3
+    assert flight.shared == 2
+
+
+def test_cancelling_first_caller_does_not_cancel_others():
+    async def scenario():
+        flight = SingleFlight()
+        release = asyncio.Event()
+
+        async def work():
+            await release.wait()
+            return "wav"
+
+        first = asyncio.create_task(flight.do("key", work))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(flight.do("key", work))
+        await asyncio.sleep(0)
+
+        first.cancel()
+        await asyncio.sleep(0)
+        release.set()
+
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second, flight
+
+    result, flight = asyncio.run(scenario())
+    assert result == "wav"
+    assert flight._inflight == {}
+
+
+def test_failure_reaches_every_caller_and_clears_key():
+    async def scenario():
+        flight = SingleFlight()
+
+        async def work():
+            await asyncio.sleep(0)
+            raise ValueError("boom")
+
+        results = await asyncio.gather(flight.do("key", work), flight.do("key", work), return_exceptions=True)
+        return results, flight
+
+    results, flight = asyncio.run(scenario())
+    assert all(isinstance(r, ValueError) for r in results)
+    assert flight._inflight == {}
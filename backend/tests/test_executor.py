@@ -0,0 +1,46 @@
+import asyncio
+import threading
+
+import pytest
+
+from core.executor import QueueFullError, StageExecutor
+
+
+class Counter:
+    def __init__(self):
+        self.value = 0
+
+    def bump(self):
+        self.value += 1
+        return self.value
+
+
+def test_thread_stages_keep_caller_state_with_process_pool():
+    async def scenario():
+        executor = StageExecutor(cpu_workers=1, cpu_pool_kind="process")
+        try:
+            counter = Counter()
+            for _ in range(3):
+                await executor.run_cpu_thread(counter.bump)
+            return counter.value
+        finally:
+            executor.shutdown()
+
+    assert asyncio.run(scenario()) == 3
+
+
+def test_thread_stages_count_against_cpu_capacity():
+    async def scenario():
+        executor = StageExecutor(cpu_workers=1, cpu_queue_depth=0)
+        release = threading.Event()
+        try:
+            busy = asyncio.create_task(executor.run_cpu_thread(release.wait, 5))
+            await asyncio.sleep(0.01)
+            with pytest.raises(QueueFullError):
+                await executor.run_cpu(sum, [1, 2])
+            release.set()
+            await busy
+        finally:
+            executor.shutdown()
+
+    asyncio.run(scenario())
@@ -0,0 +1,45 @@
+import numpy as np
+
+from core.extend import extension_plan, find_loop_points
+
+SR = 22050
+
+
+def periodic_clip(seconds: float = 28.0, tempo: float = 120.0) -> np.ndarray:
+    """Tone bursts on every beat, cycling through the same four pitches each bar"""
+    audio = np.zeros(int(seconds * SR), dtype=np.float32)
+    beat = int(60.0 / tempo * SR)
+    burst = np.arange(int(0.08 * SR)) / SR
+    envelope = np.exp(-burst * 40)
+    for i, position in enumerate(range(0, len(audio) - len(burst), beat)):
+        frequency = (220.0, 277.2, 329.6, 440.0)[i % 4]
+        audio[position:position + len(burst)] += np.sin(2 * np.pi * frequency * burst) * envelope
+    return audio[:, np.newaxis]
+
+
+def test_periodic_clip_prefers_longest_loop():
+    # Every bar-aligned loop ties, so the chosen one should run to the last bar that fits
+    audio = periodic_clip()
+    points = find_loop_points(audio, SR, min_bars=2)
+    assert points is not None
+    bar = 4 * 60.0 / points["tempo"] * SR
+    assert len(audio) - points["end"] < 2 * bar
+
+
+def test_seed_clip_is_never_extended_again(monkeypatch):
+    monkeypatch.setenv("EXTEND_MIN_SECONDS", "20")
+    monkeypatch.setenv("EXTEND_SEED_SECONDS", "30")
+    monkeypatch.delenv("LONG_FORM_STRATEGY", raising=False)
+
+    seed = extension_plan(120)
+    assert seed == 20
+    assert extension_plan(seed) is None
+
+
+def test_short_requests_are_generated_whole(monkeypatch):
+    monkeypatch.delenv("EXTEND_MIN_SECONDS", raising=False)
+    monkeypatch.delenv("EXTEND_SEED_SECONDS", raising=False)
+    monkeypatch.delenv("LONG_FORM_STRATEGY", raising=False)
+
+    assert extension_plan(30) is None
+    assert extension_plan(90) == 30
@@ -0,0 +1,69 @@
+import asyncio
+
+import pytest
+
+from core.jobs import FINISHED_STATES, SUCCEEDED, Job, JobManager, JobStore, MemoryJobStore
+
+
+def test_late_subscriber_sees_every_transition():
+    async def scenario():
+        job = Job("compose", {})
+        version = job.version
+        job.update(progress=0.5, stage="generating")
+        # The change happened before this subscriber started waiting
+        await asyncio.wait_for(job.wait_for_change(version, timeout=5), 1)
+
+        waiters = [asyncio.create_task(job.wait_for_change(job.version, timeout=5)) for _ in range(3)]
+        await asyncio.sleep(0)
+        job.update(progress=0.75)
+        await asyncio.wait_for(asyncio.gather(*waiters), 1)
+
+    asyncio.run(scenario())
+
+
+def test_subscribe_ends_with_finished_snapshot():
+    async def scenario():
+        manager = JobManager(MemoryJobStore(), workers=1)
+        manager.start()
+
+        async def runner(job):
+            job.update(progress=0.5, stage="working")
+            await asyncio.sleep(0)
+            return b"done", {"size": 4}
+
+        job = manager.submit("compose", {}, runner)
+        snapshots = [s async for s in manager.subscribe(job.id, heartbeat=5)]
+        await manager.stop()
+        return snapshots
+
+    snapshots = asyncio.run(scenario())
+    assert snapshots[-1]["status"] == SUCCEEDED
+    assert snapshots[-1]["result"] == {"size": 4}
+
+
+def test_finished_jobs_are_pruned_without_new_submissions():
+    async def scenario():
+        manager = JobManager(MemoryJobStore(), workers=1, max_finished=2)
+        manager.start()
+
+        async def runner(job):
+            return b"", {}
+
+        submitted = [manager.submit("compose", {}, runner) for _ in range(4)]
+        await manager.queue.join()
+        await manager.stop()
+        return manager, submitted
+
+    manager, submitted = asyncio.run(scenario())
+    assert len(manager.jobs) == 2
+    assert all(job.status in FINISHED_STATES for job in manager.jobs.values())
+    assert submitted[-1].id in manager.jobs
+
+
+def test_partial_store_fails_at_construction():
+    class SaveOnlyStore(JobStore):
+        def save(self, job_id, data, meta):
+            pass
+
+    with pytest.raises(TypeError):
+        SaveOnlyStore()
@@ -0,0 +1,24 @@
+import pytest
+
+from core.models import create_model_registry_from_env, musicgen_label
+
+
+@pytest.mark.parametrize("precision, label", [
+    ("fp32", "facebook/musicgen-small"),
+    ("int8", "facebook/musicgen-small-int8"),
+])
+def test_musicgen_label_includes_cpu_precision(monkeypatch, precision, label):
+    monkeypatch.setenv("MODEL_DEVICE", "cpu")
+    monkeypatch.setenv("MUSICGEN_SIZE", "small")
+    monkeypatch.setenv("MUSICGEN_CPU_PRECISION", precision)
+
+    assert musicgen_label() == label
+    assert create_model_registry_from_env().label("musicgen") == label
+
+
+def test_musicgen_label_ignores_cpu_precision_on_gpu(monkeypatch):
+    monkeypatch.setenv("MODEL_DEVICE", "cuda")
+    monkeypatch.setenv("MUSICGEN_SIZE", "medium")
+    monkeypatch.setenv("MUSICGEN_CPU_PRECISION", "int8")
+
+    assert musicgen_label() == "facebook/musicgen-medium"
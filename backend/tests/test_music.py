@@ -0,0 +1,84 @@
+import sys
+import importlib
+from types import ModuleType, SimpleNamespace
+
+import numpy as np
+import pytest
+
+
+class FakeAudio:
+    """Just enough of a torch tensor for generate_music_windows"""
+
+    def __init__(self, array):
+        self.array = array
+        self.shape = array.shape
+
+    def __getitem__(self, index):
+        return FakeAudio(self.array[index])
+
+    def cpu(self):
+        return self
+
+    def numpy(self):
+        return self.array
+
+
+class FakeMusicGen:
+    sample_rate = 1000
+    frame_rate = 50
+
+    def __init__(self, lock):
+        self.lock = lock
+        self.params_locked = []
+        self.duration = None
+
+    def set_generation_params(self, duration, **params):
+        self.params_locked.append(self.lock.locked())
+        self.duration = duration
+
+    def _audio(self, prompts):
+        return FakeAudio(np.zeros((len(prompts), 1, int(round(self.duration * self.sample_rate))), dtype=np.float32))
+
+    def generate(self, prompts, progress=False):
+        return self._audio(prompts)
+
+    def generate_continuation(self, context, prompt_sample_rate, descriptions, progress=False):
+        return self._audio(descriptions)
+
+
+@pytest.fixture
+def music(monkeypatch):
+    """core.music, with stand-ins for torch/audiocraft where they are missing"""
+    saved = dict(sys.modules)
+    try:
+        import torch  # noqa: F401
+        import audiocraft.models  # noqa: F401
+    except ImportError:
+        # Only the windowing loop is exercised, so stand-ins suffice
+        sys.modules["torch"] = SimpleNamespace(Tensor=object, Generator=object, manual_seed=lambda seed: None)
+        for name in ("audiocraft", "audiocraft.models", "audiocraft.utils", "audiocraft.utils.utils"):
+            sys.modules[name] = ModuleType(name)
+        sys.modules["audiocraft.models"].MusicGen = object
+        sys.modules["audiocraft.utils"].utils = sys.modules["audiocraft.utils.utils"]
+        sys.modules["audiocraft.utils.utils"].multinomial = lambda *args, **kwargs: None
+        sys.modules.pop("core.music", None)
+    module = importlib.import_module("core.music")
+    monkeypatch.setattr(module, "enable_conditioning_cache", lambda model: False)
+    yield module
+    # Drop the stand-ins and anything imported against them
+    for name in set(sys.modules) - set(saved):
+        del sys.modules[name]
+    sys.modules.update(saved)
+
+
+def test_windows_cover_duration_with_params_set_under_lock(music):
+    model = FakeMusicGen(music.RowSeededSampling._lock)
+    chunks = list(music.generate_music_windows(model, ["calm piano"], duration=25, window=10, overlap=2))
+
+    assert sum(chunk.shape[1] for chunk in chunks) == 25 * model.sample_rate
+    assert model.params_locked and all(model.params_locked)
+
+
+def test_window_without_room_past_overlap_is_rejected(music):
+    with pytest.raises(ValueError):
+        list(music.generate_music_windows(FakeMusicGen(music.RowSeededSampling._lock), ["calm piano"], duration=25, window=0.02, overlap=0.01))
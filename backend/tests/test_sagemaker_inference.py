@@ -0,0 +1,63 @@
+import io
+import sys
+import importlib.util
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+HANDLER = Path(__file__).resolve().parents[2] / "sagemaker" / "model" / "inference.py"
+
+
+class FakeWhisperModel:
+    """Stands in for faster_whisper.WhisperModel and counts constructions"""
+
+    instances = 0
+
+    def __init__(self, *args, **kwargs):
+        FakeWhisperModel.instances += 1
+
+    def transcribe(self, audio, **kwargs):
+        segment = SimpleNamespace(start=0.0, end=len(audio) / 16000, text=" hello ", words=None)
+        return iter([segment]), None
+
+
+@pytest.fixture
+def handler(monkeypatch):
+    try:
+        import faster_whisper
+        monkeypatch.setattr(faster_whisper, "WhisperModel", FakeWhisperModel)
+    except ImportError:
+        monkeypatch.setitem(sys.modules, "faster_whisper", SimpleNamespace(WhisperModel=FakeWhisperModel))
+    FakeWhisperModel.instances = 0
+
+    # model_fn only fills in unset variables, so pin them here to have them restored
+    monkeypatch.setenv("SONICMUSE_PROFILE", "small_models")
+    for key, value in {"MODEL_SIZE": "tiny", "MODEL_DEVICE": "cpu", "MODEL_PRELOAD": "whisper",
+                       "LATENCY_BUDGET_MS": "5000", "ASR_PROFILE": "balanced", "F0_BACKEND": "yin"}.items():
+        monkeypatch.setenv(key, value)
+
+    spec = importlib.util.spec_from_file_location("sagemaker_inference", HANDLER)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def wav_bytes(seconds: float = 1.0, sr: int = 16000) -> bytes:
+    buffer = io.BytesIO()
+    sf.write(buffer, np.random.default_rng(0).normal(0, 0.1, int(seconds * sr)).astype(np.float32), sr, format="WAV")
+    return buffer.getvalue()
+
+
+def test_whisper_is_loaded_once_across_requests(handler, tmp_path):
+    config = handler.model_fn(str(tmp_path))
+    assert FakeWhisperModel.instances == 1
+
+    for _ in range(3):
+        result = handler.predict_fn({"operation": "transcribe", "audio_data": wav_bytes()}, config)
+        assert result["transcript"] == "hello"
+
+    assert FakeWhisperModel.instances == 1
+    assert handler.model_fn(str(tmp_path)) is config
@@ -5,9 +5,12 @@ import {
     ComposeRequest,
     ScriptToBgRequest,
     HealthResponse,
+    JobStatus,
     MusicControls
 } from './types';
 
+const JOB_POLL_INTERVAL_MS = 1000;
+
 class SonicMuseAPI {
     private client: AxiosInstance;
 
@@ -112,9 +115,43 @@ class SonicMuseAPI {
         return response.data;
     }
 
+    async getJob(jobId: string): Promise<JobStatus> {
+        const response: AxiosResponse<JobStatus> = await this.client.get(`/jobs/${jobId}`);
+        return response.data;
+    }
+
+    async cancelJob(jobId: string): Promise<JobStatus> {
+        const response: AxiosResponse<JobStatus> = await this.client.delete(`/jobs/${jobId}`);
+        return response.data;
+    }
+
+    // Poll a job until it finishes, then download its result
+    async waitForJob(
+        jobId: string,
+        onProgress?: (job: JobStatus) => void
+    ): Promise<{ job: JobStatus; response: AxiosResponse<Blob> }> {
+        for (;;) {
+            const job = await this.getJob(jobId);
+            onProgress?.(job);
+
+            if (job.status === 'succeeded') {
+                const response = await this.client.get(`/jobs/${jobId}/result`, {
+                    responseType: 'blob',
+                });
+                return { job, response };
+            }
+            if (job.status === 'failed' || job.status === 'cancelled') {
+                throw new Error(job.error || `Job ${job.status}`);
+            }
+
+            await new Promise((resolve) => setTimeout(resolve, JOB_POLL_INTERVAL_MS));
+        }
+    }
+
     async composeMusic(
         file: File,
-        request: ComposeRequest
+        request: ComposeRequest,
+        onProgress?: (job: JobStatus) => void
     ): Promise<{ blob: Blob; prompt: string; processingTime: number }> {
         const formData = new FormData();
         formData.append('file', file);
@@ -122,13 +159,14 @@ class SonicMuseAPI {
         formData.append('seed', request.seed.toString());
         formData.append('intensity', request.intensity.toString());
 
-        const response = await this.client.post('/compose', formData, {
+        const submitted: AxiosResponse<JobStatus> = await this.client.post('/jobs/compose', formData, {
             headers: {
                 'Content-Type': 'multipart/form-data',
             },
-            responseType: 'blob',
         });
 
+        const { response } = await this.waitForJob(submitted.data.job_id, onProgress);
+
         const prompt = response.headers['x-prompt'] || 'Unknown';
         const processingTime = parseFloat(response.headers['x-processing-time'] || '0');
 
@@ -139,20 +177,23 @@ class SonicMuseAPI {
         };
     }
 
-    async scriptToBackground(request: ScriptToBgRequest): Promise<Blob> {
+    async scriptToBackground(
+        request: ScriptToBgRequest,
+        onProgress?: (job: JobStatus) => void
+    ): Promise<Blob> {
         const formData = new FormData();
         formData.append('script', request.script);
         formData.append('duration', request.duration.toString());
         formData.append('style', request.style);
         formData.append('intensity', request.intensity.toString());
 
-        const response = await this.client.post('/script-to-bg', formData, {
+        const submitted: AxiosResponse<JobStatus> = await this.client.post('/jobs/script-to-bg', formData, {
             headers: {
                 'Content-Type': 'multipart/form-data',
             },
-            responseType: 'blob',
         });
 
+        const { response } = await this.waitForJob(submitted.data.job_id, onProgress);
         return response.data;
     }
 }
@@ -64,6 +64,18 @@ export interface HealthResponse {
     };
 }
 
+export interface JobStatus {
+    job_id: string;
+    kind: 'compose' | 'script-to-bg';
+    status: 'queued' | 'running' | 'succeeded' | 'failed' | 'cancelled';
+    progress: number;
+    stage: string;
+    error: string | null;
+    result: Record<string, unknown> | null;
+    created_at: number;
+    updated_at: number;
+}
+
 export interface PresetStyle {
     id: string;
     when: { mood: string };
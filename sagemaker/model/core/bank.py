@@ -0,0 +1,263 @@
+"""
+Pre-rendered preset bank: loopable stems per style, key and tempo bucket
+"""
+import io
+import os
+import json
+import logging
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+import numpy as np
+import soundfile as sf
+
+from core.mix import tile_loop
+from core.music import SAMPLE_RATE
+
+logger = logging.getLogger(__name__)
+
+BANK_VERSION = 2
+
+# build_prompt only varies by style, key and a tempo clamped to 60-160 BPM
+BANK_KEYS = ("Cmaj", "Amin")
+BANK_TEMPOS = tuple(range(60, 161, 10))
+BEATS_PER_BAR = 4
+
+
+def bank_key(style_id: str, key: str, tempo_bpm: int) -> str:
+    return f"{style_id}|{key}|{tempo_bpm}"
+
+
+def loop_frames(tempo_bpm: float, bars: int, sr: int = SAMPLE_RATE) -> int:
+    """Length of ``bars`` bars of 4/4 at ``tempo_bpm``, in frames"""
+    return int(round(bars * BEATS_PER_BAR * 60.0 / tempo_bpm * sr))
+
+
+class PresetBank:
+    """
+    Directory of loopable stems with a JSON index
+
+    Each stem is a WAV holding ``bars`` whole bars, cut at loop points
+    detected in the generated clip, plus ``crossfade`` frames of run-out
+    used to blend each repetition into the next (see core.mix.tile_loop).
+    ``index.json`` maps ``style|key|tempo`` (the requested tempo bucket) to
+    the stem file and its loop metadata, including ``loop_bpm``, the tempo
+    the stem actually plays at.
+    """
+
+    def __init__(self, root: str, max_stretch: float = 0.15):
+        self.root = Path(root)
+        self.max_stretch = max_stretch
+        self._lock = threading.Lock()
+        self._stems: Dict[str, np.ndarray] = {}
+        self.index = self._read_index()
+
+    def _read_index(self) -> Dict[str, Any]:
+        try:
+            with open(self.root / "index.json") as f:
+                index = json.load(f)
+        except FileNotFoundError:
+            return {"version": BANK_VERSION, "sample_rate": SAMPLE_RATE, "entries": {}}
+        if index.get("version") != BANK_VERSION:
+            logger.warning(f"Ignoring preset bank {self.root}: index version {index.get('version')}")
+            return {"version": BANK_VERSION, "sample_rate": SAMPLE_RATE, "entries": {}}
+        return index
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # Picklable for process pools: the lock and stem cache stay behind
+        state = self.__dict__.copy()
+        del state["_lock"]
+        state["_stems"] = {}
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.index["entries"])
+
+    def nearest(self, style_id: str, key: str, tempo_bpm: float) -> Optional[Dict[str, Any]]:
+        """
+        Stem for a style and key with the closest measured tempo
+
+        Returns None when no stem is within ``max_stretch`` of the tempo.
+        """
+        candidates = [
+            entry for entry in self.index["entries"].values()
+            if entry["style_id"] == style_id and entry["key"] == key
+        ]
+        if not candidates:
+            return None
+        entry = min(candidates, key=lambda e: abs(e["loop_bpm"] - tempo_bpm))
+        if abs(tempo_bpm / entry["loop_bpm"] - 1.0) > self.max_stretch:
+            return None
+        return entry
+
+    def load(self, entry: Dict[str, Any]) -> np.ndarray:
+        """Stem samples shaped (frames, channels), cached after first read"""
+        with self._lock:
+            stem = self._stems.get(entry["file"])
+        if stem is None:
+            stem, _ = sf.read(self.root / entry["file"], dtype="float32", always_2d=True)
+            with self._lock:
+                self._stems[entry["file"]] = stem
+        return stem
+
+    def render(self, controls: Dict[str, Any], duration: float) -> Optional[bytes]:
+        """
+        Instant background: nearest stem, stretched to the exact tempo and tiled
+
+        Args:
+            controls: Output of decide_controls (style_id, key, tempo_bpm)
+            duration: Output length in seconds
+
+        Returns:
+            WAV bytes, or None when the bank has no suitable stem
+        """
+        tempo_bpm = float(controls["tempo_bpm"])
+        entry = self.nearest(controls["style_id"], controls["key"], tempo_bpm)
+        if entry is None:
+            return None
+
+        stem = self.load(entry)
+        crossfade = entry["crossfade"]
+        rate = tempo_bpm / entry["loop_bpm"]
+        if abs(rate - 1.0) > 1e-3:
+            import librosa
+            # Phase-vocoder stretch of the short stem only, before tiling
+            stem = np.ascontiguousarray(librosa.effects.time_stretch(stem.T, rate=rate).T, dtype=np.float32)
+            crossfade = int(round(crossfade / rate))
+
+        audio = tile_loop(stem, int(round(duration * SAMPLE_RATE)), crossfade)
+
+        buffer = io.BytesIO()
+        sf.write(buffer, audio, SAMPLE_RATE, format="WAV")
+        logger.info(
+            f"Rendered {duration}s from preset stem {bank_key(entry['style_id'], entry['key'], entry['tempo_bpm'])} "
+            f"at {tempo_bpm:.0f} BPM"
+        )
+        return buffer.getvalue()
+
+    def add(self, entry: Dict[str, Any], stem: np.ndarray) -> None:
+        """Write a stem and record it in the index"""
+        name = bank_key(entry["style_id"], entry["key"], entry["tempo_bpm"])
+        entry = dict(entry, file=f"{entry['style_id']}/{entry['key']}/{entry['tempo_bpm']}.wav")
+        path = self.root / entry["file"]
+        path.parent.mkdir(parents=True, exist_ok=True)
+        sf.write(path, stem, SAMPLE_RATE, format="WAV")
+        with self._lock:
+            self.index["entries"][name] = entry
+            self._stems.pop(entry["file"], None)
+
+    def save_index(self) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp = self.root / "index.json.tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.index, f, indent=2, sort_keys=True)
+        tmp.replace(self.root / "index.json")
+
+
+def build_bank(
+    musicgen_model: Any,
+    bank: PresetBank,
+    styles: Optional[Iterable[str]] = None,
+    keys: Iterable[str] = BANK_KEYS,
+    tempos: Iterable[int] = BANK_TEMPOS,
+    bars: int = 4,
+    crossfade_ms: float = 100.0,
+    seed: int = 42,
+    batch_size: int = 4,
+    overwrite: bool = False
+) -> int:
+    """
+    Generate loopable stems for every (style, key, tempo) combination
+
+    Prompts come from build_prompt, so stems match what /compose would
+    have generated. MusicGen rarely plays exactly at the requested tempo,
+    so each clip is generated a few bars long, cut at the bar-aligned loop
+    found by core.extend.find_loop_points (at least ``bars`` bars) plus a
+    crossfade run-out, and stored with its measured tempo. Clips without a
+    usable beat are skipped. The index is saved after every batch, so an
+    interrupted build can be resumed.
+
+    Args:
+        musicgen_model: Loaded MusicGen model
+        bank: Destination bank
+        styles: Preset ids (default: every PRESET_TABLE entry)
+        keys: Keys to render
+        tempos: Tempo buckets in BPM
+        bars: Shortest loop in 4/4 bars
+        crossfade_ms: Run-out kept after the loop for seamless tiling
+        seed: Random seed for generation
+        batch_size: Prompts per MusicGen call
+        overwrite: Regenerate stems already in the bank
+
+    Returns:
+        Number of stems generated
+    """
+    from core.extend import find_loop_points
+    from core.music import MAX_WINDOW, generate_music_batch, model_identity
+    from core.prompt import PRESET_TABLE, build_prompt
+
+    moods = {preset["id"]: preset["when"]["mood"] for preset in PRESET_TABLE}
+    styles = list(styles or moods)
+    crossfade = int(crossfade_ms / 1000 * SAMPLE_RATE)
+
+    todo: List[Dict[str, Any]] = []
+    for style_id in styles:
+        for key in keys:
+            for tempo_bpm in tempos:
+                if not overwrite and bank_key(style_id, key, tempo_bpm) in bank.index["entries"]:
+                    continue
+                controls = {"mood": moods[style_id], "tempo_bpm": tempo_bpm, "key": key, "style_id": style_id}
+                todo.append({**controls, "prompt": build_prompt(controls)})
+
+    logger.info(f"Building {len(todo)} preset stems into {bank.root}")
+    for start in range(0, len(todo), batch_size):
+        batch = todo[start:start + batch_size]
+        # Room for the loop plus up to two bars of lead-in and one bar to score the seam
+        lengths = [loop_frames(item["tempo_bpm"], bars + 3) + crossfade for item in batch]
+        duration = int(min(np.ceil(max(lengths) / SAMPLE_RATE), MAX_WINDOW))
+        wavs = generate_music_batch(musicgen_model, [item["prompt"] for item in batch], duration=duration, seed=seed)
+
+        for item, wav in zip(batch, wavs):
+            audio, _ = sf.read(io.BytesIO(wav), dtype="float32", always_2d=True)
+            points = find_loop_points(audio, SAMPLE_RATE, min_bars=bars, crossfade=crossfade)
+            if points is None:
+                logger.warning(f"Skipping {item['prompt']}: no {bars}-bar loop found")
+                continue
+            loop_start, loop_end = points["start"], points["end"]
+            bank.add({
+                "style_id": item["style_id"],
+                "key": item["key"],
+                "tempo_bpm": item["tempo_bpm"],
+                "loop_bpm": points["bars"] * BEATS_PER_BAR * 60.0 * SAMPLE_RATE / (loop_end - loop_start),
+                "bars": points["bars"],
+                "crossfade": crossfade,
+                "prompt": item["prompt"],
+                "model": model_identity(musicgen_model),
+                "seed": seed
+            }, audio[loop_start:loop_end + crossfade])
+        bank.save_index()
+        logger.info(f"Preset bank: {min(start + batch_size, len(todo))}/{len(todo)} stems")
+
+    return len(todo)
+
+
+def create_preset_bank_from_env() -> Optional[PresetBank]:
+    """
+    Bank under PRESET_BANK_DIR, or None if it holds no stems
+
+    PRESET_BANK_MAX_STRETCH bounds how far (as a fraction of tempo) a stem
+    is time-stretched before instant mode falls back to generation.
+    """
+    root = os.getenv("PRESET_BANK_DIR", "preset_bank")
+    if not root:
+        return None
+    bank = PresetBank(root, max_stretch=float(os.getenv("PRESET_BANK_MAX_STRETCH", 0.15)))
+    if not len(bank):
+        logger.info(f"No preset bank at {root}; instant compose falls back to generation")
+        return None
+    logger.info(f"Preset bank: {len(bank)} stems from {root}")
+    return bank
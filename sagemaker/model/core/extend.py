@@ -0,0 +1,192 @@
+"""
+Loop-and-extend: arbitrary-length backgrounds from one generated seed clip
+"""
+import io
+import os
+import logging
+from typing import Any, Dict, Optional
+import numpy as np
+import soundfile as sf
+
+from core.mix import equal_power_fades, tile_loop
+
+logger = logging.getLogger(__name__)
+
+BEATS_PER_BAR = 4
+
+
+def find_loop_points(
+    audio: np.ndarray,
+    sr: int,
+    min_bars: int = 2,
+    crossfade: int = 0,
+    hop_length: int = 512
+) -> Optional[Dict[str, Any]]:
+    """
+    Pick a bar-aligned loop in generated music
+
+    Beats are tracked on the onset envelope and assumed to group into 4/4
+    bars starting at the chosen beat. Candidate loops start within the
+    first two bars (skipping the first beat, where generations often ramp
+    in) and span a whole number of bars. A loop scores well when the bar
+    of beat-synchronous chroma and onset strength after its end resembles
+    the bar after its start, since that is where playback jumps back to.
+
+    Args:
+        audio: Samples shaped (frames, channels)
+        sr: Sample rate
+        min_bars: Shortest loop in bars
+        crossfade: Frames needed after the loop end for the seam
+        hop_length: Analysis hop in samples
+
+    Returns:
+        Dict with start/end (frames), tempo (BPM), bars and score, or None
+        when too few beats were found
+    """
+    import librosa
+
+    mono = audio.mean(axis=1) if audio.ndim == 2 else audio
+    onset_env = librosa.onset.onset_strength(y=mono, sr=sr, hop_length=hop_length)
+    tempo, beats = librosa.beat.beat_track(onset_envelope=onset_env, sr=sr, hop_length=hop_length)
+    tempo = float(np.atleast_1d(tempo)[0])
+    if len(beats) < (min_bars + 1) * BEATS_PER_BAR:
+        return None
+
+    # One feature column per beat: chroma for harmony, onset strength for rhythm
+    chroma = librosa.feature.chroma_stft(y=mono, sr=sr, hop_length=hop_length)
+    features = np.vstack([chroma, onset_env[np.newaxis, :chroma.shape[1]] / (onset_env.max() + 1e-9)])
+    beat_features = librosa.util.sync(features, beats, aggregate=np.mean)[:, 1:]  # column i starts at beat i
+    beat_features /= np.linalg.norm(beat_features, axis=0, keepdims=True) + 1e-9
+    beat_samples = librosa.frames_to_samples(beats, hop_length=hop_length)
+
+    candidates = []
+    for start in range(1, 1 + 2 * BEATS_PER_BAR):
+        end = start + min_bars * BEATS_PER_BAR
+        while end < len(beats) and beat_samples[end] + crossfade <= len(mono):
+            width = min(BEATS_PER_BAR, beat_features.shape[1] - end)
+            if width <= 0:
+                break
+            score = float(np.mean(np.sum(
+                beat_features[:, start:start + width] * beat_features[:, end:end + width], axis=0
+            )))
+            candidates.append({
+                "start": int(beat_samples[start]),
+                "end": int(beat_samples[end]),
+                "tempo": tempo,
+                "bars": (end - start) // BEATS_PER_BAR,
+                "score": score
+            })
+            end += BEATS_PER_BAR
+    if not candidates:
+        return None
+
+    # Prefer longer loops on near ties: fewer audible repetitions
+    top = max(candidate["score"] for candidate in candidates)
+    return max(
+        (candidate for candidate in candidates if candidate["score"] >= top - 0.01),
+        key=lambda candidate: (candidate["bars"], candidate["score"])
+    )
+
+
+def extend_audio(
+    audio: np.ndarray,
+    sr: int,
+    n_frames: int,
+    crossfade_ms: float = 50.0,
+    fade_out_ms: float = 500.0
+) -> np.ndarray:
+    """
+    Extend music to ``n_frames`` by looping a bar-aligned section
+
+    The clip plays from the top up to the loop end, then the loop repeats
+    with equal-power seams. Without usable beats the whole clip is looped.
+    The end gets a short fade-out so the cut never clicks.
+
+    Args:
+        audio: Samples shaped (frames, channels)
+        sr: Sample rate
+        n_frames: Output length in frames
+        crossfade_ms: Seam length
+        fade_out_ms: Fade at the very end
+
+    Returns:
+        float32 array shaped (n_frames, channels)
+    """
+    audio = np.asarray(audio, dtype=np.float32)
+    if audio.ndim == 1:
+        audio = audio[:, np.newaxis]
+    if n_frames <= len(audio):
+        return audio[:n_frames].copy()
+
+    crossfade = int(crossfade_ms / 1000 * sr)
+    points = find_loop_points(audio, sr, crossfade=crossfade)
+    if points is None:
+        logger.warning("No beats found in seed clip, looping it whole")
+        start, end = 0, len(audio) - crossfade
+    else:
+        start, end = points["start"], points["end"]
+        logger.info(
+            f"Loop {points['bars']} bars at {points['tempo']:.0f} BPM "
+            f"({start / sr:.2f}-{end / sr:.2f}s, score {points['score']:.2f})"
+        )
+
+    # Intro and first pass play straight through; repeats start at the loop end
+    head = audio[:end]
+    repeats = tile_loop(audio[start:end + crossfade], n_frames - end + crossfade, crossfade)
+    out = np.empty((n_frames, audio.shape[1]), dtype=np.float32)
+    out[:end] = head
+    out[end:] = repeats[crossfade:]
+    if crossfade:
+        # Enter the first repeat the same way tile_loop joins later ones
+        fade_out, fade_in = equal_power_fades(crossfade)
+        out[end:end + crossfade] = audio[start:start + crossfade] * fade_in + audio[end:end + crossfade] * fade_out
+
+    fade = min(int(fade_out_ms / 1000 * sr), n_frames)
+    if fade:
+        out[-fade:] *= np.linspace(1.0, 0.0, fade, dtype=np.float32)[:, np.newaxis]
+    return out
+
+
+def extend_wav(wav_bytes: bytes, duration: float, crossfade_ms: float = 50.0) -> bytes:
+    """
+    Extend a WAV to ``duration`` seconds (see extend_audio)
+
+    Args:
+        wav_bytes: Seed clip
+        duration: Target duration in seconds
+        crossfade_ms: Seam length
+
+    Returns:
+        WAV bytes
+    """
+    try:
+        audio, sr = sf.read(io.BytesIO(wav_bytes), dtype="float32", always_2d=True)
+        extended = extend_audio(audio, sr, int(round(duration * sr)), crossfade_ms=crossfade_ms)
+
+        buffer = io.BytesIO()
+        sf.write(buffer, extended, sr, format="WAV")
+        logger.info(f"Extended {len(audio) / sr:.1f}s seed clip to {duration}s")
+        return buffer.getvalue()
+
+    except Exception as e:
+        logger.error(f"Loop extension failed: {e}")
+        raise
+
+
+def extension_plan(duration: float) -> Optional[int]:
+    """
+    Seed clip length for a requested duration, or None to generate it whole
+
+    Requests longer than EXTEND_MIN_SECONDS (default 30, MusicGen's
+    context; 0 disables extension) generate only EXTEND_SEED_SECONDS
+    (default 30, never more than EXTEND_MIN_SECONDS so the seed itself is
+    generated whole) and loop the rest, capping generation cost. With
+    LONG_FORM_STRATEGY=continue they are generated in full with
+    sliding-window continuation instead (core.music.generate_music_windows).
+    """
+    min_seconds = float(os.getenv("EXTEND_MIN_SECONDS", 30))
+    if os.getenv("LONG_FORM_STRATEGY", "loop") == "continue":
+        return None
+    if min_seconds <= 0 or duration <= min_seconds:
+        return None
+    return int(min(float(os.getenv("EXTEND_SEED_SECONDS", 30)), min_seconds, duration))
@@ -3,94 +3,94 @@ Audio mixing with sidechain ducking
 """
 import io
 import logging
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator, Optional, Tuple, Union
 import numpy as np
-import librosa
 import soundfile as sf
 from scipy import signal
+from scipy.ndimage import minimum_filter1d
 from pydub import AudioSegment
-from pydub.effects import normalize
+
+from core.audio import AudioInput, DecodedAudio, as_decoded
 
 logger = logging.getLogger(__name__)
 
+# Speech activity from the analysis stage: ASR segments with t0/t1 in
+# seconds, or a mask with one value per hop_length frames of dialogue
+SpeechActivity = Union[List[Dict[str, Any]], np.ndarray]
+
+def mix_files(
+    dialogue_file: Any,
+    bg_file: Any,
+    out_file: Any,
+    bg_db: int = -18,
+    ducking: float = 0.3,
+    block_size: int = 65536,
+    speech: Optional[SpeechActivity] = None
+) -> None:
+    """
+    Mix dialogue with background block by block, for inputs of any length
+    
+    Args:
+        dialogue_file: Path or seekable file object with the dialogue
+        bg_file: Path or file object with the background music
+        out_file: Path or file object the WAV is written to
+        bg_db: Background level in dB
+        ducking: Ducking amount (0.0 = no ducking, 1.0 = full ducking)
+        block_size: Dialogue frames processed per block
+        speech: Optional ASR segments or frame-rate mask; when omitted,
+            speech activity is estimated from the dialogue's energy
+    """
+    try:
+        StreamingMixer(
+            dialogue_file, bg_file, bg_db=bg_db, ducking=ducking, block_size=block_size, speech=speech
+        ).write(out_file)
+        logger.info("Streaming audio mixing completed")
+        
+    except Exception as e:
+        logger.error(f"Streaming audio mixing failed: {e}")
+        raise
+
 def mix_with_dialogue(
-    dialogue_data: bytes,
-    bg_data: bytes,
+    dialogue_data: AudioInput,
+    bg_data: AudioInput,
     bg_db: int = -18,
-    ducking: float = 0.3
+    ducking: float = 0.3,
+    speech: Optional[SpeechActivity] = None
 ) -> bytes:
     """
     Mix dialogue with background music using sidechain ducking
     
     Args:
-        dialogue_data: Raw dialogue audio bytes
-        bg_data: Raw background music bytes
+        dialogue_data: Raw dialogue audio bytes or DecodedAudio
+        bg_data: Raw background music bytes or DecodedAudio
         bg_db: Background level in dB
         ducking: Ducking amount (0.0 = no ducking, 1.0 = full ducking)
+        speech: Optional ASR segments (t0/t1) or frame-rate mask from the
+            analysis stage; when omitted, speech activity is estimated
+            from the dialogue's energy
         
     Returns:
         Mixed WAV bytes
     """
     try:
         # Load audio files
-        dialogue_audio = AudioSegment.from_file(io.BytesIO(dialogue_data))
-        bg_audio = AudioSegment.from_file(io.BytesIO(bg_data))
-        
-        # Normalize dialogue to target LUFS (-16 LUFS)
-        dialogue_normalized = normalize(dialogue_audio, headroom=1.0)
-        
-        # Convert to numpy arrays for processing
-        dialogue_array = np.array(dialogue_normalized.get_array_of_samples())
-        if dialogue_normalized.channels == 2:
-            dialogue_array = dialogue_array.reshape((-1, 2))
-        
-        bg_array = np.array(bg_audio.get_array_of_samples())
-        if bg_audio.channels == 2:
-            bg_array = bg_array.reshape((-1, 2))
-        
-        # Ensure same sample rate
-        target_sr = dialogue_normalized.frame_rate
-        if bg_audio.frame_rate != target_sr:
-            bg_audio = bg_audio.set_frame_rate(target_sr)
-            bg_array = np.array(bg_audio.get_array_of_samples())
-            if bg_audio.channels == 2:
-                bg_array = bg_array.reshape((-1, 2))
-        
-        # Create speech activity mask (simplified - would use ASR segments in practice)
-        speech_mask = create_speech_mask(dialogue_array, target_sr)
-        
-        # Apply sidechain ducking
-        ducked_bg = apply_sidechain_ducking(bg_array, speech_mask, ducking)
-        
-        # Set background level
-        bg_level_linear = 10 ** (bg_db / 20)
-        ducked_bg = ducked_bg * bg_level_linear
-        
-        # Mix audio
-        mixed = dialogue_array + ducked_bg
-        
-        # Peak limiting
-        mixed = apply_peak_limiting(mixed)
-        
-        # Convert back to AudioSegment
-        if mixed.ndim == 1:
-            mixed_audio = AudioSegment(
-                mixed.tobytes(),
-                frame_rate=target_sr,
-                sample_width=dialogue_normalized.sample_width,
-                channels=1
-            )
-        else:
-            mixed_audio = AudioSegment(
-                mixed.tobytes(),
-                frame_rate=target_sr,
-                sample_width=dialogue_normalized.sample_width,
-                channels=2
-            )
+        dialogue = as_decoded(dialogue_data)
+        bg = as_decoded(bg_data)
+        
+        mixer = BlockMixer(dialogue, bg.sr, bg_db=bg_db, ducking=ducking, limiter=False, speech=speech)
+        
+        # Mix into one preallocated float32 buffer; dialogue past the end of
+        # the background is flushed without it
+        mixed = np.empty((dialogue.n_frames, mixer.channels), dtype=np.float32)
+        n = len(mixer.mix_block(bg.samples, out=mixed))
+        mixer.mix_block(None, out=mixed[n:])
+        
+        # Look-ahead peak limiting (in place, block by block)
+        mixed = apply_peak_limiting(mixed, sr=mixer.sr)
         
         # Export as WAV
         buffer = io.BytesIO()
-        mixed_audio.export(buffer, format="wav")
+        sf.write(buffer, mixed, mixer.sr, format='WAV', subtype='PCM_16')
         
         logger.info("Audio mixing completed")
         return buffer.getvalue()
@@ -99,16 +99,555 @@ def mix_with_dialogue(
         logger.error(f"Audio mixing failed: {e}")
         raise
 
-def create_speech_mask(audio_array: np.ndarray, sr: int) -> np.ndarray:
+class BlockMixer:
+    """
+    Mixes background audio against decoded dialogue one block at a time
+    
+    Dialogue normalization gain and the speech-activity envelope are
+    computed once up front, the envelope at frame rate. The envelope comes
+    from ``speech`` (ASR segments or a mask) when the caller has one,
+    otherwise from an energy pass over the dialogue. Each background
+    block is then resampled, ducked with the envelope interpolated to
+    sample rate, leveled and summed with the matching stretch of dialogue.
+    mix_with_dialogue runs the whole file as one block; streaming compose
+    feeds it window by window.
+    
+    With ``limiter`` enabled, output passes through a PeakLimiter and lags
+    the input by its look-ahead; call finish() after the last block to
+    drain it.
+    """
+    
+    def __init__(
+        self,
+        dialogue: DecodedAudio,
+        bg_sr: int,
+        bg_db: int = -18,
+        ducking: float = 0.3,
+        limit_db: float = -1.0,
+        hop_length: int = 512,
+        limiter: bool = True,
+        speech: Optional[SpeechActivity] = None
+    ):
+        self.dialogue = dialogue.samples
+        peak = float(np.max(np.abs(dialogue.samples))) if dialogue.n_frames else 0.0
+        speech_frames = speech_frames_from_activity(speech, dialogue.n_frames, dialogue.sr, hop_length)
+        if speech_frames is None:
+            speech_frames = create_speech_mask(dialogue.mono(), dialogue.sr, hop_length=hop_length)
+        self._configure(
+            dialogue.sr, dialogue.channels, dialogue.n_frames, peak, speech_frames,
+            bg_sr, bg_db, ducking, limit_db, hop_length, limiter
+        )
+    
+    def _configure(
+        self,
+        sr: int,
+        dialogue_channels: int,
+        n_frames: int,
+        peak: float,
+        speech_frames: np.ndarray,
+        bg_sr: int,
+        bg_db: int,
+        ducking: float,
+        limit_db: float,
+        hop_length: int,
+        limiter: bool
+    ) -> None:
+        self.sr = sr
+        self.bg_sr = bg_sr
+        self.channels = max(dialogue_channels, 2)
+        self.n_frames = n_frames
+        self.hop_length = hop_length
+        self.limit = 10 ** (limit_db / 20)
+        self.bg_gain = 10 ** (bg_db / 20)
+        self.limiter = PeakLimiter(sr, self.channels, limit_db=limit_db) if limiter else None
+        self.position = 0
+        self.resampler = StreamingResampler(bg_sr, sr)
+        self._bg_tail: Optional[np.ndarray] = None
+        
+        # Peak-normalize dialogue with 1 dB of headroom
+        self.dialogue_gain = np.float32(self.limit / peak if peak > 0 else 1.0)
+        
+        # Ducking gain at frame rate, interpolated per block
+        self.duck_frames = 1.0 - speech_frames.astype(np.float32) * ducking
+        self.frame_times = np.arange(len(self.duck_frames)) * hop_length  # frames are centered on hops
+    
+    @property
+    def remaining(self) -> int:
+        """Dialogue frames not yet mixed"""
+        return max(0, self.n_frames - self.position)
+    
+    def _read_dialogue(self, start: int, n: int) -> np.ndarray:
+        return self.dialogue[start:start + n]
+    
+    def mix_block(
+        self,
+        bg_block: Optional[np.ndarray],
+        out: Optional[np.ndarray] = None,
+        max_frames: Optional[int] = None
+    ) -> np.ndarray:
+        """
+        Mix the next block of background audio
+        
+        The resampler holds back a few samples of look-ahead, so a block's
+        output can be slightly shorter than its input. Passing None marks
+        the end of the background: the held-back samples are flushed and
+        the remaining dialogue is mixed without background.
+        
+        Args:
+            bg_block: Background samples shaped (frames, channels) at bg_sr,
+                or None once the background has ended
+            out: Optional float32 buffer shaped (frames, channels) to write into
+            max_frames: Upper bound on frames produced by this call
+            
+        Returns:
+            Mixed float32 samples shaped (frames, channels) at the dialogue
+            rate; empty once the dialogue is exhausted
+        """
+        if bg_block is None:
+            if self._bg_tail is None:
+                self._bg_tail = self.resampler.flush()
+            bg = self._bg_tail
+            n = self.remaining
+        else:
+            bg = self.resampler.process(bg_block)
+            n = min(len(bg), self.remaining)
+        if max_frames is not None:
+            n = min(n, max_frames)
+        if out is not None:
+            n = min(n, len(out))
+        
+        start = self.position
+        self.position += n
+        
+        out = np.empty((n, self.channels), dtype=np.float32) if out is None else out[:n]
+        
+        # Dialogue (mono broadcasts across output channels)
+        np.multiply(self._read_dialogue(start, n), self.dialogue_gain, out=out)
+        
+        n_bg = min(n, len(bg))
+        if n_bg > 0:
+            if bg.shape[1] not in (1, self.channels):
+                bg = _match_channels(bg, self.channels)
+            gain = np.interp(np.arange(start, start + n_bg), self.frame_times, self.duck_frames).astype(np.float32)
+            gain *= self.bg_gain
+            ducked = bg[:n_bg] * gain[:, np.newaxis]
+            out[:n_bg] += ducked
+        if bg_block is None:
+            self._bg_tail = bg[n_bg:]
+        
+        if self.limiter is not None:
+            return self.limiter.process(out)
+        return out
+    
+    def finish(self) -> np.ndarray:
+        """Drain the limiter's look-ahead once the dialogue is exhausted"""
+        if self.limiter is None:
+            return np.zeros((0, self.channels), dtype=np.float32)
+        return self.limiter.flush()
+
+class StreamingMixer(BlockMixer):
+    """
+    Block mixer that reads dialogue and background from files
+    
+    Dialogue is scanned once in blocks for its peak and per-hop energy,
+    then mixed in a second pass while background blocks are read and
+    resampled on the fly. Memory is bounded by the block size plus the
+    frame-rate envelope (4 bytes per hop), regardless of input length.
+    """
+    
+    def __init__(
+        self,
+        dialogue_file: Any,
+        bg_file: Any,
+        bg_db: int = -18,
+        ducking: float = 0.3,
+        limit_db: float = -1.0,
+        hop_length: int = 512,
+        limiter: bool = True,
+        block_size: int = 65536,
+        speech: Optional[SpeechActivity] = None
+    ):
+        self.dialogue_file = sf.SoundFile(dialogue_file)
+        self.bg_file = sf.SoundFile(bg_file)
+        self.block_size = block_size
+        sr, n_frames = self.dialogue_file.samplerate, self.dialogue_file.frames
+        speech_frames = speech_frames_from_activity(speech, n_frames, sr, hop_length)
+        
+        # Pass 1: peak (and speech energy if not given), one block at a time
+        peak = 0.0
+        power = HopPower(hop_length) if speech_frames is None else None
+        for block in self.dialogue_file.blocks(blocksize=block_size, dtype="float32", always_2d=True):
+            peak = max(peak, float(block.max()), -float(block.min()))
+            if power is not None:
+                power.update(block.mean(axis=1))
+        self.dialogue_file.seek(0)
+        if power is not None:
+            speech_frames = speech_frames_from_power(power.finish())
+        
+        self._configure(
+            sr, self.dialogue_file.channels, n_frames,
+            peak, speech_frames,
+            self.bg_file.samplerate, bg_db, ducking, limit_db, hop_length, limiter
+        )
+    
+    def _read_dialogue(self, start: int, n: int) -> np.ndarray:
+        return self.dialogue_file.read(n, dtype="float32", always_2d=True)
+    
+    def blocks(self) -> Iterator[np.ndarray]:
+        """
+        Pass 2: yield mixed blocks until the dialogue is exhausted
+        
+        Yields:
+            float32 arrays shaped (frames, channels) at the dialogue rate
+        """
+        bg_block_size = max(1, int(self.block_size * self.bg_sr / self.sr))
+        try:
+            while self.remaining > 0:
+                bg_block = self.bg_file.read(bg_block_size, dtype="float32", always_2d=True)
+                if len(bg_block) == 0:
+                    break
+                mixed = self.mix_block(bg_block)
+                if len(mixed):
+                    yield mixed
+            while self.remaining > 0:
+                yield self.mix_block(None, max_frames=self.block_size)
+            tail = self.finish()
+            if len(tail):
+                yield tail
+        finally:
+            self.close()
+    
+    def write(self, out_file: Any) -> None:
+        """Mix everything into a 16-bit WAV file, block by block"""
+        with sf.SoundFile(out_file, "w", samplerate=self.sr, channels=self.channels, format="WAV", subtype="PCM_16") as out:
+            for block in self.blocks():
+                out.write(block)
+    
+    def close(self) -> None:
+        self.dialogue_file.close()
+        self.bg_file.close()
+
+class PeakLimiter:
+    """
+    Look-ahead brickwall limiter that processes audio block by block
+    
+    The signal is delayed by ``lookahead_ms`` so gain reduction can start
+    before a peak arrives. Per-sample required gain is min-filtered over
+    the look-ahead window, smoothed into a linear attack ramp of
+    ``attack_ms`` (at most the look-ahead, which guarantees every sample
+    ends up at or below the ceiling), and released at a constant rate in
+    dB. All of it is vectorized per block; state carried between blocks is
+    a few look-ahead windows long, so memory does not grow with the input.
+    """
+    
+    def __init__(
+        self,
+        sr: int,
+        channels: int,
+        limit_db: float = -1.0,
+        lookahead_ms: float = 5.0,
+        attack_ms: float = 5.0,
+        release_ms: float = 50.0
+    ):
+        """
+        Args:
+            sr: Sample rate
+            channels: Channel count (gain is linked across channels)
+            limit_db: Output ceiling in dBFS
+            lookahead_ms: Look-ahead delay
+            attack_ms: Length of the gain-reduction ramp, capped at lookahead_ms
+            release_ms: Time for the gain to recover by 6 dB
+        """
+        self.limit = 10 ** (limit_db / 20)
+        # Even look-ahead keeps the centered min filter aligned
+        self.lookahead = max(2, 2 * int(round(lookahead_ms * sr / 2000)))
+        self.attack = max(1, min(self.lookahead, int(round(attack_ms * sr / 1000))))
+        self.release = 6.0 / max(1.0, release_ms * sr / 1000)  # dB per sample
+        
+        self._required = np.ones(self.lookahead, dtype=np.float32)  # last required gains
+        self._held = np.ones(self.attack, dtype=np.float32)         # last min-filtered gains
+        self._delay = np.zeros((self.lookahead, channels), dtype=np.float32)
+        self._reduction = 0.0  # current gain reduction in dB
+        self._skip = self.lookahead  # the first outputs are the delay line's zeros
+        self.max_reduction_db = 0.0
+    
+    def process(self, block: np.ndarray) -> np.ndarray:
+        """
+        Limit the next (frames, channels) block
+        
+        Output lags input by the look-ahead, so the first call returns
+        ``lookahead`` fewer frames than it was given; flush() returns them
+        at the end.
+        
+        Returns:
+            Limited float32 samples shaped (frames, channels)
+        """
+        n = len(block)
+        if n == 0:
+            return np.zeros((0, self._delay.shape[1]), dtype=np.float32)
+        L, A = self.lookahead, self.attack
+        
+        # Gain each sample needs to sit at the ceiling (linked across channels)
+        peak = np.abs(block).max(axis=1)
+        required = self.limit / np.maximum(peak, self.limit)
+        
+        # Hold the lowest required gain over the look-ahead window
+        extended = np.concatenate([self._required, required.astype(np.float32, copy=False)])
+        held = minimum_filter1d(extended, size=L + 1)[L // 2:L // 2 + n]
+        self._required = extended[-L:]
+        
+        # Ramp into reductions over the attack window (moving average)
+        held_ext = np.concatenate([self._held, held])
+        csum = np.concatenate([[0.0], np.cumsum(held_ext, dtype=np.float64)])
+        smoothed = (csum[A + 1:] - csum[:-A - 1]) / (A + 1)
+        self._held = held_ext[-A:]
+        
+        # Release at a constant dB rate: r[i] = max(a[i], r[i-1] - release),
+        # solved in closed form with a running maximum
+        reduction = -20.0 * np.log10(np.maximum(smoothed, 1e-10))
+        ramp = self.release * np.arange(n)
+        reduction = np.maximum.accumulate(reduction + ramp) - ramp
+        np.maximum(reduction, self._reduction - self.release * np.arange(1, n + 1), out=reduction)
+        self._reduction = float(reduction[-1])
+        self.max_reduction_db = max(self.max_reduction_db, float(reduction.max()))
+        gain = np.power(10.0, -reduction / 20.0).astype(np.float32)
+        
+        # Apply to the delayed signal
+        delayed = np.concatenate([self._delay, block.astype(np.float32, copy=False)])
+        out = delayed[:n] * gain[:, np.newaxis]
+        self._delay = delayed[n:]
+        
+        if self._skip:
+            skip = min(self._skip, n)
+            self._skip -= skip
+            out = out[skip:]
+        return out
+    
+    def flush(self) -> np.ndarray:
+        """Push the delay line out with silence and return the last frames"""
+        pending = self.lookahead - self._skip
+        out = self.process(np.zeros((self.lookahead, self._delay.shape[1]), dtype=np.float32))
+        return out[:pending]
+
+class StreamingResampler:
+    """
+    Polyphase resampler that can be fed arbitrary blocks
+    
+    Keeps ``pad`` input samples of history and holds back ``pad`` samples
+    of look-ahead so that block boundaries resample exactly as if the
+    signal had been processed in one piece.
+    """
+    
+    def __init__(self, orig_sr: int, target_sr: int):
+        g = int(np.gcd(orig_sr, target_sr))
+        self.up = target_sr // g
+        self.down = orig_sr // g
+        # resample_poly's filter spans 10 * max(up, down) taps at the upsampled rate
+        half_width = int(np.ceil(10 * max(self.up, self.down) / self.up)) + 1
+        self.pad = self.down * int(np.ceil(half_width / self.down))
+        self._buffer: Optional[np.ndarray] = None
+        self._pending = 0
+        self._consumed = 0
+        self._produced = 0
+    
+    @property
+    def passthrough(self) -> bool:
+        return self.up == self.down
+    
+    def process(self, block: np.ndarray) -> np.ndarray:
+        """
+        Feed a (frames, channels) block and get whatever output is ready
+        
+        Returns:
+            Resampled float32 samples shaped (frames, channels)
+        """
+        if block.ndim == 1:
+            block = block[:, np.newaxis]
+        if self.passthrough:
+            return block.astype(np.float32, copy=False)
+        
+        if self._buffer is None:
+            self._buffer = np.zeros((self.pad, block.shape[1]), dtype=np.float32)
+        self._buffer = np.concatenate([self._buffer, block.astype(np.float32, copy=False)])
+        self._pending += len(block)
+        self._consumed += len(block)
+        
+        ready = (self._pending - self.pad) // self.down * self.down
+        if ready <= 0:
+            return np.zeros((0, self._buffer.shape[1]), dtype=np.float32)
+        return self._emit(ready)
+    
+    def flush(self) -> np.ndarray:
+        """Emit everything still held back (zero look-ahead at the end)"""
+        if self.passthrough or self._buffer is None or self._pending == 0:
+            channels = self._buffer.shape[1] if self._buffer is not None else 1
+            return np.zeros((0, channels), dtype=np.float32)
+        
+        ready = -(-self._pending // self.down) * self.down
+        extra = ready - self._pending + self.pad
+        self._buffer = np.concatenate([self._buffer, np.zeros((extra, self._buffer.shape[1]), dtype=np.float32)])
+        self._pending = ready + self.pad
+        out = self._emit(ready)
+        
+        # Trim rounding padding so the total length matches one-shot resampling
+        total = -(-self._consumed * self.up // self.down)
+        excess = self._produced - total
+        if excess > 0:
+            out = out[:len(out) - excess]
+            self._produced = total
+        return out
+    
+    def _emit(self, ready: int) -> np.ndarray:
+        # Resample history + ready region + look-ahead, keep only the ready region
+        segment = self._buffer[:self.pad + ready + self.pad]
+        y = signal.resample_poly(segment, self.up, self.down, axis=0)
+        start = self.pad * self.up // self.down
+        out = y[start:start + ready * self.up // self.down].astype(np.float32, copy=False)
+        
+        self._buffer = self._buffer[ready:]
+        self._pending -= ready
+        self._produced += len(out)
+        return out
+
+def resample_block(block: np.ndarray, orig_sr: int, target_sr: int) -> np.ndarray:
+    """
+    Polyphase resampling of a (frames, channels) block
+    
+    Args:
+        block: Audio samples
+        orig_sr: Source sample rate
+        target_sr: Target sample rate
+        
+    Returns:
+        Resampled float32 samples (the input itself when no resampling is needed)
+    """
+    if block.ndim == 1:
+        block = block[:, np.newaxis]
+    if orig_sr == target_sr:
+        return block.astype(np.float32, copy=False)
+    g = np.gcd(orig_sr, target_sr)
+    return signal.resample_poly(block, target_sr // g, orig_sr // g, axis=0).astype(np.float32, copy=False)
+
+def _match_channels(block: np.ndarray, channels: int) -> np.ndarray:
+    """Up- or down-mix a (frames, channels) block to ``channels``"""
+    if block.ndim == 1:
+        block = block[:, np.newaxis]
+    if block.shape[1] == channels:
+        return block
+    if block.shape[1] == 1:
+        return np.repeat(block, channels, axis=1)
+    mono = block.mean(axis=1, keepdims=True)
+    return np.repeat(mono, channels, axis=1) if channels > 1 else mono
+
+class HopPower:
+    """Accumulates mean signal power per hop over a stream of mono blocks"""
+    
+    def __init__(self, hop_length: int = 512):
+        self.hop_length = hop_length
+        self._carry = np.zeros(0, dtype=np.float32)
+        self._chunks: List[np.ndarray] = []
+    
+    def update(self, mono: np.ndarray) -> None:
+        data = np.concatenate([self._carry, mono.astype(np.float32, copy=False)])
+        n_hops = len(data) // self.hop_length
+        if n_hops:
+            hops = data[:n_hops * self.hop_length].reshape(n_hops, self.hop_length)
+            self._chunks.append(np.einsum("ij,ij->i", hops, hops) / self.hop_length)
+        self._carry = data[n_hops * self.hop_length:]
+    
+    def finish(self) -> np.ndarray:
+        if len(self._carry):
+            self._chunks.append(np.array([np.dot(self._carry, self._carry) / self.hop_length], dtype=np.float32))
+            self._carry = self._carry[:0]
+        return np.concatenate(self._chunks) if self._chunks else np.zeros(0, dtype=np.float32)
+
+def speech_frames_from_power(power: np.ndarray, frame_hops: int = 4) -> np.ndarray:
+    """
+    Threshold per-hop power into a speech activity mask
+    
+    RMS is taken over ``frame_hops`` hops centered on each hop boundary
+    (2048-sample frames for a 512 hop), thresholded at 30% of the mean.
+    
+    Args:
+        power: Mean power per hop
+        frame_hops: Frame length in hops
+        
+    Returns:
+        Speech activity per hop (False = silence, True = speech)
+    """
+    if len(power) == 0:
+        return np.zeros(0, dtype=bool)
+    energy = np.sqrt(np.convolve(power, np.full(frame_hops, 1.0 / frame_hops), mode="same"))
+    threshold = np.mean(energy) * 0.3
+    return energy > threshold
+
+def speech_frames_from_segments(
+    segments: List[Dict[str, Any]],
+    n_hops: int,
+    sr: int,
+    hop_length: int = 512,
+    pad: float = 0.1
+) -> np.ndarray:
     """
-    Create speech activity mask from audio
+    Rasterize ASR segments into a frame-rate speech activity mask
+    
+    Args:
+        segments: Segments with "t0"/"t1" times in seconds
+        n_hops: Number of frames in the mask
+        sr: Dialogue sample rate
+        hop_length: Hop between frames
+        pad: Seconds added on both sides of each segment, so ducking
+            starts just before the first word
+        
+    Returns:
+        Speech activity per frame (False = silence, True = speech)
+    """
+    times = np.arange(n_hops) * (hop_length / sr)
+    starts = np.sort([seg["t0"] - pad for seg in segments])
+    ends = np.sort([seg["t1"] + pad for seg in segments])
+    # Segments that have started minus segments that have ended, per frame
+    open_count = np.searchsorted(starts, times, side="right") - np.searchsorted(ends, times, side="left")
+    return open_count > 0
+
+def speech_frames_from_activity(
+    speech: Optional[SpeechActivity],
+    n_frames: int,
+    sr: int,
+    hop_length: int = 512
+) -> Optional[np.ndarray]:
+    """
+    Frame-rate speech mask from precomputed activity
+    
+    Args:
+        speech: ASR segments or a per-hop mask (bool or 0..1 floats)
+        n_frames: Dialogue length in samples
+        sr: Dialogue sample rate
+        hop_length: Hop between frames
+        
+    Returns:
+        Mask with one entry per hop, or None when no activity was given
+        and the caller should fall back to the energy-based mask
+    """
+    if speech is None or len(speech) == 0:
+        return None
+    n_hops = -(-n_frames // hop_length)
+    if isinstance(speech, np.ndarray):
+        mask = speech.reshape(-1)[:n_hops]
+        # A short mask means the rest is silence
+        return np.pad(mask, (0, n_hops - len(mask)))
+    return speech_frames_from_segments(speech, n_hops, sr, hop_length)
+
+def create_speech_mask(audio_array: np.ndarray, sr: int, hop_length: int = 512) -> np.ndarray:
+    """
+    Create frame-rate speech activity mask from audio
     
     Args:
         audio_array: Audio samples
         sr: Sample rate
+        hop_length: Hop between analysis frames
         
     Returns:
-        Speech activity mask (0 = silence, 1 = speech)
+        Speech activity per frame (False = silence, True = speech)
     """
     try:
         # Convert to mono if stereo
@@ -117,101 +656,119 @@ def create_speech_mask(audio_array: np.ndarray, sr: int) -> np.ndarray:
         else:
             mono = audio_array
         
-        # Calculate RMS energy
-        hop_length = 512
-        frame_length = 2048
-        energy = librosa.feature.rms(
-            y=mono,
-            frame_length=frame_length,
-            hop_length=hop_length
-        )[0]
-        
-        # Threshold for speech detection
-        threshold = np.mean(energy) * 0.3
-        
-        # Create binary mask
-        speech_frames = energy > threshold
-        
-        # Convert back to sample-level mask
-        mask = np.repeat(speech_frames, hop_length)
-        mask = mask[:len(mono)]  # Trim to audio length
-        
-        return mask
+        power = HopPower(hop_length)
+        power.update(mono)
+        return speech_frames_from_power(power.finish())
         
     except Exception as e:
         logger.error(f"Speech mask creation failed: {e}")
-        # Return all-ones mask as fallback
-        return np.ones(len(audio_array) if audio_array.ndim == 1 else audio_array.shape[0])
+        # Return all-speech mask as fallback
+        n = len(audio_array) if audio_array.ndim == 1 else audio_array.shape[0]
+        return np.ones(-(-n // hop_length), dtype=bool)
 
-def apply_sidechain_ducking(
-    bg_array: np.ndarray,
-    speech_mask: np.ndarray,
-    ducking: float
+def apply_peak_limiting(
+    audio_array: np.ndarray,
+    limit_db: float = -1.0,
+    sr: int = 44100,
+    block_size: int = 65536
 ) -> np.ndarray:
     """
-    Apply sidechain ducking to background music
+    Apply look-ahead peak limiting to prevent clipping
+    
+    Only the stretches around peaks are turned down (see PeakLimiter).
+    Float buffers are processed in place, block by block.
     
     Args:
-        bg_array: Background music samples
-        speech_mask: Speech activity mask
-        ducking: Ducking amount (0.0 to 1.0)
+        audio_array: Audio samples shaped (frames,) or (frames, channels)
+        limit_db: Peak limit in dB
+        sr: Sample rate, for the limiter's time constants
+        block_size: Frames processed per block
         
     Returns:
-        Ducking gain curve
+        Limited audio array
     """
     try:
-        # Ensure same length
-        min_length = min(len(bg_array), len(speech_mask))
-        bg_array = bg_array[:min_length]
-        speech_mask = speech_mask[:min_length]
-        
-        # Create ducking gain curve
-        ducking_gain = 1.0 - (speech_mask * ducking)
-        
-        # Apply smoothing to avoid clicks
-        window_size = int(0.01 * 32000)  # 10ms window
-        if window_size > 1:
-            ducking_gain = signal.savgol_filter(ducking_gain, window_size, 3)
-        
-        # Apply ducking
-        if bg_array.ndim == 1:
-            ducked_bg = bg_array * ducking_gain
-        else:
-            ducked_bg = bg_array * ducking_gain[:, np.newaxis]
-        
-        return ducked_bg
+        if not np.issubdtype(audio_array.dtype, np.floating):
+            audio_array = audio_array.astype(np.float32)
+        frames = audio_array if audio_array.ndim == 2 else audio_array[:, np.newaxis]
+        limiter = PeakLimiter(sr, frames.shape[1], limit_db=limit_db)
+        
+        # Output lags input, so it can be written back over frames already read
+        written = 0
+        for start in range(0, len(frames), block_size):
+            out = limiter.process(frames[start:start + block_size])
+            frames[written:written + len(out)] = out
+            written += len(out)
+        out = limiter.flush()
+        frames[written:written + len(out)] = out
+        
+        if limiter.max_reduction_db > 0:
+            logger.info(f"Peak limiter: up to {limiter.max_reduction_db:.1f} dB gain reduction")
+        return audio_array
         
     except Exception as e:
-        logger.error(f"Sidechain ducking failed: {e}")
-        return bg_array
+        logger.error(f"Peak limiting failed: {e}")
+        return audio_array
+
+def equal_power_fades(n: int) -> Tuple[np.ndarray, np.ndarray]:
+    """(fade_out, fade_in) gains whose squares sum to 1, shaped (n, 1)"""
+    t = (np.arange(n, dtype=np.float32) + 0.5) / max(n, 1)
+    return np.cos(t * np.pi / 2)[:, np.newaxis], np.sin(t * np.pi / 2)[:, np.newaxis]
 
-def apply_peak_limiting(audio_array: np.ndarray, limit_db: float = -1.0) -> np.ndarray:
+def tile_loop(loop: np.ndarray, n_frames: int, crossfade: int) -> np.ndarray:
     """
-    Apply peak limiting to prevent clipping
+    Repeat a loop to ``n_frames`` with equal-power crossfades at the seams
+    
+    The last ``crossfade`` frames of ``loop`` are the audio that naturally
+    follows the loop body; at every seam they fade out while the start of
+    the next repetition fades in, so the period is ``len(loop) - crossfade``.
     
     Args:
-        audio_array: Audio samples
-        limit_db: Peak limit in dB
+        loop: Samples shaped (frames, channels)
+        n_frames: Output length in frames
+        crossfade: Seam length in frames
         
     Returns:
-        Limited audio array
+        float32 array shaped (n_frames, channels)
     """
-    try:
-        limit_linear = 10 ** (limit_db / 20)
-        
-        # Find peak level
-        peak = np.max(np.abs(audio_array))
+    crossfade = int(min(max(crossfade, 0), len(loop) // 2))
+    period = len(loop) - crossfade
+    body = loop[:period].astype(np.float32)
+    
+    # The body with its head already blended over the previous tail
+    seamed = body.copy()
+    if crossfade:
+        fade_out, fade_in = equal_power_fades(crossfade)
+        seamed[:crossfade] = body[:crossfade] * fade_in + loop[period:] * fade_out
+    
+    reps = -(-n_frames // period) if n_frames > 0 else 0
+    out = np.concatenate([body] + [seamed] * max(reps - 1, 0)) if reps else body[:0]
+    return out[:n_frames]
+
+def trim_audio(audio_data: bytes, seconds: float) -> bytes:
+    """
+    Cut audio down to its first ``seconds``
+    
+    Args:
+        audio_data: Raw audio bytes
+        seconds: Duration to keep
         
-        if peak > limit_linear:
-            # Apply limiting
-            gain = limit_linear / peak
-            audio_array = audio_array * gain
+    Returns:
+        Trimmed WAV bytes
+    """
+    try:
+        audio_array, sr = sf.read(io.BytesIO(audio_data), always_2d=True)
+        n_samples = int(round(seconds * sr))
+        if n_samples >= len(audio_array):
+            return audio_data
         
-        return audio_array
+        buffer = io.BytesIO()
+        sf.write(buffer, audio_array[:n_samples], sr, format='WAV')
+        return buffer.getvalue()
         
     except Exception as e:
-        logger.error(f"Peak limiting failed: {e}")
-        return audio_array
+        logger.error(f"Trimming failed: {e}")
+        raise
 
 def crossfade_sections(section_audios: List[bytes], crossfade_ms: int = 500) -> bytes:
     """
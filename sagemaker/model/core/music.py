@@ -2,15 +2,164 @@
 Music generation using MusicGen
 """
 import io
+import os
 import logging
-from typing import Optional, List
+import threading
+from contextlib import contextmanager
+from typing import Iterator, Optional, List
 import torch
 import numpy as np
 from audiocraft.models import MusicGen
 import soundfile as sf
 
+from core.cache import LRUCache, hash_key
+
 logger = logging.getLogger(__name__)
 
+# Output rate of every MusicGen checkpoint
+SAMPLE_RATE = 32000
+
+# Longest clip MusicGen attends to in one pass; longer clips are generated
+# as overlapping continuation windows
+MAX_WINDOW = 30.0
+
+# Sampling parameters used for every generation
+GENERATION_PARAMS = {
+    "temperature": 1.0,
+    "top_k": 250,
+    "top_p": 0.0,
+    "cfg_coef": 3.0
+}
+
+def model_identity(musicgen_model: MusicGen) -> str:
+    """Name identifying the loaded checkpoint and CPU precision, for use in cache keys"""
+    name = getattr(musicgen_model, "name", None) or "musicgen-small"
+    precision = getattr(musicgen_model, "precision", "fp32")
+    return name if precision == "fp32" else f"{name}-{precision}"
+
+def _create_conditioning_cache_from_env() -> Optional[LRUCache]:
+    """Text-embedding LRU sized by MUSICGEN_CONDITIONING_CACHE_MB (0 disables it)"""
+    max_mb = float(os.getenv("MUSICGEN_CONDITIONING_CACHE_MB", 64))
+    if max_mb <= 0:
+        return None
+    return LRUCache(int(max_mb * 1024 * 1024), sizeof=lambda embeds: embeds.element_size() * embeds.nelement())
+
+# Encoded prompts (T5 output per prompt, including the empty CFG null
+# condition), keyed by model and prompt text
+CONDITIONING_CACHE = _create_conditioning_cache_from_env()
+
+# Key carrying the raw prompts from tokenize() to forward()
+_TEXTS_KEY = "_sonicmuse_texts"
+
+def enable_conditioning_cache(musicgen_model: MusicGen, cache: Optional[LRUCache] = None) -> bool:
+    """
+    Serve MusicGen's text-encoder output from an LRU cache
+    
+    Wraps the model's T5 "description" conditioner. Every generate call
+    encodes its prompts plus the empty prompts used as classifier-free
+    guidance null conditions; with the cache, a batch whose prompts have
+    all been seen skips the T5 forward pass and is rebuilt from cached
+    per-prompt embeddings, zero-padded to the same length the tokenizer
+    produced, so generation is unchanged. Idempotent.
+    
+    Args:
+        musicgen_model: Loaded MusicGen model
+        cache: Cache to use (default CONDITIONING_CACHE)
+        
+    Returns:
+        True if the cache is active for this model
+    """
+    cache = cache or CONDITIONING_CACHE
+    if cache is None:
+        return False
+    try:
+        conditioner = musicgen_model.lm.condition_provider.conditioners["description"]
+    except (AttributeError, KeyError, TypeError):
+        return False
+    if getattr(conditioner, "_conditioning_cache", None) is not None:
+        return True
+    
+    model_id = model_identity(musicgen_model)
+    tokenize, forward = conditioner.tokenize, conditioner.forward
+    
+    def cached_tokenize(texts):
+        inputs = tokenize(texts)
+        inputs[_TEXTS_KEY] = [text or "" for text in texts]
+        return inputs
+    
+    def cached_forward(inputs):
+        texts = inputs.pop(_TEXTS_KEY, None)
+        if texts is None:
+            return forward(inputs)
+        
+        mask = inputs["attention_mask"]
+        keys = [hash_key(model_id, text) for text in texts]
+        rows = [cache.get(key) for key in keys]
+        if any(row is None for row in rows) or not any(len(row) for row in rows):
+            embeds, mask = forward(inputs)
+            for i, key in enumerate(keys):
+                if rows[i] is None:
+                    cache.put(key, embeds[i, :int(mask[i].sum())].detach().clone())
+            return embeds, mask
+        
+        sample = next(row for row in rows if len(row))
+        embeds = torch.zeros(
+            (len(rows), mask.shape[1], sample.shape[-1]), dtype=sample.dtype, device=sample.device
+        )
+        for i, row in enumerate(rows):
+            embeds[i, :len(row)] = row
+        return embeds, mask
+    
+    conditioner.tokenize = cached_tokenize
+    conditioner.forward = cached_forward
+    conditioner._conditioning_cache = cache
+    logger.info(f"Text-conditioning cache enabled for {model_id}")
+    return True
+
+class RowSeededSampling:
+    """
+    Draw each batch row's tokens from its own seeded generator
+    
+    MusicGen samples every step with one ``torch.multinomial`` over the
+    whole batch, so under a single global seed a row's tokens depend on the
+    rows sampled alongside it. While ``active()`` is entered, audiocraft's
+    multinomial helper (used by its top-k, top-p and plain sampling) draws
+    row ``i`` from a generator seeded with ``seeds[i]``, which makes a
+    prompt's output the same whether it runs alone or in a batch.
+    Generators persist across ``active()`` blocks, so continuation windows
+    keep advancing the same per-row streams.
+    """
+    
+    _lock = threading.Lock()
+    
+    def __init__(self, seeds: List[int]):
+        self.seeds = [int(seed) for seed in seeds]
+        self._generators: Optional[List[torch.Generator]] = None
+        self._original = None
+    
+    def _multinomial(self, input: torch.Tensor, num_samples: int, replacement: bool = False, *, generator=None):
+        if generator is not None or input.dim() < 2 or input.shape[0] != len(self.seeds):
+            return self._original(input, num_samples, replacement=replacement, generator=generator)
+        if self._generators is None:
+            self._generators = [torch.Generator(device=input.device).manual_seed(seed) for seed in self.seeds]
+        rows = [
+            self._original(row, num_samples, replacement=replacement, generator=row_generator)
+            for row, row_generator in zip(input, self._generators)
+        ]
+        return torch.stack(rows)
+    
+    @contextmanager
+    def active(self):
+        from audiocraft.utils import utils as audiocraft_utils
+        
+        with self._lock:
+            self._original = audiocraft_utils.multinomial
+            audiocraft_utils.multinomial = self._multinomial
+            try:
+                yield self
+            finally:
+                audiocraft_utils.multinomial = self._original
+
 def generate_music(
     musicgen_model: MusicGen,
     prompt: str,
@@ -35,48 +184,208 @@ def generate_music(
     Returns:
         WAV audio bytes
     """
+    return generate_music_batch(musicgen_model, [prompt], duration=duration, seed=seed)[0]
+
+def generate_music_batch(
+    musicgen_model: MusicGen,
+    prompts: List[str],
+    duration: int = 30,
+    seed: int = 42
+) -> List[bytes]:
+    """
+    Generate one clip per prompt in a single batched MusicGen call
+    
+    All prompts share the duration, seed and sampling parameters. Each
+    prompt samples from its own generator seeded with ``seed`` (see
+    RowSeededSampling), so its output matches a single-prompt call with
+    the same seed whatever else is in the batch. Durations past
+    MAX_WINDOW are generated in continuation windows of
+    MUSICGEN_LONGFORM_WINDOW seconds overlapping by
+    MUSICGEN_LONGFORM_OVERLAP (see generate_music_windows).
+    
+    Args:
+        musicgen_model: Loaded MusicGen model
+        prompts: Text prompts for generation
+        duration: Duration in seconds
+        seed: Random seed for reproducibility
+        
+    Returns:
+        List of WAV audio bytes, in prompt order
+    """
     try:
+        enable_conditioning_cache(musicgen_model)
+        
+        if duration > MAX_WINDOW:
+            windows = generate_music_windows(
+                musicgen_model,
+                prompts,
+                duration=duration,
+                seed=seed,
+                window=float(os.getenv("MUSICGEN_LONGFORM_WINDOW", MAX_WINDOW)),
+                overlap=float(os.getenv("MUSICGEN_LONGFORM_OVERLAP", 10))
+            )
+            wav_list = _encode_windows(windows, len(prompts))
+            logger.info(f"Generated {len(wav_list)} x {duration}s of music in windows")
+            return wav_list
+        
         # Set random seed for reproducibility
         torch.manual_seed(seed)
         np.random.seed(seed)
         
-        # Set generation parameters
-        musicgen_model.set_generation_params(
-            duration=duration,
-            temperature=1.0,
-            top_k=250,
-            top_p=0.0,
-            cfg_coef=3.0
-        )
-        
         # Generate music
-        logger.info(f"Generating music with prompt: {prompt}")
+        logger.info(f"Generating music for {len(prompts)} prompt(s): {prompts}")
         
-        # MusicGen expects a list of prompts
-        wav = musicgen_model.generate([prompt], progress=True)
+        # Generation params live on the shared model, so set them under the sampling lock
+        with RowSeededSampling([seed] * len(prompts)).active():
+            musicgen_model.set_generation_params(duration=duration, **GENERATION_PARAMS)
+            wav = musicgen_model.generate(list(prompts), progress=True)
         
         # Convert to numpy array and ensure proper format
         if isinstance(wav, torch.Tensor):
             wav = wav.cpu().numpy()
         
-        # Handle batch dimension
-        if wav.ndim == 3:
-            wav = wav[0]  # Take first (and only) sample
-        
-        # Ensure stereo output
-        if wav.ndim == 1:
-            wav = np.stack([wav, wav])  # Mono to stereo
-        elif wav.shape[0] == 1:
-            wav = np.repeat(wav, 2, axis=0)  # Mono to stereo
+        # Handle missing batch dimension
+        if wav.ndim < 3:
+            wav = wav[np.newaxis]
         
-        # Convert to bytes
-        buffer = io.BytesIO()
-        sf.write(buffer, wav.T, 32000, format='WAV')  # MusicGen uses 32kHz
-        wav_bytes = buffer.getvalue()
+        wav_list = [_to_wav_bytes(sample) for sample in wav]
         
-        logger.info(f"Generated {duration}s of music")
-        return wav_bytes
+        logger.info(f"Generated {len(wav_list)} x {duration}s of music")
+        return wav_list
         
     except Exception as e:
         logger.error(f"Music generation failed: {e}")
         raise
+
+def generate_music_stream(
+    musicgen_model: MusicGen,
+    prompt: str,
+    duration: int = 30,
+    seed: int = 42,
+    window: float = 10.0,
+    overlap: float = 2.0
+) -> Iterator[np.ndarray]:
+    """
+    Generate music window by window, yielding audio as soon as it exists
+    
+    Single-prompt form of generate_music_windows.
+    
+    Args:
+        musicgen_model: Loaded MusicGen model
+        prompt: Text prompt for generation
+        duration: Total duration in seconds
+        seed: Random seed for reproducibility
+        window: Seconds generated per model call (including overlap)
+        overlap: Seconds of previous audio used as continuation context
+        
+    Yields:
+        float32 arrays shaped (samples, 2) at the model sample rate
+    """
+    for chunk in generate_music_windows(musicgen_model, [prompt], duration, seed, window, overlap):
+        yield chunk[0]
+
+def generate_music_windows(
+    musicgen_model: MusicGen,
+    prompts: List[str],
+    duration: float = 30,
+    seed: int = 42,
+    window: float = 10.0,
+    overlap: float = 2.0
+) -> Iterator[np.ndarray]:
+    """
+    Sliding-window long-form generation for a batch of prompts
+    
+    The first window is generated from the prompts alone; each later window
+    is a MusicGen continuation conditioned on the last ``overlap`` seconds
+    of the previous one. Only new audio is yielded, and only the context
+    is kept between windows, so memory is bounded by the window size
+    whatever the duration. Consumers can encode or send each window as
+    soon as it arrives.
+    
+    Args:
+        musicgen_model: Loaded MusicGen model
+        prompts: Text prompts for generation
+        duration: Total duration in seconds
+        seed: Random seed for reproducibility
+        window: Seconds generated per model call (including overlap),
+            at most MAX_WINDOW
+        overlap: Seconds of previous audio used as continuation context
+        
+    Yields:
+        float32 arrays shaped (prompts, samples, 2) at the model sample rate
+    
+    Raises:
+        ValueError: If a continuation step is shorter than one token frame
+    """
+    sr = musicgen_model.sample_rate
+    frame_rate = getattr(musicgen_model, "frame_rate", 50)
+    window = min(window, MAX_WINDOW)
+    enable_conditioning_cache(musicgen_model)
+    overlap = min(overlap, window / 2)
+    if int((window - overlap) * frame_rate) < 1:
+        raise ValueError(f"Window {window}s minus overlap {overlap}s is shorter than one {1000 / frame_rate:.0f} ms frame")
+    
+    torch.manual_seed(seed)
+    np.random.seed(seed)
+    sampling = RowSeededSampling([seed] * len(prompts))
+    
+    generated = 0.0
+    context = None
+    # Stop once less than one frame is left to generate
+    while duration - generated >= 1 / frame_rate:
+        if context is None:
+            length = min(window, duration)
+            with sampling.active():
+                musicgen_model.set_generation_params(duration=length, **GENERATION_PARAMS)
+                wav = musicgen_model.generate(list(prompts), progress=False)
+            new_audio = wav
+        else:
+            length = min(window - overlap, duration - generated)
+            with sampling.active():
+                musicgen_model.set_generation_params(duration=overlap + length, **GENERATION_PARAMS)
+                wav = musicgen_model.generate_continuation(
+                    context,
+                    prompt_sample_rate=sr,
+                    descriptions=list(prompts),
+                    progress=False
+                )
+            new_audio = wav[:, :, context.shape[-1]:]
+        if new_audio.shape[-1] == 0:
+            raise ValueError(f"Continuation window made no progress at {generated:.2f}/{duration}s")
+        
+        # Keep only the continuation context; everything else is released
+        context = new_audio[:, :, -int(overlap * sr):] if overlap > 0 else new_audio[:, :, :0]
+        generated += new_audio.shape[-1] / sr
+        logger.info(f"Generated window {generated:.1f}/{duration}s of music")
+        
+        chunk = new_audio.cpu().numpy().transpose(0, 2, 1).astype(np.float32)
+        if chunk.shape[2] == 1:
+            chunk = np.repeat(chunk, 2, axis=2)  # Mono to stereo
+        yield chunk
+
+def _encode_windows(windows: Iterator[np.ndarray], n_clips: int) -> List[bytes]:
+    """Write generated windows into one 16-bit WAV per clip as they arrive"""
+    buffers = [io.BytesIO() for _ in range(n_clips)]
+    writers = [sf.SoundFile(buffer, mode="w", samplerate=SAMPLE_RATE, channels=2, format="WAV", subtype="PCM_16")
+               for buffer in buffers]
+    try:
+        for chunk in windows:
+            for writer, clip in zip(writers, chunk):
+                writer.write(clip)
+    finally:
+        for writer in writers:
+            writer.close()
+    return [buffer.getvalue() for buffer in buffers]
+
+def _to_wav_bytes(wav: np.ndarray) -> bytes:
+    """Encode a (channels, samples) MusicGen output as stereo 32 kHz WAV"""
+    # Ensure stereo output
+    if wav.ndim == 1:
+        wav = np.stack([wav, wav])  # Mono to stereo
+    elif wav.shape[0] == 1:
+        wav = np.repeat(wav, 2, axis=0)  # Mono to stereo
+    
+    # Convert to bytes
+    buffer = io.BytesIO()
+    sf.write(buffer, wav.T, SAMPLE_RATE, format='WAV')
+    return buffer.getvalue()
@@ -1,89 +1,359 @@
 """
-Approach 4: CPU-Only Instance Type
-Target: ml.m5.xlarge (4 vCPU, 16 GB RAM) or ml.m5.2xlarge (8 vCPU, 32 GB RAM)
+SageMaker inference script for SonicMuse
+
+One handler for every deployment. The profile is chosen by
+SONICMUSE_PROFILE (usually set in environment.json) and decides which
+models are loaded, their sizes and device, eager vs lazy loading and which
+operations the endpoint accepts. All operations run the same core pipeline
+as the FastAPI backend.
 """
+import io
 import os
 import json
+import time
 import logging
-import soundfile as sf
+from typing import Dict, Any, Tuple
+
 import numpy as np
+import soundfile as sf
 
-# Set up logging
+# Configure logging
+logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 logger.setLevel(os.environ.get('SM_LOG_LEVEL', 'INFO').upper())
 
-def model_fn(model_dir):
-    """CPU-only model for larger CPU instances"""
-    logger.info("Loading CPU-only models for large instance")
-    
+# Deployment profiles. "env" holds defaults for the core.models settings
+# (environment.json and the container environment take precedence);
+# "require_models" makes a failed preload fail model_fn.
+PROFILES: Dict[str, Dict[str, Any]] = {
+    "full": {
+        "description": "Whisper + MusicGen loaded at startup (GPU instance)",
+        "env": {"MODEL_PRELOAD": "whisper,musicgen"},
+        "operations": ["health", "stats", "transcribe", "analyze", "generate", "compose"],
+        "default_operation": "compose",
+        "require_models": True
+    },
+    "optimized": {
+        "description": "Whisper + MusicGen preloaded, serving what loaded",
+        "env": {"MODEL_PRELOAD": "whisper,musicgen"},
+        "operations": ["health", "stats", "transcribe", "analyze", "generate", "compose"],
+        "default_operation": "transcribe",
+        "require_models": False
+    },
+    "lazy_loading": {
+        "description": "Lazy loading (models load on demand)",
+        "env": {"MODEL_PRELOAD": "", "MODEL_WARMUP": "false"},
+        "operations": ["health", "stats", "transcribe", "analyze", "generate", "compose"],
+        "default_operation": "stats",
+        "require_models": False
+    },
+    "small_models": {
+        "description": "Smallest AI models (tiny Whisper on CPU)",
+        "env": {
+            "MODEL_SIZE": "tiny",
+            "MODEL_DEVICE": "cpu",
+            "MODEL_PRELOAD": "whisper",
+            "LATENCY_BUDGET_MS": "5000",
+            # The package ships without crepe/TensorFlow
+            "F0_BACKEND": "yin"
+        },
+        "operations": ["health", "stats", "transcribe", "analyze"],
+        "default_operation": "transcribe",
+        "require_models": False
+    },
+    "cpu_minimal": {
+        "description": "CPU-only minimal (no AI models)",
+        "env": {"MODEL_DEVICE": "cpu", "MODEL_PRELOAD": ""},
+        "operations": ["health", "stats"],
+        "default_operation": "stats",
+        "require_models": False
+    },
+    "cpu_large": {
+        "description": "CPU-only for large instances (int8 MusicGen)",
+        "env": {
+            "MODEL_DEVICE": "cpu",
+            "MODEL_PRELOAD": "musicgen",
+            "MUSICGEN_CPU_PRECISION": "auto",
+            "TORCH_INTEROP_THREADS": "1"
+        },
+        "operations": ["health", "stats", "generate"],
+        "default_operation": "stats",
+        "require_models": False
+    }
+}
+
+# Global handler state
+_config: Dict[str, Any] = {}
+
+def load_environment(model_dir: str) -> None:
+    """Copy environment.json from the model package into os.environ"""
+    env_path = os.path.join(model_dir, "environment.json")
+    if os.path.exists(env_path):
+        with open(env_path, "r") as f:
+            for key, value in json.load(f).items():
+                os.environ[key] = str(value)
+        logger.info("Loaded environment variables from environment.json")
+
+def resolve_profile(name: str = None) -> Dict[str, Any]:
+    """
+    Look up a profile (default SONICMUSE_PROFILE, then "full")
+
+    SONICMUSE_OPERATIONS (comma separated) overrides the enabled operations.
+    """
+    name = name or os.getenv("SONICMUSE_PROFILE", "full")
+    if name not in PROFILES:
+        raise ValueError(f"Unknown profile '{name}' (choose from {', '.join(PROFILES)})")
+
+    profile = dict(PROFILES[name], name=name)
+    operations = os.getenv("SONICMUSE_OPERATIONS")
+    if operations:
+        profile["operations"] = [op.strip() for op in operations.split(",") if op.strip()]
+    return profile
+
+def model_fn(model_dir: str) -> Dict[str, Any]:
+    """
+    Select the deployment profile and set up the model registry
+
+    Args:
+        model_dir: Directory containing model files
+
+    Returns:
+        Handler configuration (profile and model registry)
+    """
+    global _config
+    if _config:
+        return _config
+
+    try:
+        logger.info(f"Loading models from {model_dir}")
+        load_environment(model_dir)
+        profile = resolve_profile()
+        for key, value in profile["env"].items():
+            os.environ.setdefault(key, value)
+        logger.info(f"Using profile {profile['name']}: {profile['description']}")
+
+        # Import after setting up environment
+        from core.models import create_model_registry_from_env, get_device
+
+        models = create_model_registry_from_env()
+        preload = [name.strip() for name in os.getenv("MODEL_PRELOAD", "").split(",") if name.strip()]
+        for name in preload:
+            try:
+                models.preload([name])
+            except Exception as e:
+                if profile["require_models"]:
+                    raise
+                # Logged by the registry; retried on first use
+                logger.warning(f"{name} not preloaded: {e}")
+
+        _config = {
+            "profile": profile,
+            "models": models,
+            "device": get_device(),
+            "latency_budget_ms": float(os.getenv("LATENCY_BUDGET_MS", 0)) or None
+        }
+        logger.info(f"Models ready: {models.stats()}")
+        return _config
+
+    except Exception as e:
+        logger.error(f"Failed to load models: {e}")
+        raise
+
+def input_fn(request_body: bytes, request_content_type: str) -> Dict[str, Any]:
+    """
+    Parse input data from SageMaker request
+
+    Args:
+        request_body: Raw request body
+        request_content_type: Content type of request
+
+    Returns:
+        Parsed input data
+    """
+    try:
+        if request_content_type == 'application/json':
+            return json.loads(request_body.decode('utf-8') if isinstance(request_body, bytes) else request_body)
+        elif request_content_type == 'application/octet-stream' or request_content_type.startswith('audio/'):
+            # For audio files
+            return {"audio_data": request_body}
+        else:
+            raise ValueError(f"Unsupported content type: {request_content_type}")
+
+    except Exception as e:
+        logger.error(f"Input parsing failed: {e}")
+        raise
+
+def audio_stats(audio_data: bytes) -> Dict[str, Any]:
+    """Level and spectrum summary of an audio file (soundfile and numpy only)"""
+    samples, sample_rate = sf.read(io.BytesIO(audio_data), dtype="float32", always_2d=True)
+    mono = samples.mean(axis=1)
+    magnitude = np.abs(np.fft.rfft(mono)) if len(mono) > 1024 else None
     return {
-        "device": "cpu",
-        "gpu_available": False,
-        "instance_type": "cpu_large",
-        "mode": "cpu_only_large",
-        "models": {}
+        "duration": len(mono) / sample_rate,
+        "sample_rate": int(sample_rate),
+        "channels": int(samples.shape[1]),
+        "rms_energy": float(np.sqrt(np.mean(mono ** 2))) if len(mono) else 0.0,
+        "peak_level": float(np.max(np.abs(samples))) if len(mono) else 0.0,
+        "dominant_frequency": float(np.argmax(magnitude) * sample_rate / len(mono)) if magnitude is not None else 0.0,
+        "status": "processed"
     }
 
-def input_fn(request_body, request_content_type):
-    """Deserialize input request"""
-    if request_content_type == "application/json":
-        return json.loads(request_body)
-    elif request_content_type == "application/octet-stream":
-        return {"audio_bytes": request_body}
-    else:
-        return {"error": "Unsupported content type"}
-
-def predict_fn(input_data, model_config):
-    """Handle predictions with CPU-only processing"""
+def predict_fn(input_data: Dict[str, Any], model: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Run prediction using loaded models
+
+    Args:
+        input_data: Parsed input data
+        model: Handler configuration returned by model_fn
+
+    Returns:
+        Prediction results
+    """
+    start = time.perf_counter()
+    profile = model["profile"]
+    models = model["models"]
+
+    # Determine operation type
+    operation = input_data.get("operation", profile["default_operation"])
+    if operation not in profile["operations"]:
+        raise ValueError(f"Operation '{operation}' is not enabled in profile {profile['name']}")
+
     try:
-        if "operation" in input_data and input_data["operation"] == "health":
+        if operation == "health":
             return {
                 "status": "healthy",
-                "mode": "cpu_only_large",
-                "message": "CPU-only instance running",
-                "memory_available": "High (large CPU instance)"
+                "profile": profile["name"],
+                "operations": profile["operations"],
+                "device": model["device"],
+                "latency_budget_ms": model["latency_budget_ms"],
+                "models": models.stats()
             }
-        
-        if "audio_bytes" in input_data:
-            audio_bytes = input_data["audio_bytes"]
-            import io
-            
-            audio_io = io.BytesIO(audio_bytes)
-            audio_data, sample_rate = sf.read(audio_io)
-            
-            # Comprehensive audio analysis
-            duration = len(audio_data) / sample_rate
-            rms = np.sqrt(np.mean(audio_data**2))
-            peak = np.max(np.abs(audio_data))
-            
-            # Spectral analysis
-            if len(audio_data) > 1024:
-                fft = np.fft.fft(audio_data)
-                magnitude = np.abs(fft)
-                dominant_freq = np.argmax(magnitude[:len(magnitude)//2]) * sample_rate / len(fft)
-            else:
-                dominant_freq = 0
-            
-            return {
-                "duration": float(duration),
-                "sample_rate": int(sample_rate),
-                "rms_energy": float(rms),
-                "peak_level": float(peak),
-                "dominant_frequency": float(dominant_freq),
-                "status": "processed",
-                "mode": "cpu_only_large",
-                "analysis_level": "comprehensive"
+
+        if operation == "stats":
+            # No models or heavy imports, so cpu_minimal stays light
+            return _with_latency(audio_stats(input_data["audio_data"]), start, model["latency_budget_ms"])
+
+        # Import analysis functions; generation and mixing modules are only
+        # imported by the operations that use them, since the small_models
+        # package has no audiocraft
+        from core.audio import as_decoded
+        from core.asr import transcribe, resolve_asr_profile, ASR_PROFILES
+        from core.models import get_whisper
+        from core.prompt import decide_controls, build_prompt
+
+        if operation in ("transcribe", "analyze"):
+            # Decode once for ASR and features
+            audio = as_decoded(input_data["audio_data"])
+            asr_profile = resolve_asr_profile(input_data.get("asr_profile"))
+            whisper = get_whisper(models, ASR_PROFILES[asr_profile]["compute_type"])
+            transcript, segments = transcribe(audio, whisper, profile=asr_profile)
+            result = {"transcript": transcript, "segments": segments}
+
+            if operation == "analyze":
+                from core.features import extract_features
+
+                features = extract_features(audio, segments, input_data.get("f0_backend"), input_data.get("f0_voiced_only"))
+                controls = decide_controls(features)
+                result.update({
+                    "features": features,
+                    "controls": controls,
+                    "prompt": build_prompt(controls)
+                })
+
+        elif operation == "generate":
+            from core.music import generate_music
+
+            # Music generation
+            wav_bytes = generate_music(
+                models["musicgen"],
+                prompt=input_data["prompt"],
+                duration=input_data.get("duration", 30),
+                seed=input_data.get("seed", 42),
+                tempo_bpm=input_data.get("tempo_bpm", 120),
+                key=input_data.get("key", "Cmaj")
+            )
+            result = {"audio": wav_bytes, "content_type": "audio/wav"}
+
+        elif operation == "compose":
+            from core.features import extract_features
+            from core.music import generate_music
+            from core.mix import mix_with_dialogue
+
+            # Full composition pipeline
+            audio = as_decoded(input_data["audio_data"])
+
+            # Analyze
+            asr_profile = resolve_asr_profile(input_data.get("asr_profile"))
+            whisper = get_whisper(models, ASR_PROFILES[asr_profile]["compute_type"])
+            transcript, segments = transcribe(audio, whisper, profile=asr_profile)
+            features = extract_features(audio, segments, input_data.get("f0_backend"), input_data.get("f0_voiced_only"))
+            controls = decide_controls(features)
+            prompt = build_prompt(controls)
+
+            # Generate
+            wav_bytes = generate_music(
+                models["musicgen"],
+                prompt=prompt,
+                duration=input_data.get("duration", 30),
+                seed=input_data.get("seed", 42),
+                tempo_bpm=controls.get("tempo_bpm", 120),
+                key=controls.get("key", "Cmaj")
+            )
+
+            # Mix
+            mixed_wav = mix_with_dialogue(
+                audio,
+                wav_bytes,
+                bg_db=-18,
+                ducking=0.3,
+                speech=segments
+            )
+            result = {
+                "audio": mixed_wav,
+                "prompt": prompt,
+                "controls": controls,
+                "content_type": "audio/wav"
             }
-        
-        return {"error": "No valid input data provided"}
-        
+
+        else:
+            raise ValueError(f"Unknown operation: {operation}")
+
+        return _with_latency(result, start, model["latency_budget_ms"])
+
+    except Exception as e:
+        logger.error(f"Prediction failed: {e}")
+        raise
+
+def _with_latency(result: Dict[str, Any], start: float, budget_ms: float = None) -> Dict[str, Any]:
+    """Record request latency and, with a budget configured, whether it was met"""
+    latency_ms = (time.perf_counter() - start) * 1000
+    result["latency_ms"] = round(latency_ms, 1)
+    if budget_ms:
+        result["within_budget"] = latency_ms <= budget_ms
+        if not result["within_budget"]:
+            logger.warning(f"Request took {latency_ms:.0f} ms (budget {budget_ms:.0f} ms)")
+    return result
+
+def output_fn(prediction: Dict[str, Any], content_type: str) -> Tuple[bytes, str]:
+    """
+    Format output for SageMaker response
+
+    Audio results go back as raw WAV for audio/* or application/octet-stream,
+    as JSON metadata plus WAV for multipart/mixed, and base64 in JSON
+    ("audio_data") for application/json.
+
+    Args:
+        prediction: Prediction results
+        content_type: Desired output content type
+
+    Returns:
+        Tuple of (response body, response content type)
+    """
+    try:
+        from core.encoding import encode_prediction
+
+        return encode_prediction(prediction, content_type)
+
     except Exception as e:
-        logger.error(f"Prediction failed: {e}", exc_info=True)
-        return {"error": str(e)}
-
-def output_fn(prediction, accept_type):
-    """Serialize prediction output"""
-    if accept_type == "application/json":
-        return json.dumps(prediction), accept_type
-    else:
-        return json.dumps(prediction), "application/json"
+        logger.error(f"Output formatting failed: {e}")
+        raise
@@ -0,0 +1,96 @@
+"""
+Benchmark the MusicGen text-conditioning cache
+
+Times the T5 prompt encoding (prompt plus CFG null condition) and a short
+end-to-end generation for a set of build_prompt prompts, first with the
+cache disabled and then with it warm, and reports the per-request saving.
+
+Usage: python scripts/benchmark_conditioning_cache.py [--repeats 5] [--duration 2]
+"""
+import os
+import sys
+import time
+import logging
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+def timed(fn, repeats):
+    """Median wall time of ``fn`` in milliseconds"""
+    import torch
+
+    samples = []
+    for _ in range(repeats):
+        if torch.cuda.is_available():
+            torch.cuda.synchronize()
+        start = time.perf_counter()
+        fn()
+        if torch.cuda.is_available():
+            torch.cuda.synchronize()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+def benchmark_conditioning_cache():
+    """Compare prompt encoding and generation latency with and without the cache"""
+    import torch
+    from audiocraft.modules.conditioners import ClassifierFreeGuidanceDropout, ConditioningAttributes
+
+    import core.music as music
+    from core.models import load_musicgen
+    from core.prompt import PRESET_TABLE, build_prompt
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--duration", type=int, default=2)
+    parser.add_argument("--prompts", type=int, default=4)
+    args = parser.parse_args()
+
+    print("SonicMuse Conditioning Cache Benchmark")
+    print("=" * 38)
+
+    musicgen_model = load_musicgen()
+    provider = musicgen_model.lm.condition_provider
+    prompts = [
+        build_prompt({"mood": preset["when"]["mood"], "tempo_bpm": 100, "key": "Cmaj", "style_id": preset["id"]})
+        for preset in PRESET_TABLE[:args.prompts]
+    ]
+
+    def encode(prompt):
+        attributes = [ConditioningAttributes(text={"description": prompt})]
+        attributes += ClassifierFreeGuidanceDropout(p=1.0)(attributes)
+        with torch.no_grad():
+            provider(provider.tokenize(attributes))
+
+    def generate(prompt):
+        music.generate_music_batch(musicgen_model, [prompt], duration=args.duration, seed=42)
+
+    # Baseline: keep generate_music_batch from installing the cache
+    cache, music.CONDITIONING_CACHE = music.CONDITIONING_CACHE, None
+    encode(prompts[0])
+    cold = {
+        "encode": statistics.mean(timed(lambda: encode(p), args.repeats) for p in prompts),
+        "generate": statistics.mean(timed(lambda: generate(p), args.repeats) for p in prompts)
+    }
+
+    music.CONDITIONING_CACHE = cache
+    if not music.enable_conditioning_cache(musicgen_model):
+        print("[ERROR] Conditioning cache unavailable (MUSICGEN_CONDITIONING_CACHE_MB=0?)")
+        return
+    for prompt in prompts:
+        encode(prompt)
+    warm = {
+        "encode": statistics.mean(timed(lambda: encode(p), args.repeats) for p in prompts),
+        "generate": statistics.mean(timed(lambda: generate(p), args.repeats) for p in prompts)
+    }
+
+    print(f"{len(prompts)} prompts, {args.repeats} repeats, {args.duration}s generations, "
+          f"{music.model_identity(musicgen_model)} on {musicgen_model.device}")
+    print(f"{'':12}{'uncached':>12}{'cached':>12}{'saved':>12}")
+    for name in ("encode", "generate"):
+        print(f"{name:12}{cold[name]:>10.1f}ms{warm[name]:>10.1f}ms{cold[name] - warm[name]:>10.1f}ms")
+    print(f"[OK] Cache: {cache.info()}")
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
+    benchmark_conditioning_cache()
@@ -0,0 +1,60 @@
+"""
+Build the preset music bank used by instant /compose
+
+Pre-generates a loopable stem for every (style, key, tempo bucket) that
+core.prompt.build_prompt can produce and writes them, with an index, to
+PRESET_BANK_DIR. Already-built stems are skipped, so the script can be
+re-run to resume or to extend the bank.
+
+Usage: python scripts/build_preset_bank.py [--bars 4] [--tempo-step 10] [--overwrite]
+"""
+import os
+import sys
+import time
+import logging
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+def build_preset_bank():
+    """Generate missing stems into PRESET_BANK_DIR"""
+    from core.bank import BANK_KEYS, PresetBank, build_bank
+    from core.models import load_musicgen
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--dir", default=os.getenv("PRESET_BANK_DIR", "preset_bank"))
+    parser.add_argument("--bars", type=int, default=4)
+    parser.add_argument("--tempo-step", type=int, default=10)
+    parser.add_argument("--styles", nargs="*", default=None)
+    parser.add_argument("--keys", nargs="*", default=list(BANK_KEYS))
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--batch-size", type=int, default=4)
+    parser.add_argument("--overwrite", action="store_true")
+    args = parser.parse_args()
+
+    print("SonicMuse Preset Bank Builder")
+    print("=" * 30)
+
+    start = time.time()
+    musicgen_model = load_musicgen()
+    print(f"[OK] MusicGen loaded in {time.time() - start:.1f}s")
+
+    bank = PresetBank(args.dir)
+    generated = build_bank(
+        musicgen_model,
+        bank,
+        styles=args.styles,
+        keys=args.keys,
+        tempos=range(60, 161, args.tempo_step),
+        bars=args.bars,
+        seed=args.seed,
+        batch_size=args.batch_size,
+        overwrite=args.overwrite
+    )
+
+    print(f"[OK] Generated {generated} stems in {time.time() - start:.1f}s")
+    print(f"[OK] Bank at {args.dir}: {len(bank)} stems")
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    build_preset_bank()
@@ -53,7 +53,7 @@ def deploy_all_approaches():
         "cpu_large": {
             "package": "sonicmuse-cpu_large.tar.gz", 
             "instance": "ml.m5.2xlarge",
-            "description": "CPU-only for large instances",
+            "description": "CPU-only for large instances (int8 MusicGen)",
             "priority": 2
         },
         "lazy_loading": {
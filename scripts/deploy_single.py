@@ -22,7 +22,7 @@ def deploy_single_approach(approach_name):
         "cpu_large": {
             "package": "sonicmuse-cpu_large.tar.gz", 
             "instance": "ml.m5.2xlarge",
-            "description": "CPU-only for large instances"
+            "description": "CPU-only for large instances (int8 MusicGen)"
         },
         "lazy_loading": {
             "package": "sonicmuse-lazy_loading.tar.gz",
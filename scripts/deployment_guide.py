@@ -33,11 +33,11 @@ THE 4 APPROACHES:
             "features": "Basic audio analysis only"
         },
         "cpu_large": {
-            "description": "CPU-only for large instances", 
+            "description": "CPU-only for large instances (int8 MusicGen)", 
             "instance": "ml.m5.2xlarge",
             "cost": "$0.46/hour",
             "success_probability": "90%",
-            "features": "Comprehensive audio analysis"
+            "features": "Audio analysis and music generation"
         },
         "lazy_loading": {
             "description": "Lazy loading (models load on demand)",
@@ -128,7 +128,7 @@ EXPECTED RESULTS:
 
 Most Likely to Succeed (in order):
 1. cpu_minimal - Basic audio processing, no AI models
-2. cpu_large - CPU-only processing on large instance  
+2. cpu_large - int8 MusicGen generation on a large CPU instance
 3. lazy_loading - Models load only when needed
 4. small_models - Tiny Whisper model
 
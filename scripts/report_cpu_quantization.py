@@ -0,0 +1,111 @@
+"""
+Accuracy/latency report for MusicGen CPU precisions
+
+Loads MusicGen on CPU once per precision (fp32, int8, bf16) and reports,
+for each torch thread count, the generation latency and real-time factor,
+plus the language model's size and how closely its next-token predictions
+follow fp32: teacher-forced on fp32-generated tokens, the top-1 agreement
+and mean KL divergence of the codebook distributions. Run it on the
+instance type you deploy to and set MUSICGEN_CPU_PRECISION and
+TORCH_NUM_THREADS from the results.
+
+Usage: python scripts/report_cpu_quantization.py [--duration 5] [--threads 2 4 8] [--precisions fp32 int8 bf16]
+"""
+import io
+import os
+import sys
+import gc
+import time
+import logging
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+def lm_megabytes(musicgen_model):
+    """Serialized size of the language model weights (int8 layers count packed)"""
+    import torch
+
+    buffer = io.BytesIO()
+    torch.save(musicgen_model.lm.state_dict(), buffer)
+    return buffer.tell() / 1024 / 1024
+
+def predictions(musicgen_model, prompts, tokens):
+    """Teacher-forced next-token log-probabilities, shaped (B, K, T, card), and their mask"""
+    import torch
+
+    attributes, _ = musicgen_model._prepare_tokens_and_attributes(prompts, None)
+    with torch.no_grad(), musicgen_model.autocast:
+        output = musicgen_model.lm.compute_predictions(tokens, attributes)
+    return torch.log_softmax(output.logits.float(), dim=-1), output.mask
+
+def report_cpu_quantization():
+    """Compare MusicGen CPU precisions and thread counts"""
+    import torch
+
+    from core.models import cpu_supports_bf16, load_musicgen
+    from core.music import GENERATION_PARAMS, generate_music_batch
+    from core.prompt import PRESET_TABLE, build_prompt
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--size", default=os.getenv("MUSICGEN_SIZE", "small"))
+    parser.add_argument("--precisions", nargs="*", default=["fp32", "int8", "bf16"])
+    parser.add_argument("--threads", nargs="*", type=int, default=[torch.get_num_threads()])
+    parser.add_argument("--duration", type=int, default=5)
+    parser.add_argument("--prompts", type=int, default=2)
+    parser.add_argument("--repeats", type=int, default=2)
+    args = parser.parse_args()
+
+    print("SonicMuse MusicGen CPU Precision Report")
+    print("=" * 39)
+    print(f"musicgen-{args.size}, {args.duration}s clips, {os.cpu_count()} CPUs, "
+          f"native bf16: {'yes' if cpu_supports_bf16() else 'no'}")
+
+    prompts = [
+        build_prompt({"mood": preset["when"]["mood"], "tempo_bpm": 100, "key": "Cmaj", "style_id": preset["id"]})
+        for preset in PRESET_TABLE[:args.prompts]
+    ]
+    precisions = ["fp32"] + [p for p in args.precisions if p != "fp32"]
+    reference = None
+    rows = []
+
+    for precision in precisions:
+        musicgen_model = load_musicgen(args.size, device="cpu", precision=precision)
+
+        if reference is None:
+            # Tokens to teacher-force every precision on, and fp32's predictions for them
+            musicgen_model.set_generation_params(duration=args.duration, **GENERATION_PARAMS)
+            torch.manual_seed(0)
+            with torch.no_grad():
+                _, tokens = musicgen_model.generate(prompts, return_tokens=True)
+            reference = (tokens, *predictions(musicgen_model, prompts, tokens))
+        tokens, ref_logprobs, mask = reference
+        logprobs, _ = predictions(musicgen_model, prompts, tokens)
+        agreement = (logprobs.argmax(-1) == ref_logprobs.argmax(-1))[mask].float().mean().item()
+        kl = (ref_logprobs.exp() * (ref_logprobs - logprobs)).sum(-1)[mask].mean().item()
+
+        for threads in args.threads:
+            torch.set_num_threads(threads)
+            generate_music_batch(musicgen_model, prompts[:1], duration=1, seed=0)
+            samples = []
+            for _ in range(args.repeats):
+                for prompt in prompts:
+                    start = time.perf_counter()
+                    generate_music_batch(musicgen_model, [prompt], duration=args.duration, seed=42)
+                    samples.append(time.perf_counter() - start)
+            latency = statistics.median(samples)
+            rows.append((precision, threads, latency, latency / args.duration, lm_megabytes(musicgen_model), agreement, kl))
+            print(f"[OK] {precision} x{threads}: {latency:.1f}s")
+
+        del musicgen_model
+        gc.collect()
+
+    print()
+    print(f"{'precision':<10}{'threads':>8}{'latency':>10}{'RTF':>7}{'LM MB':>8}{'top-1':>8}{'KL':>9}")
+    for precision, threads, latency, rtf, size_mb, agreement, kl in rows:
+        print(f"{precision:<10}{threads:>8}{latency:>9.1f}s{rtf:>7.2f}{size_mb:>8.0f}{agreement:>8.1%}{kl:>9.4f}")
+    print("\nRTF < 1 generates faster than real time; top-1/KL compare to fp32 on the same tokens.")
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
+    report_cpu_quantization()
@@ -3,32 +3,28 @@ Test all 4 optimization approaches and determine which works
 """
 import os
 import json
-import subprocess
-from pathlib import Path
+
+from create_sagemaker_package import create_sagemaker_package
 
 def create_and_test_approaches():
     """Create model packages for all 4 approaches and test them"""
     
     approaches = {
         "cpu_minimal": {
-            "inference": "inference_cpu_minimal.py",
             "instance": "ml.m5.large",
             "description": "CPU-only minimal (no AI models)"
         },
         "lazy_loading": {
-            "inference": "inference_lazy.py", 
             "instance": "ml.m5.xlarge",
             "description": "Lazy loading (models load on demand)"
         },
         "small_models": {
-            "inference": "inference_small.py",
             "instance": "ml.m5.xlarge",
             "description": "Smallest AI models (tiny Whisper)"
         },
         "cpu_large": {
-            "inference": "inference_cpu_large.py",
             "instance": "ml.m5.2xlarge",
-            "description": "CPU-only for large instances"
+            "description": "CPU-only for large instances (int8 MusicGen)"
         }
     }
     
@@ -47,28 +43,14 @@ def create_and_test_approaches():
         package_name = f"sonicmuse-{approach_name}.tar.gz"
         
         try:
-            # Copy approach-specific inference.py
-            inference_src = f"sagemaker/model/{config['inference']}"
-            inference_dst = "sagemaker/model/inference.py"
+            # Same handler for every approach; the profile picks the behaviour
+            create_sagemaker_package(approach_name, package_name)
+            print(f"[OK] Created package: {package_name}")
+            
+            # Upload to S3
+            result = upload_and_deploy(approach_name, config['instance'], package_name)
+            results[approach_name] = result
             
-            if os.path.exists(inference_src):
-                # Create model package
-                subprocess.run([
-                    "tar", "czf", package_name,
-                    "-C", "sagemaker/model",
-                    "inference.py"
-                ], check=True)
-                
-                print(f"[OK] Created package: {package_name}")
-                
-                # Upload to S3
-                result = upload_and_deploy(approach_name, config['instance'], package_name)
-                results[approach_name] = result
-                
-            else:
-                print(f"[ERROR] Inference file not found: {inference_src}")
-                results[approach_name] = {"status": "file_not_found"}
-                
         except Exception as e:
             print(f"[ERROR] {approach_name} failed: {e}")
             results[approach_name] = {"status": "error", "message": str(e)}